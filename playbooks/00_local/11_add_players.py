@@ -17,6 +17,10 @@ import subprocess
 from datetime import datetime
 from typing import Dict, Any, List
 
+# Users index spec and preflight, shared with rop01/11_add_players.py
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from comp_player_indexes import preflight_indexes  # noqa: E402
+
 # Bcrypt hash for password "comp_player_pass"
 COMP_PLAYER_PASSWORD = "$2b$12$PHGvsjOG3/fjNuEZQP1Szu5/igAj8pppp8XoAFeVyzDbj2EBh3o82"
 
@@ -131,6 +135,17 @@ def create_player_document(player_json: Dict[str, Any], current_time: datetime)
     }
 
 
+def run_mongosh_eval(script: str) -> subprocess.CompletedProcess:
+    """Run a mongosh script in the local MongoDB container."""
+    mongosh_cmd = [
+        'docker', 'exec', MONGODB_CONTAINER, 'mongosh', '--quiet',
+        '-u', MONGODB_USER, '-p', MONGODB_PASSWORD,
+        '--authenticationDatabase', MONGODB_AUTH_DB,
+        '--eval', script
+    ]
+    return subprocess.run(mongosh_cmd, capture_output=True, text=True, check=True)
+
+
 def upsert_players(players: List[Dict[str, Any]], batch_size: int = 50):
     """Upsert players into MongoDB in batches (local Docker) - inserts new or updates existing."""
     total_upserted = 0
@@ -218,6 +233,9 @@ def upsert_players(players: List[Dict[str, Any]], batch_size: int = 50):
 def main():
     parser = argparse.ArgumentParser(description='Add computer players to MongoDB (Local Docker)')
     parser.add_argument('--json-file', default='templates/comp_players.json', help='Path to players JSON file')
+    parser.add_argument('--create-indexes', action='store_true', help='Create missing seeding indexes without prompting')
+    parser.add_argument('--require-indexes', action='store_true', help='Fail instead of warning when the email index is missing')
+    parser.add_argument('--skip-index-check', action='store_true', help='Skip the users index preflight')
     
     args = parser.parse_args()
     
@@ -243,6 +261,13 @@ def main():
         print(f"❌ Error checking MongoDB container status", file=sys.stderr)
         sys.exit(1)
     
+    # Make sure upserts (by email) and comp player counts are index-backed
+    if not args.skip_index_check:
+        print("\n🔎 Checking users indexes...")
+        if not preflight_indexes(run_mongosh_eval, MONGODB_DATABASE,
+                                 create_indexes=args.create_indexes, require_indexes=args.require_indexes):
+            sys.exit(1)
+    
     print("🔍 Preparing players for insertion...")
     
     # Create all player documents
@@ -280,19 +305,11 @@ def main():
     for rank, count in sorted(rank_summary.items()):
         print(f"  - {rank}: {count} players")
     
-    # Verify final count
-    verify_script = f'''db = db.getSiblingDB('{MONGODB_DATABASE}'); var count = db.users.countDocuments({{"is_comp_player": true}}); print("Total comp players in database: " + count);'''
-    
-    mongosh_cmd = f'docker exec {MONGODB_CONTAINER} mongosh -u {MONGODB_USER} -p "{MONGODB_PASSWORD}" --authenticationDatabase {MONGODB_AUTH_DB} --eval "{verify_script}"'
+    # Verify final count (timed server-side, excluding connection overhead)
+    verify_script = f'''db = db.getSiblingDB('{MONGODB_DATABASE}'); var t0 = Date.now(); var count = db.users.countDocuments({{"is_comp_player": true}}); print("Total comp players in database: " + count + " (counted in " + (Date.now() - t0) + " ms)");'''
     
     try:
-        result = subprocess.run(
-            mongosh_cmd,
-            shell=True,
-            capture_output=True,
-            text=True,
-            check=True
-        )
+        result = run_mongosh_eval(verify_script)
         for line in result.stdout.split('\n'):
             if 'Total comp players' in line:
                 print(f"\n📊 {line}")
@@ -0,0 +1,357 @@
+#!/usr/bin/env python3
+"""
+Benchmark comp player matchmaking queries against the local MongoDB Docker container.
+
+The game server selects bots by skill: comp players filtered on
+modules.dutch_game.rank and a modules.dutch_game.level range, randomly sampled.
+This script seeds a scratch collection with synthetic players at several scales,
+runs representative bot-selection queries with the indexes the setup playbooks
+create today, then adds the proposed compound partial index and runs them again.
+For every scale and query it records p50/p99 latency and the explain() plan, and
+reports whether the proposed index is used.
+
+The scratch collection lives next to db.users (default: comp_player_bench_users)
+so the app user's credentials are enough; db.users is never touched.
+
+Usage:
+    python3 benchmark_comp_player_queries.py [--scales 10000,100000,1000000] [--iterations 200]
+    python3 benchmark_comp_player_queries.py --scales 10000 --output /tmp/comp_bench.json
+"""
+
+import json
+import math
+import sys
+import argparse
+import subprocess
+import importlib.util
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Any, List
+
+SCRIPT_DIR = Path(__file__).parent.resolve()
+
+# MongoDB connection details (local Docker container)
+MONGODB_CONTAINER = "dutch_external_app_mongodb"
+MONGODB_DATABASE = "external_system"
+MONGODB_USER = "external_app_user"
+MONGODB_PASSWORD = "6R3jjsvVhIRP20zMiHdkBzNKx"
+MONGODB_AUTH_DB = "external_system"
+
+DEFAULT_COLLECTION = "comp_player_bench_users"
+DEFAULT_SCALES = [10000, 100000, 1000000]
+
+# Indexes the setup playbooks create on db.users today
+BASELINE_INDEXES = [
+    ({"email": 1}, {"unique": True}),
+    ({"username": 1}, {}),
+    ({"status": 1}, {}),
+    ({"created_at": 1}, {}),
+    ({"updated_at": 1}, {}),
+    ({"is_comp_player": 1}, {}),
+]
+
+# Proposed index (equality on rank, range on level, comp players only), as the seeders create it
+sys.path.insert(0, str(SCRIPT_DIR.parent))
+from comp_player_indexes import MATCHMAKING_INDEX_KEYS, MATCHMAKING_INDEX_OPTIONS  # noqa: E402
+
+SEED_JS = '''db = db.getSiblingDB('%(db)s');
+var coll = db.getCollection('%(collection)s');
+coll.drop();
+var template = JSON.stringify(%(template)s);
+var ranks = %(ranks)s;
+var cum = %(cum)s;
+var bands = %(bands)s;
+var total = cum[cum.length - 1];
+var humanRatio = %(human_ratio)s;
+var state = (%(seed)s %% 2147483646) + 1;
+function rand() { state = (state * 48271) %% 2147483647; return (state - 1) / 2147483646; }
+var batch = [];
+for (var i = 0; i < %(count)s; i++) {
+  var doc = JSON.parse(template);
+  var r = rand() * total;
+  var k = 0;
+  while (cum[k] <= r) { k++; }
+  doc.username = 'bench' + i;
+  doc.email = 'bench' + i + '@cp.com';
+  doc.is_comp_player = rand() >= humanRatio;
+  doc.modules.dutch_game.rank = ranks[k].toLowerCase();
+  doc.modules.dutch_game.level = bands[k][0] + Math.floor(rand() * (bands[k][1] - bands[k][0] + 1));
+  batch.push(doc);
+  if (batch.length === 5000) { coll.insertMany(batch, { ordered: false }); batch = []; }
+}
+if (batch.length) { coll.insertMany(batch, { ordered: false }); }
+%(indexes)s
+print('BENCH_SEED ' + JSON.stringify({ count: coll.countDocuments({}), comp: coll.countDocuments({ is_comp_player: true }) }));
+'''
+
+QUERY_JS = '''db = db.getSiblingDB('%(db)s');
+var coll = db.getCollection('%(collection)s');
+var ranks = %(ranks)s;
+var bands = %(bands)s;
+var levelWindow = %(window)s;
+var sampleSize = %(sample_size)s;
+var state = (%(seed)s %% 2147483646) + 1;
+function rand() { state = (state * 48271) %% 2147483647; return (state - 1) / 2147483646; }
+var now = (typeof performance !== 'undefined') ? function() { return performance.now(); } : function() { return Date.now(); };
+function skillFilter(multiRank) {
+  var k = Math.floor(rand() * ranks.length);
+  var level = bands[k][0] + Math.floor(rand() * (bands[k][1] - bands[k][0] + 1));
+  var rank = ranks[k].toLowerCase();
+  var rankFilter = rank;
+  if (multiRank) {
+    var adjacent = [rank];
+    if (k > 0) { adjacent.push(ranks[k - 1].toLowerCase()); }
+    if (k < ranks.length - 1) { adjacent.push(ranks[k + 1].toLowerCase()); }
+    rankFilter = { $in: adjacent };
+  }
+  return {
+    is_comp_player: true,
+    'modules.dutch_game.rank': rankFilter,
+    'modules.dutch_game.level': { $gte: level - levelWindow, $lte: level + levelWindow }
+  };
+}
+var queries = {
+  rank_level_sample: function(explain) {
+    var pipeline = [{ $match: skillFilter(false) }, { $sample: { size: sampleSize } }];
+    return explain ? coll.explain('executionStats').aggregate(pipeline) : coll.aggregate(pipeline).toArray();
+  },
+  adjacent_ranks_sample: function(explain) {
+    var pipeline = [{ $match: skillFilter(true) }, { $sample: { size: sampleSize } }];
+    return explain ? coll.explain('executionStats').aggregate(pipeline) : coll.aggregate(pipeline).toArray();
+  },
+  rank_level_count: function(explain) {
+    var filter = skillFilter(false);
+    return explain ? coll.find(filter).explain('executionStats') : coll.countDocuments(filter);
+  }
+};
+var report = { latencies_ms: {}, explain: {} };
+Object.keys(queries).forEach(function(name) {
+  queries[name](false);  // warm-up
+  var samples = [];
+  for (var i = 0; i < %(iterations)s; i++) {
+    var t0 = now();
+    queries[name](false);
+    samples.push(now() - t0);
+  }
+  report.latencies_ms[name] = samples;
+  report.explain[name] = queries[name](true);
+});
+print('BENCH_QUERY ' + JSON.stringify(report));
+'''
+
+
+def _load_sibling(filename: str, module_name: str):
+    """Load a sibling playbook script (numbered filenames are not importable by name)."""
+    spec = importlib.util.spec_from_file_location(module_name, SCRIPT_DIR / filename)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def run_mongosh_eval(script: str) -> subprocess.CompletedProcess:
+    """Run a mongosh script in the local MongoDB container."""
+    mongosh_cmd = [
+        'docker', 'exec', MONGODB_CONTAINER, 'mongosh', '--quiet',
+        '-u', MONGODB_USER, '-p', MONGODB_PASSWORD,
+        '--authenticationDatabase', MONGODB_AUTH_DB,
+        '--eval', script
+    ]
+    return subprocess.run(mongosh_cmd, capture_output=True, text=True, check=True)
+
+
+def _parse_marker(stdout: str, marker: str) -> Dict[str, Any]:
+    """Return the JSON payload printed by a mongosh script after `marker`."""
+    for line in stdout.split('\n'):
+        if line.startswith(marker + ' '):
+            return json.loads(line[len(marker) + 1:])
+    raise ValueError(f"No {marker} output from mongosh")
+
+
+def percentile(samples: List[float], pct: float) -> float:
+    """Nearest-rank percentile of a list of samples."""
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    rank = max(0, min(len(ordered) - 1, math.ceil(pct / 100.0 * len(ordered)) - 1))
+    return ordered[rank]
+
+
+def create_index_js(collection: str, keys: Dict[str, int], options: Dict[str, Any]) -> str:
+    """Return a mongosh statement creating one index on the scratch collection."""
+    return f"db.getCollection('{collection}').createIndex({json.dumps(keys)}, {json.dumps(options)});"
+
+
+def summarize_plan(explain: Any) -> Dict[str, Any]:
+    """Reduce an explain() document to the winning plan's stages, index names and work done."""
+    stages: List[str] = []
+    index_names: List[str] = []
+    stats = {'docs_examined': 0, 'keys_examined': 0}
+
+    def walk_plan(plan: Any):
+        if isinstance(plan, dict):
+            if 'stage' in plan:
+                stages.append(plan['stage'])
+            if 'indexName' in plan:
+                index_names.append(plan['indexName'])
+            for key in ('inputStage', 'queryPlan'):
+                if key in plan:
+                    walk_plan(plan[key])
+            for child in plan.get('inputStages', []):
+                walk_plan(child)
+
+    def walk(node: Any):
+        if isinstance(node, dict):
+            for key, value in node.items():
+                if key == 'winningPlan':
+                    walk_plan(value)
+                elif key == 'executionStats' and isinstance(value, dict):
+                    stats['docs_examined'] += value.get('totalDocsExamined', 0)
+                    stats['keys_examined'] += value.get('totalKeysExamined', 0)
+                else:
+                    walk(value)
+        elif isinstance(node, list):
+            for item in node:
+                walk(item)
+
+    walk(explain)
+    return {
+        'stages': stages,
+        'indexes': sorted(set(index_names)),
+        'collection_scan': 'COLLSCAN' in stages,
+        **stats,
+    }
+
+
+def run_queries(collection: str, profile: Dict[str, Any], args) -> Dict[str, Any]:
+    """Run the bot-selection queries and return latency percentiles and plans per query."""
+    ranks = list(profile['rank_weights'])
+    result = run_mongosh_eval(QUERY_JS % {
+        'db': MONGODB_DATABASE,
+        'collection': collection,
+        'ranks': json.dumps(ranks),
+        'bands': json.dumps([profile['level_bands'][r] for r in ranks]),
+        'window': args.level_window,
+        'sample_size': args.sample_size,
+        'seed': args.seed + 1,
+        'iterations': args.iterations,
+    })
+    raw = _parse_marker(result.stdout, 'BENCH_QUERY')
+    queries = {}
+    for name, samples in raw['latencies_ms'].items():
+        queries[name] = {
+            'p50_ms': round(percentile(samples, 50), 3),
+            'p99_ms': round(percentile(samples, 99), 3),
+            'max_ms': round(max(samples), 3) if samples else 0.0,
+            'plan': summarize_plan(raw['explain'][name]),
+        }
+    return queries
+
+
+def benchmark_scale(count: int, template: Dict[str, Any], profile: Dict[str, Any], args) -> Dict[str, Any]:
+    """Seed one scale, benchmark with baseline indexes, add the proposed index, benchmark again."""
+    ranks = list(profile['rank_weights'])
+    cum = []
+    total = 0
+    for rank in ranks:
+        total += profile['rank_weights'][rank]
+        cum.append(total)
+
+    print(f"\n🌱 Seeding {count:,} players into {args.collection}...")
+    indexes_js = '\n'.join(create_index_js(args.collection, keys, options) for keys, options in BASELINE_INDEXES)
+    seeded = _parse_marker(run_mongosh_eval(SEED_JS % {
+        'db': MONGODB_DATABASE,
+        'collection': args.collection,
+        'template': json.dumps(template),
+        'ranks': json.dumps(ranks),
+        'cum': json.dumps(cum),
+        'bands': json.dumps([profile['level_bands'][r] for r in ranks]),
+        'human_ratio': args.human_ratio,
+        'seed': args.seed,
+        'count': count,
+        'indexes': indexes_js,
+    }).stdout, 'BENCH_SEED')
+    print(f"   {seeded['count']:,} documents ({seeded['comp']:,} comp players)")
+
+    print("⏱️  Running queries with baseline indexes...")
+    baseline = run_queries(args.collection, profile, args)
+
+    print(f"🔧 Creating proposed index {MATCHMAKING_INDEX_OPTIONS['name']}...")
+    run_mongosh_eval(f"db = db.getSiblingDB('{MONGODB_DATABASE}'); "
+                     + create_index_js(args.collection, MATCHMAKING_INDEX_KEYS, MATCHMAKING_INDEX_OPTIONS))
+
+    print("⏱️  Running queries with proposed index...")
+    proposed = run_queries(args.collection, profile, args)
+
+    for name in baseline:
+        before, after = baseline[name], proposed[name]
+        used = MATCHMAKING_INDEX_OPTIONS['name'] in after['plan']['indexes']
+        print(f"  {name:24s} p50 {before['p50_ms']:8.2f} → {after['p50_ms']:8.2f} ms   "
+              f"p99 {before['p99_ms']:8.2f} → {after['p99_ms']:8.2f} ms   "
+              f"docs examined {before['plan']['docs_examined']:,} → {after['plan']['docs_examined']:,}   "
+              f"{'✅ index used' if used else '⚠️  index not used'}")
+
+    return {'count': seeded['count'], 'comp_players': seeded['comp'], 'baseline': baseline, 'proposed': proposed}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark comp player matchmaking queries (Local Docker)')
+    parser.add_argument('--scales', default=','.join(str(s) for s in DEFAULT_SCALES),
+                        help='Comma-separated collection sizes to benchmark')
+    parser.add_argument('--iterations', type=int, default=200, help='Timed runs per query and scale')
+    parser.add_argument('--sample-size', type=int, default=4, help='Bots sampled per matchmaking query')
+    parser.add_argument('--level-window', type=int, default=5, help='Level range is target level +/- this value')
+    parser.add_argument('--human-ratio', type=float, default=0.2, help='Fraction of seeded users that are not comp players')
+    parser.add_argument('--seed', type=int, default=42, help='Seed for data generation and query sampling')
+    parser.add_argument('--collection', default=DEFAULT_COLLECTION, help='Scratch collection (never db.users)')
+    parser.add_argument('--keep-data', action='store_true', help='Keep the scratch collection after the run')
+    parser.add_argument('--output', help='Write the full JSON report (plans included) to this file')
+
+    args = parser.parse_args()
+
+    if args.collection == 'users':
+        print("❌ Refusing to benchmark against db.users; choose a scratch collection", file=sys.stderr)
+        sys.exit(1)
+
+    try:
+        scales = [int(s) for s in args.scales.split(',') if s.strip()]
+    except ValueError:
+        print(f"❌ Invalid --scales: {args.scales}", file=sys.stderr)
+        sys.exit(1)
+
+    # Same document shape as the seeder and same distributions as the load-test generator
+    seeder = _load_sibling('11_add_players.py', 'add_players')
+    generator = _load_sibling('generate_comp_players.py', 'generate_comp_players')
+    profile = generator.DEFAULT_PROFILE
+    template = seeder.create_player_document({'username': 'template'}, datetime.utcnow())
+
+    report = {
+        'generated_at': datetime.utcnow().isoformat() + 'Z',
+        'proposed_index': {'keys': MATCHMAKING_INDEX_KEYS, 'options': MATCHMAKING_INDEX_OPTIONS},
+        'settings': {k: v for k, v in vars(args).items() if k != 'output'},
+        'scales': [],
+    }
+
+    try:
+        for count in scales:
+            report['scales'].append(benchmark_scale(count, template, profile, args))
+    except subprocess.CalledProcessError as e:
+        print(f"❌ mongosh failed: {e.stderr[:500] if e.stderr else e}", file=sys.stderr)
+        sys.exit(1)
+    finally:
+        if not args.keep_data:
+            try:
+                run_mongosh_eval(f"db = db.getSiblingDB('{MONGODB_DATABASE}'); db.getCollection('{args.collection}').drop();")
+            except subprocess.CalledProcessError:
+                pass
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"\n📄 Report written to {args.output}")
+
+    print("\n📋 Proposed index (setup playbooks and 11_add_players.py --create-indexes create it on db.users):")
+    print(f"   db.users.createIndex({json.dumps(MATCHMAKING_INDEX_KEYS)}, {json.dumps(MATCHMAKING_INDEX_OPTIONS)})")
+
+
+if __name__ == '__main__':
+    main()
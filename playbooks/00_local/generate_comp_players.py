@@ -0,0 +1,246 @@
+#!/usr/bin/env python3
+"""
+Generate synthetic computer players for load testing.
+
+This script produces N computer players reproducibly from a seed, using the same
+field conventions as templates/comp_players.json (username, email, level, rank,
+coins, first_name, last_name, picture), so the output can be fed straight into
+11_add_players.py or used to drive matchmaking / Dart game server load tests.
+
+Players are generated in fixed-size chunks and streamed to the output, so memory
+use is constant regardless of N. Player i is identical for a given seed no matter
+how many players are requested (prefix-stable), so runs can be extended later.
+
+Usage:
+    python3 generate_comp_players.py --count 500000 --seed 42 --output players.ndjson
+    python3 generate_comp_players.py --count 1000 --format json --output templates/load_players.json
+    python3 generate_comp_players.py --count 100000 --profile load_profile.json > players.ndjson
+
+Profile file (JSON, every key optional) overrides the default distributions:
+    {
+        "rank_weights": {"Beginner": 130, "Novice": 95, ...},
+        "level_bands": {"Beginner": [1, 10], ...},
+        "coins": [1000, 5000],
+        "username_styles": {"plain": 6, "dot": 2, "underscore": 2},
+        "picture_pool": 500,
+        "picture_base_url": "https://dutch.reignofplay.com/sim_players/images",
+        "first_names": ["sam", ...],
+        "words": ["pickle", ...]
+    }
+"""
+
+import json
+import sys
+import time
+import argparse
+import random
+from typing import Dict, Any, List, Iterator, TextIO
+
+# Players generated per chunk. Fixed so that output for a seed never depends on
+# buffering; do not change without accepting that existing seeds produce new data.
+CHUNK_SIZE = 10000
+
+# Usernames get the player index appended to guarantee uniqueness. Starting well
+# above the hand-written players' suffixes (max 3 digits) keeps synthetic players
+# from upserting over the curated set in templates/comp_players.json.
+DEFAULT_START_INDEX = 10000
+
+# Default distributions, derived from templates/comp_players.json
+DEFAULT_PROFILE: Dict[str, Any] = {
+    "rank_weights": {
+        "Beginner": 130,
+        "Novice": 95,
+        "Apprentice": 75,
+        "Skilled": 60,
+        "Advanced": 45,
+        "Expert": 35,
+        "Veteran": 25,
+        "Master": 18,
+        "Elite": 12,
+        "Legend": 5,
+    },
+    "level_bands": {
+        "Beginner": [1, 10],
+        "Novice": [11, 20],
+        "Apprentice": [21, 30],
+        "Skilled": [31, 40],
+        "Advanced": [41, 50],
+        "Expert": [51, 60],
+        "Veteran": [61, 70],
+        "Master": [71, 80],
+        "Elite": [81, 90],
+        "Legend": [91, 100],
+    },
+    "coins": [1000, 1000],
+    "username_styles": {"plain": 6, "dot": 2, "underscore": 2},
+    "picture_pool": 500,
+    "picture_base_url": "https://dutch.reignofplay.com/sim_players/images",
+    "first_names": [
+        "alex", "amy", "ava", "bella", "ben", "chris", "daisy", "ella", "emma", "ethan",
+        "fred", "harry", "ivy", "jack", "james", "jordan", "kate", "lena", "leo", "liam",
+        "lucas", "lucy", "max", "mia", "mike", "milo", "nina", "noah", "oliver", "oscar",
+        "ruby", "ryan", "sam", "sara", "tom", "will", "zoe",
+    ],
+    "words": [
+        "angry", "banana", "bean", "cheese", "duck", "fox", "gremlin", "moose", "noodle",
+        "nugget", "panda", "pickle", "pixel", "sleepy", "spoon", "toast", "tuna", "void",
+        "wizard", "wobbly", "adams", "brown", "clark", "evans", "green", "hill", "king",
+        "morris", "parker", "reed", "scott", "taylor", "turner", "walker", "wood", "young",
+    ],
+}
+
+
+def load_profile(profile_path: str = None) -> Dict[str, Any]:
+    """Load the generation profile, overlaying an optional JSON file on the defaults."""
+    profile = dict(DEFAULT_PROFILE)
+    if profile_path:
+        with open(profile_path, 'r') as f:
+            overrides = json.load(f)
+        unknown = set(overrides) - set(DEFAULT_PROFILE)
+        if unknown:
+            raise ValueError(f"Unknown profile key(s): {', '.join(sorted(unknown))}")
+        profile.update(overrides)
+
+    missing_bands = set(profile['rank_weights']) - set(profile['level_bands'])
+    if missing_bands:
+        raise ValueError(f"No level band for rank(s): {', '.join(sorted(missing_bands))}")
+    for name in ('first_names', 'words'):
+        if not all(w.isalpha() and w.islower() for w in profile[name]):
+            raise ValueError(f"Profile '{name}' must contain lowercase letters only")
+    if profile['picture_pool'] < 1:
+        raise ValueError("Profile 'picture_pool' must be at least 1")
+    return profile
+
+
+def _cumulative(weights: Dict[str, float]):
+    """Return (keys, cumulative weights) for random.choices."""
+    keys = list(weights)
+    cum = []
+    total = 0
+    for key in keys:
+        total += weights[key]
+        cum.append(total)
+    return keys, cum
+
+
+def generate_player_lines(count: int, seed: int, profile: Dict[str, Any], start_index: int = DEFAULT_START_INDEX) -> Iterator[List[str]]:
+    """
+    Yield chunks of serialized players (one JSON object string per player).
+
+    Every random draw is made for a full CHUNK_SIZE block, so player i only depends
+    on the seed and i, never on count.
+    """
+    rng = random.Random(seed)
+
+    ranks, rank_cum = _cumulative(profile['rank_weights'])
+    styles, style_cum = _cumulative(profile['username_styles'])
+    bands = [(profile['level_bands'][r][0], profile['level_bands'][r][1] - profile['level_bands'][r][0] + 1) for r in ranks]
+    rank_idx = list(range(len(ranks)))
+    first_names = profile['first_names']
+    words = profile['words']
+    coins_min, coins_max = profile['coins']
+    picture_pool = profile['picture_pool']
+
+    # Names are validated lowercase ASCII; only the base URL needs JSON escaping
+    picture_prefix = json.dumps(profile['picture_base_url'].rstrip('/') + '/img')[1:-1]
+    pic_width = max(3, len(str(picture_pool - 1)))
+    record = (
+        '{{"username": "{u}", "email": "{u}@cp.com", "level": {lvl}, "rank": "{rank}", '
+        '"coins": {coins}, "first_name": "{fn}", "last_name": "{ln}", '
+        '"picture": "' + picture_prefix + '{pic:0' + str(pic_width) + 'd}.jpg"}}'
+    ).format
+    capitalized_first = {n: n.capitalize() for n in first_names}
+    capitalized_words = {w: w.capitalize() for w in words}
+    separators = {'plain': '', 'dot': '.', 'underscore': '_'}
+    unknown_styles = set(styles) - set(separators)
+    if unknown_styles:
+        raise ValueError(f"Unknown username style(s): {', '.join(sorted(unknown_styles))}")
+
+    produced = 0
+    index = start_index
+    while produced < count:
+        chunk_ranks = rng.choices(rank_idx, cum_weights=rank_cum, k=CHUNK_SIZE)
+        chunk_levels = [rng.random() for _ in range(CHUNK_SIZE)]
+        chunk_firsts = rng.choices(first_names, k=CHUNK_SIZE)
+        chunk_words = rng.choices(words, k=CHUNK_SIZE)
+        chunk_styles = rng.choices(styles, cum_weights=style_cum, k=CHUNK_SIZE)
+        chunk_pics = [rng.randrange(picture_pool) for _ in range(CHUNK_SIZE)]
+        if coins_min == coins_max:
+            chunk_coins = [coins_min] * CHUNK_SIZE
+        else:
+            chunk_coins = [rng.randint(coins_min, coins_max) for _ in range(CHUNK_SIZE)]
+
+        take = min(CHUNK_SIZE, count - produced)
+        lines = []
+        for j in range(take):
+            r = chunk_ranks[j]
+            low, span = bands[r]
+            first = chunk_firsts[j]
+            word = chunk_words[j]
+            lines.append(record(
+                u=f"{first}{separators[chunk_styles[j]]}{word}{index + j}",
+                lvl=low + int(chunk_levels[j] * span),
+                rank=ranks[r],
+                coins=chunk_coins[j],
+                fn=capitalized_first[first],
+                ln=capitalized_words[word],
+                pic=chunk_pics[j],
+            ))
+        yield lines
+        produced += take
+        index += take
+
+
+def write_players(out: TextIO, count: int, seed: int, profile: Dict[str, Any], output_format: str = 'ndjson', start_index: int = DEFAULT_START_INDEX) -> int:
+    """Stream generated players to out as NDJSON or a JSON array. Returns players written."""
+    written = 0
+    if output_format == 'json':
+        out.write('[\n')
+    for lines in generate_player_lines(count, seed, profile, start_index):
+        if output_format == 'json':
+            out.write((',\n' if written else '') + ',\n'.join(lines))
+        else:
+            out.write('\n'.join(lines) + '\n')
+        written += len(lines)
+    if output_format == 'json':
+        out.write('\n]\n')
+    return written
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Generate synthetic computer players for load testing')
+    parser.add_argument('--count', type=int, required=True, help='Number of players to generate')
+    parser.add_argument('--seed', type=int, default=0, help='Random seed (same seed = same players)')
+    parser.add_argument('--output', default='-', help='Output file path (default: stdout)')
+    parser.add_argument('--format', choices=['ndjson', 'json'], default='ndjson',
+                        help='ndjson (one player per line) or json (array, readable by 11_add_players.py)')
+    parser.add_argument('--start-index', type=int, default=DEFAULT_START_INDEX,
+                        help='Index appended to the first username; use disjoint ranges for separate batches')
+    parser.add_argument('--profile', help='JSON file overriding the default distributions')
+
+    args = parser.parse_args()
+
+    if args.count < 0:
+        print("❌ --count must not be negative", file=sys.stderr)
+        sys.exit(1)
+
+    try:
+        profile = load_profile(args.profile)
+    except (OSError, ValueError) as e:
+        print(f"❌ Invalid profile: {e}", file=sys.stderr)
+        sys.exit(1)
+
+    start = time.perf_counter()
+    if args.output == '-':
+        written = write_players(sys.stdout, args.count, args.seed, profile, args.format, args.start_index)
+    else:
+        with open(args.output, 'w', buffering=1024 * 1024) as f:
+            written = write_players(f, args.count, args.seed, profile, args.format, args.start_index)
+    elapsed = time.perf_counter() - start
+
+    rate = written / elapsed if elapsed > 0 else 0
+    print(f"✅ Generated {written} players (seed {args.seed}) in {elapsed:.2f}s ({rate:,.0f} players/s)", file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
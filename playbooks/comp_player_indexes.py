@@ -0,0 +1,159 @@
+"""
+Users index spec and index preflight shared by the comp player seeders
+(00_local/11_add_players.py and rop01/11_add_players.py).
+
+Every upsert filters on `email` and the final verification counts
+`is_comp_player: true`; without indexes both are collection scans. The comp
+player matchmaking index (rank + level, see
+00_local/benchmark_comp_player_queries.py) lets the game server select seeded
+bots efficiently. The database setup playbooks in 00_local/ and rop01/
+(*_setup_apps_database_structure*.yml) create the same indexes; keep
+USER_INDEXES in step with them.
+
+The seeders differ only in how they reach mongosh (docker exec locally, over
+SSH on the VPS), so the functions here take a `run_eval(script)` callable that
+returns the CompletedProcess of a mongosh --eval run.
+"""
+
+import json
+import subprocess
+import sys
+from typing import Any, Callable, Dict
+
+# Proposed index: equality on rank, range on level (ESR order), only over comp players.
+# Queries must include is_comp_player: true for the partial index to be eligible.
+MATCHMAKING_INDEX_KEYS = {'modules.dutch_game.rank': 1, 'modules.dutch_game.level': 1}
+MATCHMAKING_INDEX_OPTIONS = {
+    'name': 'comp_player_rank_level',
+    'partialFilterExpression': {'is_comp_player': True},
+}
+
+# name -> (keys, options, label); an existing index counts when its keys start with `keys`
+USER_INDEXES = {
+    'email': ({'email': 1}, {'unique': True}, 'unique email index'),
+    'comp': ({'is_comp_player': 1},
+             {'name': 'is_comp_player_partial', 'partialFilterExpression': {'is_comp_player': True}},
+             'partial is_comp_player index'),
+    'matchmaking': (MATCHMAKING_INDEX_KEYS, MATCHMAKING_INDEX_OPTIONS, 'comp_player_rank_level index'),
+}
+
+PREFLIGHT_INSPECT_JS = '''db = db.getSiblingDB('%(db)s');
+var indexes = [];
+try { indexes = db.users.getIndexes(); } catch (e) {}
+var t0 = Date.now();
+var count = db.users.countDocuments({ is_comp_player: true });
+var countMs = Date.now() - t0;
+var countPlan = JSON.stringify(db.users.find({ is_comp_player: true }).explain().queryPlanner.winningPlan);
+var emailPlan = JSON.stringify(db.users.find({ email: 'preflight@cp.com' }).explain().queryPlanner.winningPlan);
+print('PREFLIGHT ' + JSON.stringify({
+  indexes: indexes,
+  count: count,
+  count_ms: countMs,
+  count_collscan: countPlan.indexOf('COLLSCAN') >= 0,
+  email_collscan: emailPlan.indexOf('COLLSCAN') >= 0
+}));
+'''
+
+PREFLIGHT_CREATE_JS = '''db = db.getSiblingDB('%(db)s');
+var specs = %(specs)s;
+var results = {};
+Object.keys(specs).forEach(function (name) {
+  try { db.users.createIndex(specs[name][0], specs[name][1]); results[name] = 'created'; }
+  catch (e) { results[name] = 'error: ' + e.message; }
+});
+print('PREFLIGHT_CREATE ' + JSON.stringify(results));
+'''
+
+
+def parse_marker(stdout: str, marker: str) -> Dict[str, Any]:
+    """Return the JSON payload printed by a mongosh script after `marker`."""
+    for line in stdout.split('\n'):
+        if line.startswith(marker + ' '):
+            return json.loads(line[len(marker) + 1:])
+    raise ValueError(f"No {marker} output from mongosh")
+
+
+def create_indexes_js(database: str, names) -> str:
+    """mongosh script creating the USER_INDEXES in names and printing PREFLIGHT_CREATE {name: status}."""
+    specs = {name: [USER_INDEXES[name][0], USER_INDEXES[name][1]] for name in names}
+    return PREFLIGHT_CREATE_JS % {'db': database, 'specs': json.dumps(specs)}
+
+
+def inspect_user_indexes(run_eval: Callable[[str], subprocess.CompletedProcess], database: str) -> Dict[str, Any]:
+    """Inspect db.users indexes and time the comp player verification count."""
+    result = run_eval(PREFLIGHT_INSPECT_JS % {'db': database})
+    info = parse_marker(result.stdout, 'PREFLIGHT')
+    keys = [list(ix.get('key', {})) for ix in info['indexes']]
+    email_index = next((ix for ix, k in zip(info['indexes'], keys) if k[:1] == ['email']), None)
+    info['email_index_unique'] = bool(email_index and email_index.get('unique'))
+    info['missing'] = [name for name, (spec_keys, _, _) in USER_INDEXES.items()
+                       if not any(k[:len(spec_keys)] == list(spec_keys) for k in keys)]
+    return info
+
+
+def preflight_indexes(run_eval: Callable[[str], subprocess.CompletedProcess], database: str,
+                      create_indexes: bool = False, require_indexes: bool = False) -> bool:
+    """
+    Check that the indexes behind the seeding queries exist before upserting.
+
+    Missing indexes are created when `create_indexes` is set (or confirmed
+    interactively). Returns False when seeding should not proceed.
+    """
+    try:
+        info = inspect_user_indexes(run_eval, database)
+    except (subprocess.CalledProcessError, ValueError) as e:
+        error_msg = e.stderr if isinstance(e, subprocess.CalledProcessError) else str(e)
+        print(f"⚠️  Error inspecting users indexes: {error_msg}", file=sys.stderr)
+        return not require_indexes
+
+    print(f"   {len(info['indexes'])} index(es) on users; comp player count {info['count']} took {info['count_ms']} ms"
+          f"{' (collection scan)' if info['count_collscan'] else ''}")
+
+    missing = info['missing']
+    if 'email' not in missing and not info['email_index_unique']:
+        print("⚠️  Email index exists but is not unique; duplicate players are possible")
+    if 'email' in missing:
+        print("⚠️  No index on users.email: every upsert will be a collection scan")
+    if 'comp' in missing:
+        print("⚠️  No index on users.is_comp_player: comp player counts will be a collection scan")
+    if 'matchmaking' in missing:
+        print("⚠️  No comp_player_rank_level index: bot selection by rank and level will scan all comp players")
+
+    if not missing:
+        print("✅ Seeding indexes present")
+        return True
+
+    if not create_indexes and sys.stdin.isatty():
+        response = input("Create missing indexes (unique email, partial is_comp_player, matchmaking)? (y/n): ").strip().lower()
+        create_indexes = response == 'y'
+
+    if not create_indexes:
+        if require_indexes and 'email' in missing:
+            print("❌ Email index missing; re-run with --create-indexes or run the setup playbook", file=sys.stderr)
+            return False
+        return True
+
+    try:
+        result = run_eval(create_indexes_js(database, missing))
+        created = parse_marker(result.stdout, 'PREFLIGHT_CREATE')
+    except (subprocess.CalledProcessError, ValueError) as e:
+        error_msg = e.stderr if isinstance(e, subprocess.CalledProcessError) else str(e)
+        print(f"❌ Error creating indexes: {error_msg}", file=sys.stderr)
+        return not require_indexes
+
+    for name, (_, _, label) in USER_INDEXES.items():
+        if name in created:
+            status = created[name]
+            print(f"  {'✅' if status == 'created' else '❌'} {label}: {status}")
+
+    if require_indexes and created.get('email', 'created') != 'created':
+        return False
+
+    # Re-time the verification count now that the index exists
+    try:
+        after = inspect_user_indexes(run_eval, database)
+        print(f"   Comp player count now takes {after['count_ms']} ms (was {info['count_ms']} ms)"
+              f"{' (collection scan)' if after['count_collscan'] else ''}")
+    except (subprocess.CalledProcessError, ValueError):
+        pass
+    return True
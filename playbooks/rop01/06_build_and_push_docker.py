@@ -2,15 +2,27 @@
 """
 Build and Push Docker Image Script
 This script builds the Flask app Docker image and pushes it to Docker Hub.
-It temporarily comments out custom_log() calls during the build process.
+The build context is streamed to `docker build -` as a tar archive in which
+custom_log() calls are stripped from the Python sources and the secrets hold
+the VPS values; the python_base_04 working tree itself is never modified.
+The build is skipped when an image built from the same effective context
+already exists (see build_context.py for the context hash and BUILD_CACHE).
 """
 
+import ast
 import os
-import re
 import subprocess
 import sys
 from pathlib import Path
-from typing import List, Tuple, Optional
+from typing import Dict, List, Optional, Tuple
+
+from build_context import (build_command, context_budget_error, context_size, find_image_with_hash, hash_context,
+                           iter_context_files, load_dockerignore, run_build)
+from build_telemetry import BuildTelemetry
+from build_transform_cache import transform_files
+from image_layers import check_image_size
+from image_push import push_image
+from startup_gate import run_startup_gate
 
 # Colors for output
 class Colors:
@@ -26,237 +38,115 @@ PROJECT_ROOT = SCRIPT_DIR.parent.parent
 
 # Configuration
 DOCKER_USERNAME = os.environ.get('DOCKER_USERNAME', 'silvella')
+# Registry host to push to instead of Docker Hub (e.g. localhost:5000 for a local stand-in)
+DOCKER_REGISTRY = os.environ.get('DOCKER_REGISTRY', '')
 IMAGE_NAME = 'dutch_flask_app'
 IMAGE_TAG = os.environ.get('IMAGE_TAG', 'latest')
+IMAGE_REPO = f'{DOCKER_REGISTRY}/{DOCKER_USERNAME}/{IMAGE_NAME}' if DOCKER_REGISTRY else f'{DOCKER_USERNAME}/{IMAGE_NAME}'
 DOCKERFILE_PATH = PROJECT_ROOT / 'python_base_04' / 'Dockerfile'
 BUILD_CONTEXT = PROJECT_ROOT / 'python_base_04'
 
-# Track modified files for restoration
-modified_files = []
+# Per-phase timings of this run, appended to the build history (see build_telemetry.py)
+TELEMETRY = BuildTelemetry('flask', f"{IMAGE_REPO}:{IMAGE_TAG}", BUILD_CONTEXT)
 
-# Track secret file backups for restoration
-secret_backups = {}
+# Secret files whose content is replaced with VPS values inside the build context
+SECRETS_DIR = BUILD_CONTEXT / 'secrets'
 
-def get_indentation(line: str) -> str:
-    """Get the leading whitespace (indentation) from a line."""
-    match = re.match(r'^(\s*)', line)
-    return match.group(1) if match else ''
+# Name of the logging helper whose calls are stripped from the production image
+CUSTOM_LOG_NAME = 'custom_log'
+# Bump when strip_custom_logs() output changes, to invalidate cached results
+CUSTOM_LOG_TRANSFORM_VERSION = 1
 
-def is_control_flow_line(line: str) -> bool:
-    """Check if a line is a control flow statement (if, else, for, while, try, except, finally)."""
-    stripped = line.strip()
-    # Match control flow keywords followed by optional whitespace, optional content, and then a colon
-    # This handles both "else:" and "elif condition:" cases
-    return bool(re.match(r'^(if|else|elif|for|while|try|except|finally)(\s.*)?:', stripped))
+def _is_custom_log_statement(node: ast.AST) -> bool:
+    """Check if a statement is a bare custom_log(...) call."""
+    return (isinstance(node, ast.Expr)
+            and isinstance(node.value, ast.Call)
+            and isinstance(node.value.func, ast.Name)
+            and node.value.func.id == CUSTOM_LOG_NAME)
 
-def is_only_statement_in_block(lines: List[str], index: int) -> bool:
-    """Check if the custom_log line at index is the only statement in its block, or if all statements in the block are custom_log calls.
-    Returns True if this is the FIRST custom_log call in a block that contains ONLY custom_log calls."""
-    if index == 0:
-        return False
-    
-    current_line = lines[index]
-    current_indent = get_indentation(current_line)
-    
-    # Find the control flow statement by looking backwards through comments and empty lines
-    # The control flow statement should be at LESS indentation than the custom_log line
-    control_flow_index = None
-    for i in range(index - 1, -1, -1):
-        check_line = lines[i]
-        check_indent = get_indentation(check_line)
-        check_stripped = check_line.strip()
-        
-        # Skip empty lines and comments
-        if not check_stripped or check_stripped.startswith('#'):
-            continue
-        
-        # If we've gone back to a line with less indentation, check if it's a control flow statement
-        if len(check_indent) < len(current_indent):
-            if is_control_flow_line(check_stripped):
-                control_flow_index = i
-                break
-            # If it's not a control flow and has less indentation, we've gone too far
-            break
-    
-    if control_flow_index is None:
-        return False
-    
-    prev_line = lines[control_flow_index].rstrip()
-    prev_indent = get_indentation(lines[control_flow_index])
-    
-    # Check if this is the FIRST custom_log call in the block
-    # Look backwards from this custom_log to see if there are any other custom_log calls
-    # at the same indentation level before this one
-    is_first_custom_log = True
-    for i in range(index - 1, control_flow_index, -1):
-        check_line = lines[i]
-        check_indent = get_indentation(check_line)
-        check_stripped = check_line.strip()
-        
-        # Skip empty lines and comments
-        if not check_stripped or check_stripped.startswith('#'):
-            continue
-        
-        # If we've gone back to the control flow line or beyond, we're at the start
-        if len(check_indent) <= len(prev_indent):
-            break
-        
-        # If we find another custom_log call at the same indentation level, this is not the first
-        if len(check_indent) == len(current_indent) and re.match(r'^\s*custom_log\(', check_line):
-            is_first_custom_log = False
-            break
-    
-    if not is_first_custom_log:
-        return False
-    
-    # Now check if all subsequent lines in this block are custom_log calls or empty
-    # (until we hit a line with same or less indentation as the control flow line)
-    i = index + 1
-    found_non_custom_log = False
-    while i < len(lines):
-        next_line = lines[i]
-        next_indent = get_indentation(next_line)
-        
-        # If we've reached the end of the block (same or less indentation as control flow line)
-        if len(next_indent) <= len(prev_indent) and next_line.strip():
-            break
-        
-        # If the line is not empty and not a custom_log call, this block has other statements
-        if next_line.strip() and not re.match(r'^\s*custom_log\(', next_line):
-            found_non_custom_log = True
-            break
-        
-        i += 1
-    
-    # If we found non-custom_log statements, this is not the only statement type
-    if found_non_custom_log:
-        return False
-    
-    # If we get here, all statements in the block are custom_log calls (or empty)
-    # AND this is the first custom_log call in the block
-    # So we should replace this one with 'pass' to avoid empty block
-    return True
+def strip_custom_logs(source: str, filename: str = '<unknown>') -> Tuple[str, int]:
+    """Remove custom_log(...) statements from Python source in a single pass.
 
-def comment_custom_logs():
-    """Comment out custom_log() calls in all Python files."""
-    print(f"\n{Colors.BLUE}Commenting out custom_log() calls...{Colors.NC}")
-    
-    modified_files_count = 0
-    total_lines_count = 0
-    
-    # Paths to skip (keep full logging to avoid syntax issues)
-    skip_paths = [
-        BUILD_CONTEXT / 'core' / 'modules' / 'user_management_module',
-        BUILD_CONTEXT / 'core' / 'modules' / 'analytics_module',
-        BUILD_CONTEXT / 'app.py',
-    ]
-    
-    # Find all Python files
-    for py_file in BUILD_CONTEXT.rglob('*.py'):
-        # Skip known-problematic modules to keep their logging intact
-        if any(str(skip_path) in str(py_file) for skip_path in skip_paths):
-            continue
-        try:
-            with open(py_file, 'r', encoding='utf-8') as f:
-                lines = f.readlines()
-            
-            modified_lines = []
-            file_modified = False
-            lines_in_file = 0
-            
-            for i, line in enumerate(lines):
-                # Check if line starts with custom_log( and is not already commented
-                if re.match(r'^\s*custom_log\(', line) and not re.match(r'^\s*#', line):
-                    indent = get_indentation(line)
-                    after_indent = line[len(indent):].lstrip()
-                    
-                    # Check if this is the only statement in a block
-                    should_replace_with_pass = is_only_statement_in_block(lines, i)
-                    if should_replace_with_pass:
-                        # Replace with: pass  # custom_log(...)
-                        new_line = f"{indent}pass  # {after_indent}"
-                        modified_lines.append(new_line)
-                        file_modified = True
-                        lines_in_file += 1
-                    else:
-                        # Just comment out: add # right before custom_log
-                        new_line = f"{indent}#{after_indent}"
-                        modified_lines.append(new_line)
-                        file_modified = True
-                        lines_in_file += 1
-                else:
-                    modified_lines.append(line)
-            
-            if file_modified:
-                # Write back the modified content
-                with open(py_file, 'w', encoding='utf-8') as f:
-                    f.writelines(modified_lines)
-                
-                modified_files.append(py_file)
-                modified_files_count += 1
-                total_lines_count += lines_in_file
-                rel_path = py_file.relative_to(BUILD_CONTEXT)
-                print(f"  {Colors.GREEN}✓{Colors.NC} Modified {rel_path} ({lines_in_file} lines)")
-        
-        except Exception as e:
-            print(f"  {Colors.RED}✗{Colors.NC} Error processing {py_file}: {e}")
-    
-    print(f"{Colors.GREEN}✓ Commented out {total_lines_count} custom_log() calls in {modified_files_count} files{Colors.NC}")
+    Statements are located with ast, so calls spanning several lines are
+    handled. A statement on lines of its own is blanked (line numbers in
+    tracebacks stay the same); one sharing a line with other code is replaced
+    by `pass`. `pass` is also kept for the first call of any block that would
+    otherwise be left empty. The result is compiled before it is returned.
 
-def uncomment_custom_logs():
-    """Restore custom_log() calls in all modified files."""
-    print(f"\n{Colors.BLUE}Restoring custom_log() calls...{Colors.NC}")
-    
-    modified_files_count = 0
-    total_lines_count = 0
-    
-    # Process all Python files (in case some were missed)
-    for py_file in BUILD_CONTEXT.rglob('*.py'):
-        try:
-            with open(py_file, 'r', encoding='utf-8') as f:
-                lines = f.readlines()
-            
-            modified_lines = []
-            file_modified = False
-            lines_in_file = 0
-            
-            for line in lines:
-                # Check if line is: pass  # custom_log(...)
-                match = re.match(r'^(\s*)pass\s+#\s+(custom_log\(.*)$', line.rstrip())
-                if match:
-                    indent = match.group(1)
-                    custom_log_part = match.group(2)
-                    # Restore to: custom_log(...)
-                    new_line = f"{indent}{custom_log_part}\n"
-                    modified_lines.append(new_line)
-                    file_modified = True
-                    lines_in_file += 1
-                # Check if line is: #custom_log(...)
-                elif re.match(r'^\s*#custom_log\(', line):
-                    indent = get_indentation(line)
-                    # Remove the # to uncomment
-                    after_hash = line[len(indent) + 1:]  # Skip indent and #
-                    new_line = f"{indent}{after_hash}"
-                    modified_lines.append(new_line)
-                    file_modified = True
-                    lines_in_file += 1
-                else:
-                    modified_lines.append(line)
-            
-            if file_modified:
-                # Write back the modified content
-                with open(py_file, 'w', encoding='utf-8') as f:
-                    f.writelines(modified_lines)
-                
-                modified_files_count += 1
-                total_lines_count += lines_in_file
-                rel_path = py_file.relative_to(BUILD_CONTEXT)
-                print(f"  {Colors.GREEN}✓{Colors.NC} Restored {rel_path} ({lines_in_file} lines)")
-        
-        except Exception as e:
-            print(f"  {Colors.RED}✗{Colors.NC} Error processing {py_file}: {e}")
-    
-    print(f"{Colors.GREEN}✓ Restored {total_lines_count} custom_log() calls in {modified_files_count} files{Colors.NC}")
+    Returns (new_source, number of calls removed). Raises SyntaxError if the
+    source does not parse.
+    """
+    if CUSTOM_LOG_NAME not in source:
+        return source, 0
+
+    tree = ast.parse(source, filename)
+    edits = []  # (statement, keep `pass`)
+    for node in ast.walk(tree):
+        for field in ('body', 'orelse', 'finalbody'):
+            block = getattr(node, field, None)
+            if not isinstance(block, list) or not block or not isinstance(block[0], ast.stmt):
+                continue
+            logs = [stmt for stmt in block if _is_custom_log_statement(stmt)]
+            block_emptied = len(logs) == len(block)
+            for i, stmt in enumerate(logs):
+                edits.append((stmt, block_emptied and i == 0))
+    if not edits:
+        return source, 0
+
+    # ast column offsets are UTF-8 byte offsets, so edit the encoded lines.
+    # Apply from the end of the file backwards so earlier offsets stay valid.
+    lines = source.encode('utf-8').splitlines(keepends=True)
+    for stmt, keep_pass in sorted(edits, key=lambda e: (e[0].lineno, e[0].col_offset), reverse=True):
+        first, last = stmt.lineno - 1, stmt.end_lineno - 1
+        prefix = lines[first][:stmt.col_offset]
+        suffix = lines[last][stmt.end_col_offset:]
+        rest = suffix.strip()
+        if not prefix.strip() and (not rest or rest.startswith(b'#')):
+            # Alone on its lines: blank them, keeping each line's line ending
+            for i in range(first, last + 1):
+                ending = lines[i][len(lines[i].rstrip(b'\r\n')):]
+                lines[i] = ending
+            if keep_pass:
+                lines[first] = prefix + b'pass' + lines[first]
+        else:
+            lines[first:last + 1] = [prefix + b'pass' + suffix]
+
+    new_source = b''.join(lines).decode('utf-8')
+    compile(new_source, filename, 'exec', dont_inherit=True)
+    return new_source, len(edits)
+
+def prepare_build_context(overrides: Dict[str, bytes]) -> Tuple[List[Tuple[Path, str, Optional[bytes]]], Dict[str, float]]:
+    """Collect the effective build context without modifying BUILD_CONTEXT.
+
+    Returns ([(path, relative path, content)], stats): content replaces the
+    file on disk (None: used as is). Python files have their custom_log()
+    calls stripped (in parallel, cached by content hash, see
+    build_transform_cache) and files listed in overrides (context-relative
+    path -> content) are replaced.
+    """
+    rules = load_dockerignore(BUILD_CONTEXT)
+    context_files = list(iter_context_files(BUILD_CONTEXT, rules))
+    py_files = [path for path, rel_path in context_files
+                if path.suffix == '.py' and rel_path not in overrides and not path.is_symlink() and path.is_file()]
+    stripped, stats = transform_files(py_files, strip_custom_logs, 'custom_log_strip',
+                                      CUSTOM_LOG_TRANSFORM_VERSION, base=BUILD_CONTEXT)
+    stats['calls'] = sum(calls for _, calls in stripped.values())
+    
+    dockerfile_rel = DOCKERFILE_PATH.relative_to(BUILD_CONTEXT).as_posix()
+    context = []
+    for path, rel_path in context_files:
+        if rel_path == dockerfile_rel:
+            continue
+        if rel_path in overrides:
+            data = overrides[rel_path]
+        elif path in stripped:
+            data = stripped[path][0]
+        else:
+            data = None
+        context.append((path, rel_path, data))
+    # The Dockerfile is always sent, even when .dockerignore lists it
+    context.append((DOCKERFILE_PATH, dockerfile_rel, None))
+    return context, stats
 
 def load_env_file(env_path: Path) -> dict:
     """Load environment variables from .env file."""
@@ -270,11 +160,10 @@ def load_env_file(env_path: Path) -> dict:
                     env_vars[key.strip()] = value.strip()
     return env_vars
 
-def backup_and_update_secrets():
-    """Backup local secret values and update with VPS values from .env."""
-    print(f"\n{Colors.BLUE}Updating secrets for VPS Docker build...{Colors.NC}")
+def vps_secret_overrides() -> Dict[str, bytes]:
+    """Return build context overrides replacing local secret values with the VPS values from .env."""
+    print(f"\n{Colors.BLUE}Preparing secrets for VPS Docker build...{Colors.NC}")
     
-    secrets_dir = PROJECT_ROOT / 'python_base_04' / 'secrets'
     env_file = PROJECT_ROOT / '.env'
     
     # Load VPS values from .env
@@ -295,42 +184,17 @@ def backup_and_update_secrets():
         'redis_port': vps_env.get('VPS_REDIS_PORT', '6379')
     }
     
-    # Backup and update each secret file
+    overrides = {}
     for secret_name, vps_value in secrets_to_update.items():
-        secret_path = secrets_dir / secret_name
+        secret_path = SECRETS_DIR / secret_name
         if secret_path.exists():
-            # Backup current value
-            with open(secret_path, 'r') as f:
-                secret_backups[secret_name] = f.read().strip()
-            
-            # Update with VPS value
-            with open(secret_path, 'w') as f:
-                f.write(vps_value + '\n')
-            
-            print(f"  {Colors.GREEN}✓{Colors.NC} Updated {secret_name}: {secret_backups[secret_name]} → {vps_value}")
+            local_value = secret_path.read_text().strip()
+            overrides[secret_path.relative_to(BUILD_CONTEXT).as_posix()] = (vps_value + '\n').encode('utf-8')
+            print(f"  {Colors.GREEN}✓{Colors.NC} {secret_name}: {local_value} → {vps_value} (in build context only)")
         else:
             print(f"  {Colors.YELLOW}⚠️  {secret_name} not found, skipping{Colors.NC}")
     
-    print(f"{Colors.GREEN}✓ Secrets updated for VPS Docker build{Colors.NC}")
-
-def restore_secrets():
-    """Restore local secret values from backup."""
-    if not secret_backups:
-        return
-    
-    print(f"\n{Colors.BLUE}Restoring local secret values...{Colors.NC}")
-    
-    secrets_dir = PROJECT_ROOT / 'python_base_04' / 'secrets'
-    
-    for secret_name, local_value in secret_backups.items():
-        secret_path = secrets_dir / secret_name
-        if secret_path.exists():
-            with open(secret_path, 'w') as f:
-                f.write(local_value + '\n')
-            print(f"  {Colors.GREEN}✓{Colors.NC} Restored {secret_name}: {local_value}")
-    
-    secret_backups.clear()
-    print(f"{Colors.GREEN}✓ Local secrets restored{Colors.NC}")
+    return overrides
 
 def check_docker():
     """Check if Docker is running."""
@@ -343,9 +207,9 @@ def check_docker():
     except (subprocess.CalledProcessError, FileNotFoundError):
         return False
 
-def build_and_push():
-    """Build and push the Docker image."""
-    full_image_name = f"{DOCKER_USERNAME}/{IMAGE_NAME}:{IMAGE_TAG}"
+def build_and_push(overrides: Dict[str, bytes]):
+    """Build and push the Docker image (overrides: see prepare_build_context)."""
+    full_image_name = f"{IMAGE_REPO}:{IMAGE_TAG}"
     
     print(f"\n{Colors.BLUE}Configuration:{Colors.NC}")
     print(f"  Docker Username: {DOCKER_USERNAME}")
@@ -362,52 +226,104 @@ def build_and_push():
         response = input("Proceed with build and push? (y/n): ").strip().lower()
         if response != 'y':
             print(f"{Colors.YELLOW}Build cancelled.{Colors.NC}")
+            TELEMETRY.note(cancelled=True)
             return False
     else:
         # Non-interactive mode - auto-confirm
         print("Non-interactive mode: Auto-confirming build and push...")
     
-    # Build the Docker image
-    print(f"\n{Colors.BLUE}Building Docker image...{Colors.NC}")
-    build_cmd = [
-        'docker', 'build',
-        '-f', str(DOCKERFILE_PATH),
-        '-t', full_image_name,
-        str(BUILD_CONTEXT)
-    ]
-    
-    try:
-        subprocess.run(build_cmd, check=True)
-        print(f"{Colors.GREEN}✓ Docker image built successfully{Colors.NC}")
-    except subprocess.CalledProcessError as e:
-        print(f"{Colors.RED}✗ Docker build failed{Colors.NC}")
+    # The transformed context is prepared up front so its hash can be checked
+    # against the existing image before anything is built
+    with TELEMETRY.phase('log_stripping'):
+        context, stats = prepare_build_context(overrides)
+    TELEMETRY.note(stripped_calls=stats['calls'], transformed=stats['transformed'], transform_cached=stats['cached'])
+    print(f"\n{Colors.BLUE}Build context:{Colors.NC}")
+    print(f"  {len(context)} entries; stripped {stats['calls']} custom_log() calls in {stats['changed']} files")
+    print(f"  Log stripping: {stats['transformed']} Python files transformed, {stats['cached']} from cache "
+          f"({stats['seconds']:.2f}s)")
+    if stats['errors']:
+        print(f"  {Colors.YELLOW}⚠️  {stats['errors']} file(s) could not be parsed and kept their logging{Colors.NC}")
+    
+    size = context_size(context)
+    print(f"  Size: {size / 1e6:.1f} MB")
+    TELEMETRY.note(context_files=len(context), context_bytes=size)
+    budget_error = context_budget_error(size)
+    if budget_error:
+        print(f"{Colors.RED}✗ Refusing to build: {budget_error}{Colors.NC}")
         return False
     
-    # Tag as latest if a different tag was used
-    if IMAGE_TAG != 'latest':
-        print(f"\n{Colors.BLUE}Tagging as latest...{Colors.NC}")
-        latest_tag = f"{DOCKER_USERNAME}/{IMAGE_NAME}:latest"
-        subprocess.run(['docker', 'tag', full_image_name, latest_tag], check=True)
-        print(f"{Colors.GREEN}✓ Tagged as latest{Colors.NC}")
+    with TELEMETRY.phase('context_hash'):
+        context_hash = hash_context([(rel_path, path, data) for path, rel_path, data in context],
+                                    DOCKERFILE_PATH.read_bytes(), 'flask_build')
+    print(f"  Context hash: {context_hash[:12]}")
+    
+    with TELEMETRY.phase('cache_lookup'):
+        found = find_image_with_hash(full_image_name, context_hash)
+    TELEMETRY.note(context_hash=context_hash, cache=f"hit-{found}" if found else 'miss')
+    if found == 'registry':
+        print(f"{Colors.GREEN}✓ Build cache hit: {full_image_name} in the registry was built from this context, "
+              f"skipping build{Colors.NC}")
+    elif found == 'local':
+        print(f"{Colors.GREEN}✓ Build cache hit: local {full_image_name} was built from this context, "
+              f"skipping build{Colors.NC}")
+    else:
+        # Build the Docker image from the transformed context streamed on stdin;
+        # the source tree itself is never modified
+        print(f"\n{Colors.BLUE}Build cache miss: building Docker image (custom_log() calls stripped in the streamed context)...{Colors.NC}")
+        latest_image = f"{IMAGE_REPO}:latest"
+        build_cmd, build_env = build_command(full_image_name, latest_image,
+                                             DOCKERFILE_PATH.relative_to(BUILD_CONTEXT).as_posix(), '-', context_hash)
+        
+        with TELEMETRY.phase('docker_build'):
+            build_stats = run_build(build_cmd, build_env, context)
+        if build_stats is None:
+            print(f"{Colors.RED}✗ Docker build failed{Colors.NC}")
+            return False
+        print(f"{Colors.GREEN}✓ Docker image built successfully in {build_stats['seconds']:.1f}s{Colors.NC}")
+        print(f"  Context: {build_stats['context_files']} files, {build_stats['bytes'] / 1e6:.1f} MB; "
+              f"layer cache: {build_stats['cached']}/{build_stats['steps']} steps reused")
+        TELEMETRY.note(build_steps=build_stats['steps'], build_steps_cached=build_stats['cached'])
+    
+    # Layer sizes by Dockerfile instruction; IMAGE_BUDGET_MB / IMAGE_GROWTH_BUDGET_MB block the push
+    # (skipped on a registry hit: the local tag may hold a different image)
+    print(f"\n{Colors.BLUE}Image size report:{Colors.NC}")
+    if found == 'registry':
+        print("  Image in the registry was built from this context, skipping the size check")
+    else:
+        with TELEMETRY.phase('size_check'):
+            size_record = check_image_size(full_image_name, log=lambda message: print(f"  {message}"),
+                                           context_hash=context_hash)
+        if size_record is None:
+            print(f"{Colors.RED}✗ Refusing to push: image over budget{Colors.NC}")
+            return False
     
-    # Push to Docker Hub
-    print(f"\n{Colors.BLUE}Pushing to Docker Hub...{Colors.NC}")
-    try:
-        subprocess.run(['docker', 'push', full_image_name], check=True)
-        print(f"{Colors.GREEN}✓ Image pushed successfully{Colors.NC}")
-    except subprocess.CalledProcessError as e:
-        print(f"{Colors.RED}✗ Push failed. Make sure you're logged in: docker login{Colors.NC}")
+    # Optional: run the image with stand-in Mongo/Redis and compare startup/latency with the last run
+    if os.environ.get('STARTUP_GATE') == '1':
+        print(f"\n{Colors.BLUE}Startup gate:{Colors.NC}")
+        if found == 'registry':
+            print("  Image in the registry was built from this context, skipping the gate")
+        else:
+            with TELEMETRY.phase('startup_gate'):
+                gate_record = run_startup_gate(full_image_name, SECRETS_DIR, log=lambda message: print(f"  {message}"))
+            if gate_record is None:
+                print(f"{Colors.RED}✗ Refusing to push: startup gate failed{Colors.NC}")
+                return False
+            TELEMETRY.note(startup_seconds=gate_record['startup_seconds'], p95_ms=gate_record.get('p95_ms'))
+    
+    # Push only what the registry does not already hold; latest is re-pointed
+    # registry-side instead of being pushed a second time
+    print(f"\n{Colors.BLUE}Pushing to registry...{Colors.NC}")
+    with TELEMETRY.phase('push'):
+        record = push_image(full_image_name, aliases=[f"{IMAGE_REPO}:latest"], log=lambda message: print(f"  {message}"),
+                            context_hash=context_hash, registry_hit=found == 'registry')
+    if record is None:
+        print(f"{Colors.RED}✗ Push failed{Colors.NC}")
         return False
-    
-    # Push latest tag if different
-    if IMAGE_TAG != 'latest':
-        print(f"\n{Colors.BLUE}Pushing latest tag...{Colors.NC}")
-        latest_tag = f"{DOCKER_USERNAME}/{IMAGE_NAME}:latest"
-        try:
-            subprocess.run(['docker', 'push', latest_tag], check=True)
-            print(f"{Colors.GREEN}✓ Latest tag pushed successfully{Colors.NC}")
-        except subprocess.CalledProcessError:
-            pass
+    # Re-pointing latest is reported as its own phase
+    TELEMETRY.add_phase('push', -record['retag_seconds'])
+    TELEMETRY.add_phase('tag', record['retag_seconds'])
+    TELEMETRY.note(digest=record['digest'], pushed=record['pushed'], compressed_bytes=record['pushed_bytes'] or record['skipped_bytes'])
+    print(f"{Colors.GREEN}✓ {full_image_name} is in the registry{Colors.NC}")
     
     return True
 
@@ -420,44 +336,36 @@ def main():
         print(f"{Colors.RED}Error: Docker is not running. Please start Docker and try again.{Colors.NC}")
         sys.exit(1)
     
+    status = 'failed'
     try:
-        # Backup and update secrets for VPS Docker build
-        backup_and_update_secrets()
-        
-        # Comment out custom_log calls
-        comment_custom_logs()
+        # VPS secret values are swapped in inside the streamed build context
+        with TELEMETRY.phase('secrets_swap'):
+            overrides = vps_secret_overrides()
         
         # Build and push
-        success = build_and_push()
+        success = build_and_push(overrides)
         
         if not success:
-            # Restore even if build failed
-            uncomment_custom_logs()
-            restore_secrets()
             sys.exit(1)
-        
-        # Restore custom_log calls after successful build and push
-        uncomment_custom_logs()
-        
-        # Restore local secret values
-        restore_secrets()
+        status = 'ok'
         
         print(f"\n{Colors.GREEN}=== Build and Push Complete ==={Colors.NC}")
-        print(f"Image available at: {Colors.BLUE}{DOCKER_USERNAME}/{IMAGE_NAME}:{IMAGE_TAG}{Colors.NC}")
+        print(f"Image available at: {Colors.BLUE}{IMAGE_REPO}:{IMAGE_TAG}{Colors.NC}")
         print(f"\nTo use this image, update docker-compose.yml:")
-        print(f"  image: {DOCKER_USERNAME}/{IMAGE_NAME}:{IMAGE_TAG}")
+        print(f"  image: {IMAGE_REPO}:{IMAGE_TAG}")
         print()
     
     except KeyboardInterrupt:
-        print(f"\n{Colors.YELLOW}Interrupted. Restoring files...{Colors.NC}")
-        uncomment_custom_logs()
-        restore_secrets()
+        # Nothing to restore: the source tree is never modified
+        status = 'interrupted'
+        print(f"\n{Colors.YELLOW}Interrupted.{Colors.NC}")
         sys.exit(1)
     except Exception as e:
         print(f"\n{Colors.RED}Error: {e}{Colors.NC}")
-        uncomment_custom_logs()
-        restore_secrets()
         sys.exit(1)
+    finally:
+        if not TELEMETRY.record.get('cancelled'):
+            TELEMETRY.finish(status)
 
 if __name__ == '__main__':
     main()
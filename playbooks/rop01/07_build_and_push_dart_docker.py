@@ -2,13 +2,41 @@
 """
 Build and Push Docker Image Script for Dart Game Server
 This script builds the Dart WebSocket server Docker image and pushes it to Docker Hub.
+
+The dart_bkend_base_01 working tree is never modified. The build context is
+streamed to `docker build -` with LOGGING_SWITCH forced off in the Dart
+sources, and the production profile (deck_config testing_mode=false,
+predefined_hands enabled=false) is applied as an overlay: the two YAML files
+are left out of the main context and copied from a separate `profile` build
+context in a layer appended to the end of the Dockerfile. Editing or switching
+the profile therefore only rebuilds that last layer, never `dart compile`.
+LOGGING_SWITCH is a compile-time const, so it necessarily stays part of the
+compiled sources (the transformed output is identical on every run, so it
+does not invalidate the cache either).
 """
 
 import os
 import re
 import subprocess
 import sys
+import tempfile
 from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from build_context import (
+    build_command,
+    context_budget_error,
+    context_size,
+    find_image_with_hash,
+    hash_context,
+    iter_context_files,
+    load_dockerignore,
+    run_build,
+)
+from build_telemetry import BuildTelemetry
+from build_transform_cache import transform_files
+from image_layers import check_image_size
+from image_push import push_image
 
 
 class Colors:
@@ -24,111 +52,110 @@ PROJECT_ROOT = SCRIPT_DIR.parent.parent
 
 # Configuration
 DOCKER_USERNAME = os.environ.get("DOCKER_USERNAME", "silvella")
+# Registry host to push to instead of Docker Hub (e.g. localhost:5000 for a local stand-in)
+DOCKER_REGISTRY = os.environ.get("DOCKER_REGISTRY", "")
 IMAGE_NAME = "dutch_dart_game_server"
 IMAGE_TAG = os.environ.get("IMAGE_TAG", "latest")
+IMAGE_REPO = f"{DOCKER_REGISTRY}/{DOCKER_USERNAME}/{IMAGE_NAME}" if DOCKER_REGISTRY else f"{DOCKER_USERNAME}/{IMAGE_NAME}"
 DOCKERFILE_PATH = PROJECT_ROOT / "dart_bkend_base_01" / "Dockerfile"
 BUILD_CONTEXT = PROJECT_ROOT / "dart_bkend_base_01"
 
-# Config files to set to production values before build (backed up and restored after)
+# Per-phase timings of this run, appended to the build history (see build_telemetry.py)
+TELEMETRY = BuildTelemetry("dart", f"{IMAGE_REPO}:{IMAGE_TAG}", BUILD_CONTEXT)
+
+# Config files shipped with production values through the profile overlay
 DECK_CONFIG_PATH = BUILD_CONTEXT / "lib" / "modules" / "dutch_game" / "config" / "deck_config.yaml"
 PREDEFINED_HANDS_PATH = BUILD_CONTEXT / "lib" / "modules" / "dutch_game" / "config" / "predefined_hands.yaml"
 
-_config_backups = {}  # path -> original content
-
-
-def set_production_config() -> None:
-    """Set deck_config testing_mode to false and predefined_hands enabled to false for production build."""
-    print(f"\n{Colors.BLUE}Setting production config (testing_mode=false, predefined_hands enabled=false)...{Colors.NC}")
-
-    # deck_config.yaml: deck_settings.testing_mode: true -> false
-    if DECK_CONFIG_PATH.exists():
-        try:
-            text = DECK_CONFIG_PATH.read_text(encoding="utf-8")
-            _config_backups[str(DECK_CONFIG_PATH)] = text
-            new_text = re.sub(r"(\s*testing_mode:\s*)true\b", r"\1false", text)
-            if new_text != text:
-                DECK_CONFIG_PATH.write_text(new_text, encoding="utf-8")
-                print(f"  {Colors.GREEN}✓{Colors.NC} {DECK_CONFIG_PATH.relative_to(BUILD_CONTEXT)}: testing_mode → false")
-            else:
-                print(f"  {Colors.GREEN}✓{Colors.NC} {DECK_CONFIG_PATH.relative_to(BUILD_CONTEXT)}: testing_mode already false")
-        except Exception as e:
-            print(f"  {Colors.RED}✗{Colors.NC} Error updating {DECK_CONFIG_PATH.relative_to(BUILD_CONTEXT)}: {e}")
-    else:
-        print(f"  {Colors.YELLOW}⚠{Colors.NC} {DECK_CONFIG_PATH.relative_to(BUILD_CONTEXT)} not found, skipping")
-
-    # predefined_hands.yaml: enabled: true -> false
-    if PREDEFINED_HANDS_PATH.exists():
-        try:
-            text = PREDEFINED_HANDS_PATH.read_text(encoding="utf-8")
-            _config_backups[str(PREDEFINED_HANDS_PATH)] = text
-            new_text = re.sub(r"^(\s*enabled:\s*)true\b", r"\1false", text, flags=re.MULTILINE)
-            if new_text != text:
-                PREDEFINED_HANDS_PATH.write_text(new_text, encoding="utf-8")
-                print(f"  {Colors.GREEN}✓{Colors.NC} {PREDEFINED_HANDS_PATH.relative_to(BUILD_CONTEXT)}: enabled → false")
-            else:
-                print(f"  {Colors.GREEN}✓{Colors.NC} {PREDEFINED_HANDS_PATH.relative_to(BUILD_CONTEXT)}: enabled already false")
-        except Exception as e:
-            print(f"  {Colors.RED}✗{Colors.NC} Error updating {PREDEFINED_HANDS_PATH.relative_to(BUILD_CONTEXT)}: {e}")
-    else:
-        print(f"  {Colors.YELLOW}⚠{Colors.NC} {PREDEFINED_HANDS_PATH.relative_to(BUILD_CONTEXT)} not found, skipping")
-
-    print(f"{Colors.GREEN}✓ Production config set{Colors.NC}")
-
-
-def restore_config() -> None:
-    """Restore config files to original content after build."""
-    if not _config_backups:
-        return
-    print(f"\n{Colors.BLUE}Restoring config files...{Colors.NC}")
-    for path_str, content in _config_backups.items():
-        path = Path(path_str)
-        try:
-            path.write_text(content, encoding="utf-8")
-            print(f"  {Colors.GREEN}✓{Colors.NC} Restored {path.relative_to(BUILD_CONTEXT)}")
-        except Exception as e:
-            print(f"  {Colors.RED}✗{Colors.NC} Error restoring {path.relative_to(BUILD_CONTEXT)}: {e}")
-    _config_backups.clear()
-    print(f"{Colors.GREEN}✓ Config restored{Colors.NC}")
-
-
-def disable_logging_switch() -> None:
-    """Force LOGGING_SWITCH = false in all Dart source files before build."""
-    print(f"\n{Colors.BLUE}Disabling LOGGING_SWITCH in Dart sources...{Colors.NC}")
-    replaced_files = 0
-    replaced_occurrences = 0
-
-    # Predefined variable value to avoid accidentally replacing other 'true' values
-    logging_switch_variable_value = "true"
-
-    for dart_file in BUILD_CONTEXT.rglob("*.dart"):
-        try:
-            text = dart_file.read_text(encoding="utf-8")
-            original_text = text
-            # Replace LOGGING_SWITCH = false with LOGGING_SWITCH = false
-            new_text = text.replace(f"LOGGING_SWITCH = {logging_switch_variable_value}", "LOGGING_SWITCH = false")
-            # Also handle const bool LOGGING_SWITCH = false
-            new_text = new_text.replace(f"const bool LOGGING_SWITCH = {logging_switch_variable_value}", "const bool LOGGING_SWITCH = false")
-            # Also handle static const bool LOGGING_SWITCH = false
-            new_text = new_text.replace(f"static const bool LOGGING_SWITCH = {logging_switch_variable_value}", "static const bool LOGGING_SWITCH = false")
-            
-            if new_text != original_text:
-                dart_file.write_text(new_text, encoding="utf-8")
-                occurrences = original_text.count(f"LOGGING_SWITCH = {logging_switch_variable_value}") + original_text.count(f"const bool LOGGING_SWITCH = {logging_switch_variable_value}") + original_text.count(f"static const bool LOGGING_SWITCH = {logging_switch_variable_value}")
-                replaced_occurrences += occurrences
-                replaced_files += 1
-                rel = dart_file.relative_to(BUILD_CONTEXT)
-                print(f"  {Colors.GREEN}✓{Colors.NC} Updated {rel} ({occurrences} occurrence(s))")
-        except Exception as e:
-            rel = dart_file.relative_to(BUILD_CONTEXT)
-            print(f"  {Colors.RED}✗{Colors.NC} Error processing {rel}: {e}")
-
-    if replaced_files == 0:
-        print(f"{Colors.YELLOW}No LOGGING_SWITCH = {logging_switch_variable_value} found in Dart sources (already disabled or not present).{Colors.NC}")
-    else:
-        print(
-            f"{Colors.GREEN}✓ Disabled LOGGING_SWITCH in {replaced_occurrences} "
-            f"place(s) across {replaced_files} file(s){Colors.NC}"
-        )
+# Production profile: (config file, setting, regex turning it off)
+PRODUCTION_PROFILE = [
+    (DECK_CONFIG_PATH, "testing_mode", r"(\s*testing_mode:\s*)true\b"),
+    (PREDEFINED_HANDS_PATH, "enabled", r"(?m)^(\s*enabled:\s*)true\b"),
+]
+# Named build context holding the profile overlay, and where it lands in the final image
+PROFILE_CONTEXT_NAME = "profile"
+PROFILE_DEST = os.environ.get("DART_PROFILE_DEST", "/app/lib/modules/dutch_game/config/")
+
+# Bump when disable_logging_switch_source() output changes, to invalidate cached results
+LOGGING_SWITCH_TRANSFORM_VERSION = 1
+
+
+def production_profile_overlay() -> Dict[str, bytes]:
+    """Return {file name: production content} for the profile overlay; the source files are not touched."""
+    print(f"\n{Colors.BLUE}Preparing production profile (testing_mode=false, predefined_hands enabled=false)...{Colors.NC}")
+    overlay = {}
+    for path, setting, pattern in PRODUCTION_PROFILE:
+        rel = path.relative_to(BUILD_CONTEXT)
+        if not path.exists():
+            print(f"  {Colors.YELLOW}⚠{Colors.NC} {rel} not found, skipping")
+            continue
+        text = path.read_text(encoding="utf-8")
+        new_text = re.sub(pattern, r"\1false", text)
+        overlay[path.name] = new_text.encode("utf-8")
+        state = "→ false" if new_text != text else "already false"
+        print(f"  {Colors.GREEN}✓{Colors.NC} {rel}: {setting} {state} (overlay layer)")
+    return overlay
+
+
+def profile_dockerfile(dockerfile: bytes, overlay: Dict[str, bytes]) -> bytes:
+    """Append the overlay COPY to the Dockerfile, so it runs last in the final stage."""
+    lines = [
+        "",
+        "# Production profile overlay (added by 07_build_and_push_dart_docker.py, not in the source tree)",
+    ]
+    lines += [f"COPY --from={PROFILE_CONTEXT_NAME} {name} {PROFILE_DEST}" for name in sorted(overlay)]
+    return dockerfile.rstrip(b"\n") + b"\n" + "\n".join(lines).encode("utf-8") + b"\n"
+
+
+def disable_logging_switch_source(text: str, filename: str = "") -> Tuple[str, int]:
+    """Return (text with LOGGING_SWITCH = true forced to false, number of replacements)."""
+    # Predefined variable value to avoid accidentally replacing other 'true' values.
+    # Also covers "const bool LOGGING_SWITCH = true" and "static const bool LOGGING_SWITCH = true".
+    enabled = "LOGGING_SWITCH = true"
+    occurrences = text.count(enabled)
+    if not occurrences:
+        return text, 0
+    return text.replace(enabled, "LOGGING_SWITCH = false"), occurrences
+
+
+def prepare_build_context(overlay: Dict[str, bytes]) -> List[Tuple[Path, str, Optional[bytes]]]:
+    """
+    Collect the main build context: LOGGING_SWITCH forced off in the Dart
+    sources (parallel, cached by content hash), the overlay's source files
+    left out and the Dockerfile extended with the overlay COPY.
+    Returns [(path, relative path, content)] (content None: file used as is).
+    """
+    print(f"\n{Colors.BLUE}Disabling LOGGING_SWITCH in the streamed Dart sources...{Colors.NC}")
+    rules = load_dockerignore(BUILD_CONTEXT)
+    context_files = list(iter_context_files(BUILD_CONTEXT, rules))
+    dockerfile_rel = DOCKERFILE_PATH.relative_to(BUILD_CONTEXT).as_posix()
+    profile_rels = {path.relative_to(BUILD_CONTEXT).as_posix() for path, *_ in PRODUCTION_PROFILE if path.name in overlay}
+
+    dart_files = [
+        path for path, rel_path in context_files if path.suffix == ".dart" and not path.is_symlink() and path.is_file()
+    ]
+    changed, stats = transform_files(
+        dart_files, disable_logging_switch_source, "dart_logging_switch", LOGGING_SWITCH_TRANSFORM_VERSION,
+        base=BUILD_CONTEXT,
+    )
+    for dart_file, (_, occurrences) in sorted(changed.items()):
+        print(f"  {Colors.GREEN}✓{Colors.NC} {dart_file.relative_to(BUILD_CONTEXT)} ({occurrences} occurrence(s))")
+    print(
+        f"  {stats['transformed']} file(s) transformed, {stats['cached']} from cache "
+        f"({stats['seconds']:.2f}s)"
+    )
+    if not changed:
+        print(f"{Colors.YELLOW}No LOGGING_SWITCH = true found in Dart sources (already disabled or not present).{Colors.NC}")
+
+    dockerfile = profile_dockerfile(DOCKERFILE_PATH.read_bytes(), overlay)
+    context = []
+    for path, rel_path in context_files:
+        if rel_path in profile_rels or rel_path == dockerfile_rel:
+            continue
+        context.append((path, rel_path, changed[path][0] if path in changed else None))
+    # The Dockerfile is always sent, even when .dockerignore lists it
+    context.append((DOCKERFILE_PATH, dockerfile_rel, dockerfile))
+    return context
 
 
 def check_docker() -> bool:
@@ -147,7 +174,7 @@ def check_docker() -> bool:
 
 def build_and_push() -> bool:
     """Build and push the Docker image."""
-    full_image_name = f"{DOCKER_USERNAME}/{IMAGE_NAME}:{IMAGE_TAG}"
+    full_image_name = f"{IMAGE_REPO}:{IMAGE_TAG}"
 
     print(f"\n{Colors.BLUE}Configuration:{Colors.NC}")
     print(f"  Docker Username: {DOCKER_USERNAME}")
@@ -168,56 +195,105 @@ def build_and_push() -> bool:
         response = input("Proceed with build and push? (y/n): ").strip().lower()
         if response != "y":
             print(f"{Colors.YELLOW}Build cancelled.{Colors.NC}")
+            TELEMETRY.note(cancelled=True)
             return False
     else:
         print("Non-interactive mode: Auto-confirming build and push...")
 
-    # Build the Docker image
-    print(f"\n{Colors.BLUE}Building Dart Docker image...{Colors.NC}")
-    build_cmd = [
-        "docker",
-        "build",
-        "-f",
-        str(DOCKERFILE_PATH),
-        "-t",
-        full_image_name,
-        str(BUILD_CONTEXT),
-    ]
+    with TELEMETRY.phase("config_override"):
+        overlay = production_profile_overlay()
+    with TELEMETRY.phase("log_stripping"):
+        context = prepare_build_context(overlay)
 
-    try:
-        subprocess.run(build_cmd, check=True)
-        print(f"{Colors.GREEN}✓ Docker image built successfully{Colors.NC}")
-    except subprocess.CalledProcessError:
-        print(f"{Colors.RED}✗ Docker build failed{Colors.NC}")
+    size = context_size(context)
+    TELEMETRY.note(context_files=len(context), context_bytes=size)
+    budget_error = context_budget_error(size)
+    if budget_error:
+        print(f"{Colors.RED}✗ Refusing to build: {budget_error}{Colors.NC}")
         return False
 
-    # Tag as latest if a different tag was used
-    if IMAGE_TAG != "latest":
-        print(f"\n{Colors.BLUE}Tagging as latest...{Colors.NC}")
-        latest_tag = f"{DOCKER_USERNAME}/{IMAGE_NAME}:latest"
-        subprocess.run(["docker", "tag", full_image_name, latest_tag], check=True)
-        print(f"{Colors.GREEN}✓ Tagged as latest{Colors.NC}")
+    # Hash exactly what is sent: main context plus profile overlay
+    with TELEMETRY.phase("context_hash"):
+        context_hash = hash_context(
+            [(rel_path, path, data) for path, rel_path, data in context]
+            + [(f"@{PROFILE_CONTEXT_NAME}/{name}", None, data) for name, data in overlay.items()],
+            DOCKERFILE_PATH.read_bytes(),
+            "dart_build",
+        )
+    print(f"\n{Colors.BLUE}Build context hash:{Colors.NC} {context_hash[:12]}")
 
-    # Push to Docker Hub
-    print(f"\n{Colors.BLUE}Pushing to Docker Hub...{Colors.NC}")
-    try:
-        subprocess.run(["docker", "push", full_image_name], check=True)
-        print(f"{Colors.GREEN}✓ Image pushed successfully{Colors.NC}")
-    except subprocess.CalledProcessError:
+    with TELEMETRY.phase("cache_lookup"):
+        found = find_image_with_hash(full_image_name, context_hash)
+    TELEMETRY.note(context_hash=context_hash, cache=f"hit-{found}" if found else "miss")
+    if found == "registry":
         print(
-            f"{Colors.RED}✗ Push failed. Make sure you're logged in: docker login{Colors.NC}"
+            f"{Colors.GREEN}✓ Build cache hit: {full_image_name} in the registry was built from this context, "
+            f"skipping build{Colors.NC}"
         )
-        return False
+    elif found == "local":
+        print(
+            f"{Colors.GREEN}✓ Build cache hit: local {full_image_name} was built from this context, "
+            f"skipping build{Colors.NC}"
+        )
+    else:
+        print(f"\n{Colors.BLUE}Build cache miss: building Dart Docker image...{Colors.NC}")
+        latest_image = f"{IMAGE_REPO}:latest"
+        with tempfile.TemporaryDirectory(prefix="dart_profile_") as profile_dir:
+            for name, data in overlay.items():
+                (Path(profile_dir) / name).write_bytes(data)
+            build_cmd, build_env = build_command(
+                full_image_name, latest_image, DOCKERFILE_PATH.relative_to(BUILD_CONTEXT).as_posix(), "-",
+                context_hash, extra_args=["--build-context", f"{PROFILE_CONTEXT_NAME}={profile_dir}"],
+            )
+            with TELEMETRY.phase("docker_build"):
+                build_stats = run_build(build_cmd, build_env, context)
+        if build_stats is None:
+            print(f"{Colors.RED}✗ Docker build failed{Colors.NC}")
+            return False
+        print(f"{Colors.GREEN}✓ Docker image built successfully in {build_stats['seconds']:.1f}s{Colors.NC}")
+        print(
+            f"  Context: {build_stats['context_files']} files, {build_stats['bytes'] / 1e6:.1f} MB; "
+            f"layer cache: {build_stats['cached']}/{build_stats['steps']} steps reused"
+        )
+        TELEMETRY.note(build_steps=build_stats["steps"], build_steps_cached=build_stats["cached"])
 
-    # Push latest tag if different
-    if IMAGE_TAG != "latest":
-        print(f"\n{Colors.BLUE}Pushing latest tag...{Colors.NC}")
-        latest_tag = f"{DOCKER_USERNAME}/{IMAGE_NAME}:latest"
-        try:
-            subprocess.run(["docker", "push", latest_tag], check=True)
-            print(f"{Colors.GREEN}✓ Latest tag pushed successfully{Colors.NC}")
-        except subprocess.CalledProcessError:
-            pass
+    # Layer sizes by Dockerfile instruction; IMAGE_BUDGET_MB / IMAGE_GROWTH_BUDGET_MB block the push
+    # (skipped on a registry hit: the local tag may hold a different image)
+    print(f"\n{Colors.BLUE}Image size report:{Colors.NC}")
+    if found == "registry":
+        print("  Image in the registry was built from this context, skipping the size check")
+    else:
+        with TELEMETRY.phase("size_check"):
+            size_record = check_image_size(
+                full_image_name, log=lambda message: print(f"  {message}"), context_hash=context_hash
+            )
+        if size_record is None:
+            print(f"{Colors.RED}✗ Refusing to push: image over budget{Colors.NC}")
+            return False
+
+    # Push only what the registry does not already hold; latest is re-pointed
+    # registry-side instead of being pushed a second time
+    print(f"\n{Colors.BLUE}Pushing to registry...{Colors.NC}")
+    with TELEMETRY.phase("push"):
+        record = push_image(
+            full_image_name,
+            aliases=[f"{IMAGE_REPO}:latest"],
+            log=lambda message: print(f"  {message}"),
+            context_hash=context_hash,
+            registry_hit=found == "registry",
+        )
+    if record is None:
+        print(f"{Colors.RED}✗ Push failed{Colors.NC}")
+        return False
+    # Re-pointing latest is reported as its own phase
+    TELEMETRY.add_phase("push", -record["retag_seconds"])
+    TELEMETRY.add_phase("tag", record["retag_seconds"])
+    TELEMETRY.note(
+        digest=record["digest"],
+        pushed=record["pushed"],
+        compressed_bytes=record["pushed_bytes"] or record["skipped_bytes"],
+    )
+    print(f"{Colors.GREEN}✓ {full_image_name} is in the registry{Colors.NC}")
 
     return True
 
@@ -225,37 +301,35 @@ def build_and_push() -> bool:
 def main() -> None:
     print(f"{Colors.BLUE}=== Dart Docker Build and Push Script ==={Colors.NC}\n")
 
-    # Ensure noisy logging is disabled in the built image
-    disable_logging_switch()
-
-    # Set production config: testing_mode=false, predefined_hands enabled=false
-    set_production_config()
-
     if not check_docker():
         print(
             f"{Colors.RED}Error: Docker is not running. Please start Docker and try again.{Colors.NC}"
         )
-        restore_config()
         sys.exit(1)
 
+    status = "failed"
     try:
         success = build_and_push()
-        if not success:
-            restore_config()
-            sys.exit(1)
-    except (KeyboardInterrupt, Exception):
-        restore_config()
-        raise
-
-    restore_config()
+        if success:
+            status = "ok"
+    except KeyboardInterrupt:
+        # Nothing to restore: the source tree is never modified
+        status = "interrupted"
+        print(f"\n{Colors.YELLOW}Interrupted.{Colors.NC}")
+        sys.exit(1)
+    finally:
+        if not TELEMETRY.record.get("cancelled"):
+            TELEMETRY.finish(status)
+    if not success:
+        sys.exit(1)
 
-    full_image_name = f"{DOCKER_USERNAME}/{IMAGE_NAME}:{IMAGE_TAG}"
+    full_image_name = f"{IMAGE_REPO}:{IMAGE_TAG}"
     print(f"\n{Colors.GREEN}=== Build and Push Complete ==={Colors.NC}")
     print(
         f"Image available at: {Colors.BLUE}{full_image_name}{Colors.NC}"
     )
     print("\nTo use this image, update docker-compose.yml:")
-    print(f"  image: {DOCKER_USERNAME}/{IMAGE_NAME}:{IMAGE_TAG}")
+    print(f"  image: {IMAGE_REPO}:{IMAGE_TAG}")
     print()
 
 
@@ -13,13 +13,30 @@ import json
 import sys
 import os
 import argparse
+import contextlib
+import fcntl
+import functools
+import multiprocessing
 import subprocess
+import hashlib
+import importlib.util
+import re
+import shlex
 import shutil
 import tempfile
+import threading
+import time
+import urllib.request
+import urllib.error
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, as_completed
 from datetime import datetime
-from typing import Dict, Any, List, Set
+from typing import Dict, Any, List, Optional
 from pathlib import Path
 
+# Users index spec and preflight, shared with 00_local/11_add_players.py
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from comp_player_indexes import parse_marker, preflight_indexes  # noqa: E402
+
 # Bcrypt hash for password "comp_player_pass"
 COMP_PLAYER_PASSWORD = "$2b$12$PHGvsjOG3/fjNuEZQP1Szu5/igAj8pppp8XoAFeVyzDbj2EBh3o82"
 
@@ -32,8 +49,134 @@ MONGODB_AUTH_DB = "external_system"
 
 # VPS image directory configuration
 VPS_IMAGE_DIR = "/var/www/dutch.reignofplay.com/sim_players/images"
+PUBLIC_IMAGE_URL = "https://dutch.reignofplay.com/sim_players/images"
 LOCAL_IMAGE_DIR = None  # Will be set based on project root
 
+# Checksum manifest kept next to the images on the VPS (hidden files are denied by nginx)
+IMAGE_MANIFEST_NAME = ".manifest.json"
+LOCAL_CACHE_DIR = Path.home() / ".cache" / "dutch_playbooks"
+LOCAL_HASH_CACHE = LOCAL_CACHE_DIR / "sim_players_local_hashes.json"
+
+# Parallel image upload: rsync streams sharing one multiplexed SSH connection
+DEFAULT_UPLOAD_STREAMS = 4
+SSH_CONTROL_PERSIST_SECONDS = 60
+# Owner of uploaded files on the VPS (the nginx user)
+VPS_FILE_OWNER = "www-data:www-data"
+# Already-compressed formats; rsync -z would only burn CPU on these
+SKIP_COMPRESS_SUFFIXES = "jpg/jpeg/png/gif/webp/avif/gz/zip"
+
+# Resized avatar variants (see generate_avatar_variants). Changing the spec
+# invalidates the local variant cache, so every avatar is re-rendered once.
+VARIANT_SUBDIR = "variants"
+AVATAR_VARIANT_SPEC = {'sizes': [64, 128, 256], 'webp_quality': 80, 'jpeg_quality': 82}
+AVATAR_VARIANT_FORMATS = ('webp', 'jpg')
+LOCAL_VARIANT_DIR = LOCAL_CACHE_DIR / "sim_players_variants"
+LOCAL_VARIANT_CACHE = LOCAL_CACHE_DIR / "sim_players_variant_sources.json"
+RSYNC_PROGRESS_RE = re.compile(r'^\s*([\d,]+)\s+\d+%')
+
+# Prometheus metrics configuration
+DEFAULT_METRICS_FILE = "/tmp/add_players_metrics.prom"
+METRICS_JOB_NAME = "dutch_seeding"
+BATCH_LATENCY_BUCKETS = [0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0]
+
+
+class SeedingMetrics:
+    """Collect seeding throughput metrics and export them in Prometheus text format."""
+
+    def __init__(self, buckets: List[float] = None):
+        self.buckets = sorted(buckets or BATCH_LATENCY_BUCKETS)
+        self.bucket_counts = [0] * len(self.buckets)
+        self.batch_count = 0
+        self.batch_seconds_sum = 0.0
+        self.inserted = 0
+        self.updated = 0
+        self.failed = 0
+        self.retries = 0
+        self.started_at = time.time()
+        self.finished_at = None
+
+    def observe_batch(self, seconds: float):
+        """Record the latency of one upsert batch."""
+        self.batch_count += 1
+        self.batch_seconds_sum += seconds
+        for i, bound in enumerate(self.buckets):
+            if seconds <= bound:
+                self.bucket_counts[i] += 1
+
+    def finish(self):
+        """Mark the end of the seeding run."""
+        self.finished_at = time.time()
+
+    @property
+    def duration_seconds(self) -> float:
+        return (self.finished_at or time.time()) - self.started_at
+
+    @property
+    def documents_per_second(self) -> float:
+        """Successfully upserted (inserted or updated) documents per second; failures are not throughput."""
+        duration = self.duration_seconds
+        upserted = self.inserted + self.updated
+        return upserted / duration if duration > 0 else 0.0
+
+    def render(self) -> str:
+        """Render all metrics in the Prometheus text exposition format."""
+        lines = [
+            '# HELP dutch_seeding_batch_duration_seconds Latency of one comp player upsert batch.',
+            '# TYPE dutch_seeding_batch_duration_seconds histogram',
+        ]
+        for bound, count in zip(self.buckets, self.bucket_counts):
+            lines.append(f'dutch_seeding_batch_duration_seconds_bucket{{le="{bound}"}} {count}')
+        lines.append(f'dutch_seeding_batch_duration_seconds_bucket{{le="+Inf"}} {self.batch_count}')
+        lines.append(f'dutch_seeding_batch_duration_seconds_sum {self.batch_seconds_sum:.6f}')
+        lines.append(f'dutch_seeding_batch_duration_seconds_count {self.batch_count}')
+
+        lines.append('# HELP dutch_seeding_documents Comp player documents upserted in the last run, by result.')
+        lines.append('# TYPE dutch_seeding_documents gauge')
+        for result, value in (('inserted', self.inserted), ('updated', self.updated)):
+            lines.append(f'dutch_seeding_documents{{result="{result}"}} {value}')
+
+        lines.append('# HELP dutch_seeding_failed_documents Comp player documents that failed to upsert in the last run.')
+        lines.append('# TYPE dutch_seeding_failed_documents gauge')
+        lines.append(f'dutch_seeding_failed_documents {self.failed}')
+
+        lines.append('# HELP dutch_seeding_retries Batch step retries in the last run.')
+        lines.append('# TYPE dutch_seeding_retries gauge')
+        lines.append(f'dutch_seeding_retries {self.retries}')
+
+        lines.append('# HELP dutch_seeding_documents_per_second Documents successfully upserted per second over the whole run.')
+        lines.append('# TYPE dutch_seeding_documents_per_second gauge')
+        lines.append(f'dutch_seeding_documents_per_second {self.documents_per_second:.3f}')
+
+        lines.append('# HELP dutch_seeding_duration_seconds Wall time of the last seeding run.')
+        lines.append('# TYPE dutch_seeding_duration_seconds gauge')
+        lines.append(f'dutch_seeding_duration_seconds {self.duration_seconds:.3f}')
+
+        lines.append('# HELP dutch_seeding_last_run_timestamp_seconds Unix time the last seeding run finished.')
+        lines.append('# TYPE dutch_seeding_last_run_timestamp_seconds gauge')
+        lines.append(f'dutch_seeding_last_run_timestamp_seconds {int(self.finished_at or time.time())}')
+        return '\n'.join(lines) + '\n'
+
+    def write_textfile(self, path: str):
+        """Write metrics atomically so a textfile collector never reads a partial file."""
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w') as f:
+            f.write(self.render())
+        os.replace(tmp_path, path)
+
+    def push(self, gateway_url: str, job: str = METRICS_JOB_NAME, instance: str = None):
+        """Push metrics to a pushgateway-compatible endpoint (replaces the job's group)."""
+        url = f"{gateway_url.rstrip('/')}/metrics/job/{job}"
+        if instance:
+            url += f"/instance/{instance}"
+        request = urllib.request.Request(
+            url,
+            data=self.render().encode('utf-8'),
+            method='PUT',
+            headers={'Content-Type': 'text/plain; version=0.0.4'}
+        )
+        with urllib.request.urlopen(request, timeout=10) as response:
+            response.read()
+
 
 def extract_name_from_username(username: str) -> tuple[str, str]:
     """Extract first and last name from username."""
@@ -198,40 +341,512 @@ def extract_image_filename(picture_url: str) -> str:
     return None
 
 
-def check_existing_images(ssh_base: str) -> Set[str]:
-    """Check which images already exist on the VPS."""
-    existing = set()
+def file_sha256(path: Path) -> str:
+    """Return the SHA-256 hex digest of a file."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def load_json_cache(path: Path, default: Any) -> Any:
+    """Load a local JSON cache file, returning `default` if missing or unreadable."""
+    try:
+        with open(path, 'r') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return default
+
+
+def save_json_cache(path: Path, data: Any):
+    """Write a local JSON cache file atomically (unique temp file, then rename)."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(prefix=path.name + '.', suffix='.tmp', dir=path.parent)
+    try:
+        with os.fdopen(fd, 'w') as f:
+            json.dump(data, f, separators=(',', ':'), sort_keys=True)
+        os.replace(tmp_path, path)
+    except BaseException:
+        with contextlib.suppress(OSError):
+            os.unlink(tmp_path)
+        raise
+
+
+_JSON_CACHE_LOCK = threading.Lock()
+
+
+@contextlib.contextmanager
+def _json_cache_lock(path: Path):
+    """Serialise updates of a cache file across threads (one lock) and processes (flock on a sidecar file)."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with _JSON_CACHE_LOCK, open(path.with_name(path.name + '.lock'), 'a') as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def merge_json_cache(path: Path, updates: Dict[str, Any], removals=()):
+    """
+    Apply updates and removals to the dict cached in path and save it.
+
+    The file is re-read under a lock, so entries written meanwhile by the
+    image sync, variant generation or atlas builder are kept rather than
+    overwritten with a stale copy.
+    """
+    if not updates and not removals:
+        return
+    with _json_cache_lock(path):
+        cache = load_json_cache(path, {})
+        if not isinstance(cache, dict):
+            cache = {}
+        cache.update(updates)
+        for key in removals:
+            cache.pop(key, None)
+        save_json_cache(path, cache)
+
+
+def hash_local_images(image_files: Dict[str, Path]) -> Dict[str, Dict[str, Any]]:
+    """
+    Return {filename: {"size", "sha256"}} for local images.
+
+    Hashes are cached by absolute path, size and mtime, so only new or touched
+    files are read on later runs.
+    """
+    cache = load_json_cache(LOCAL_HASH_CACHE, {})
+    entries = {}
+    updates = {}
+    for filename, path in image_files.items():
+        stat = path.stat()
+        key = str(path.resolve())
+        cached = cache.get(key)
+        if cached and cached['size'] == stat.st_size and cached['mtime_ns'] == stat.st_mtime_ns:
+            sha256 = cached['sha256']
+        else:
+            sha256 = file_sha256(path)
+            updates[key] = {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns, 'sha256': sha256}
+        entries[filename] = {'size': stat.st_size, 'sha256': sha256}
+    merge_json_cache(LOCAL_HASH_CACHE, updates)
+    return entries
+
+
+def _remote_manifest_cache_path(ssh_host: str, remote_dir: str) -> Path:
+    suffix = '' if remote_dir == VPS_IMAGE_DIR else '_' + remote_dir.rstrip('/').rsplit('/', 1)[-1]
+    return LOCAL_CACHE_DIR / f'sim_players_manifest_{ssh_host}{suffix}.json'
+
+
+def fetch_remote_manifest(ssh_base: str, ssh_host: str, remote_dir: str = None) -> Optional[Dict[str, Dict[str, Any]]]:
+    """
+    Return the image manifest stored on the VPS, or None if there is none yet.
+
+    The manifest is cached locally together with its SHA-256; the remote side
+    only sends the manifest body when its hash differs from the cached one, so
+    an unchanged library costs a single small SSH round trip.
+    """
+    remote_dir = remote_dir or VPS_IMAGE_DIR
+    cache_path = _remote_manifest_cache_path(ssh_host, remote_dir)
+    cached = load_json_cache(cache_path, {})
+    cached_etag = cached.get('etag', '')
+    manifest_path = f'{remote_dir}/{IMAGE_MANIFEST_NAME}'
+    remote_script = (
+        f'f={manifest_path}; '
+        f'if [ -f $f ]; then h=$(sha256sum $f | cut -d" " -f1); echo $h; '
+        f'if [ "$h" != "{cached_etag}" ]; then cat $f; fi; '
+        f'else echo MISSING; fi'
+    )
+    result = subprocess.run(f'{ssh_base} {shlex.quote(remote_script)}', shell=True, capture_output=True, text=True, check=True)
+    etag, _, body = result.stdout.partition('\n')
+    etag = etag.strip()
+    if etag == 'MISSING':
+        return None
+    if etag == cached_etag and not body.strip():
+        return cached.get('files', {})
+    files = json.loads(body).get('files', {})
+    save_json_cache(cache_path, {'etag': etag, 'files': files})
+    return files
+
+
+def bootstrap_remote_manifest(ssh_base: str, local_entries: Dict[str, Dict[str, Any]], remote_dir: str = None) -> Dict[str, Dict[str, Any]]:
+    """
+    Build a manifest from the images already on the VPS by hashing them remotely.
+
+    Only needed once (no manifest yet, or --rebuild-manifest); afterwards the
+    manifest is maintained by each upload.
+    """
+    remote_script = f'cd {remote_dir or VPS_IMAGE_DIR} 2>/dev/null && find . -maxdepth 1 -type f ! -name ".*" -exec sha256sum {{}} + || true'
+    result = subprocess.run(f'{ssh_base} {shlex.quote(remote_script)}', shell=True, capture_output=True, text=True, check=True)
+    files = {}
+    for line in result.stdout.splitlines():
+        parts = line.split(None, 1)
+        if len(parts) != 2:
+            continue
+        sha256, name = parts[0], os.path.basename(parts[1].strip())
+        local = local_entries.get(name)
+        # Sizes are only known locally; remote-only files are recorded without one
+        files[name] = {'size': local['size'] if local and local['sha256'] == sha256 else None, 'sha256': sha256}
+    return files
+
+
+def write_remote_manifest(ssh_base: str, ssh_host: str, files: Dict[str, Dict[str, Any]], remote_dir: str = None):
+    """Replace the VPS manifest atomically (write to a temp file, then rename) and refresh the local cache."""
+    remote_dir = remote_dir or VPS_IMAGE_DIR
+    body = json.dumps({'version': 1, 'files': files}, separators=(',', ':'), sort_keys=True)
+    manifest_path = f'{remote_dir}/{IMAGE_MANIFEST_NAME}'
+    remote_script = (
+        f'sudo mkdir -p {remote_dir} && '
+        f'sudo tee {manifest_path}.tmp > /dev/null && '
+        f'sudo chmod 644 {manifest_path}.tmp && '
+        f'sudo mv -f {manifest_path}.tmp {manifest_path}'
+    )
+    subprocess.run(f'{ssh_base} {shlex.quote(remote_script)}', shell=True, input=body, capture_output=True, text=True, check=True)
+    etag = hashlib.sha256(body.encode('utf-8')).hexdigest()
+    save_json_cache(_remote_manifest_cache_path(ssh_host, remote_dir), {'etag': etag, 'files': files})
+
+
+def shard_by_size(files: Dict[str, Path], shard_count: int) -> List[Dict[str, Path]]:
+    """Split files into up to shard_count shards of roughly equal total size (largest first)."""
+    shard_count = max(1, min(shard_count, len(files)))
+    shards = [{} for _ in range(shard_count)]
+    loads = [0] * shard_count
+    for fname, path in sorted(files.items(), key=lambda item: item[1].stat().st_size, reverse=True):
+        target = loads.index(min(loads))
+        shards[target][fname] = path
+        loads[target] += path.stat().st_size
+    return shards
+
+
+def start_ssh_master(ssh_key: str, ssh_user: str, ssh_host: str, control_path: str):
+    """Open a background SSH master connection that the rsync streams multiplex over."""
+    cmd = [
+        'ssh', '-i', ssh_key,
+        '-o', 'ControlMaster=yes',
+        '-o', f'ControlPath={control_path}',
+        '-o', f'ControlPersist={SSH_CONTROL_PERSIST_SECONDS}',
+        '-fN', f'{ssh_user}@{ssh_host}'
+    ]
+    subprocess.run(cmd, check=True, capture_output=True, text=True)
+
+
+def stop_ssh_master(ssh_user: str, ssh_host: str, control_path: str):
+    """Close the SSH master connection (ignores errors; ControlPersist expires it anyway)."""
+    cmd = ['ssh', '-o', f'ControlPath={control_path}', '-O', 'exit', f'{ssh_user}@{ssh_host}']
+    subprocess.run(cmd, capture_output=True, text=True)
+
+
+def shard_rsync_command(local_dir: Path, destination: str, remote_dir: str, remote_shell: str = None,
+                        owner: str = VPS_FILE_OWNER) -> List[str]:
+    """rsync command uploading the files listed on its stdin (relative to local_dir) to destination."""
+    user, group = owner.split(':')
+    cmd = [
+        'rsync',
+        '-az',  # archive mode, compress
+        f'--skip-compress={SKIP_COMPRESS_SUFFIXES}',  # but not already-compressed images
+        '--info=progress2',  # one cumulative progress line per stream
+        '--files-from=-',  # transfer only the listed files (read from stdin)
+        '--ignore-times',  # listed files are known to differ; don't trust size/mtime
+        f'--chown={owner}',  # owned by nginx user
+        '--chmod=D755,F644',  # directories rwxr-xr-x, files rw-r--r--
+        # ensure the directory exists and use sudo; the remote shell runs this string, so quote its values
+        f'--rsync-path=sudo install -d -o {shlex.quote(user)} -g {shlex.quote(group)} -m 755 {shlex.quote(remote_dir)} && sudo rsync',
+    ]
+    if remote_shell:
+        cmd += ['-e', remote_shell]
+    return cmd + [
+        f'{local_dir}/',  # source directory the file list is relative to
+        destination
+    ]
+
+
+def rsync_shards(shards: List[Dict[str, Path]], local_dir: Path, ssh_key: str, ssh_user: str, ssh_host: str, control_path: str, remote_dir: str) -> List[bool]:
+    """
+    Run one rsync stream per shard concurrently and print a single aggregated progress line.
+
+    Returns per-shard success flags.
+    """
+    total_bytes = sum(path.stat().st_size for shard in shards for path in shard.values())
+    transferred = [0] * len(shards)
+    output_tails = [[] for _ in shards]
+
+    def read_progress(index: int, proc: subprocess.Popen):
+        # rsync rewrites its --info=progress2 line with \r, so split on both
+        buffer = b''
+        while True:
+            chunk = os.read(proc.stdout.fileno(), 4096)
+            if not chunk:
+                break
+            buffer += chunk
+            *lines, buffer = re.split(rb'[\r\n]', buffer)
+            for raw in lines:
+                line = raw.decode(errors='replace')
+                match = RSYNC_PROGRESS_RE.match(line)
+                if match:
+                    transferred[index] = int(match.group(1).replace(',', ''))
+                elif line.strip():
+                    output_tails[index] = (output_tails[index] + [line.strip()])[-5:]
+
+    def write_file_list(proc: subprocess.Popen, filenames: List[str]):
+        # Fed from its own thread: rsync may fill the output pipe before it has read the whole list
+        try:
+            proc.stdin.write(''.join(f'{fname}\n' for fname in filenames).encode())
+            proc.stdin.close()
+        except BrokenPipeError:
+            # rsync exited early; its exit code and output tail report why
+            pass
+
+    procs = []
+    threads = []
+    for index, shard in enumerate(shards):
+        # The SSH shell reuses the master connection
+        rsync_cmd = shard_rsync_command(local_dir, f'{ssh_user}@{ssh_host}:{remote_dir}/', remote_dir,
+                                        f'ssh -i {ssh_key} -o ControlPath={control_path}')
+        proc = subprocess.Popen(rsync_cmd, stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
+        for target, args in ((read_progress, (index, proc)), (write_file_list, (proc, sorted(shard)))):
+            thread = threading.Thread(target=target, args=args, daemon=True)
+            thread.start()
+            threads.append(thread)
+        procs.append(proc)
+
+    interactive = sys.stdout.isatty()
+    while any(proc.poll() is None for proc in procs):
+        if interactive:
+            done = sum(transferred)
+            percent = 100 * done / total_bytes if total_bytes else 100
+            active = sum(1 for proc in procs if proc.poll() is None)
+            print(f"\r   📤 {done / 1e6:.1f}/{total_bytes / 1e6:.1f} MB ({percent:.0f}%) - {active}/{len(procs)} streams active",
+                  end='', flush=True)
+        time.sleep(0.5)
+    for thread in threads:
+        thread.join()
+
+    results = []
+    for index, proc in enumerate(procs):
+        ok = proc.returncode == 0
+        if not ok:
+            print(f"\n  ❌ rsync stream {index + 1} failed (exit {proc.returncode}): {' | '.join(output_tails[index])}", file=sys.stderr)
+        results.append(ok)
+    if interactive:
+        print()
+    return results
+
+
+def sync_files(ssh_base: str, files: Dict[str, Path], local_dir: Path, ssh_key: str, ssh_user: str, ssh_host: str,
+               remote_dir: str = None, rebuild_manifest: bool = False, streams: int = DEFAULT_UPLOAD_STREAMS,
+               label: str = 'images') -> Dict[str, Any]:
+    """Upload files from local_dir to remote_dir on the VPS, skipping those whose content is unchanged.
+
+    The delta is computed from the checksum manifest kept next to the files on
+    the VPS (see fetch_remote_manifest), so renamed-in-place content changes are
+    detected and an up-to-date library needs no remote directory listing.
+
+    Returns counts of uploaded, failed and skipped (unchanged) files, the names
+    of the files now on the VPS with their current content ('synced'), plus the
+    number of remote commands issued and the time spent in them.
+    """
+    remote_dir = remote_dir or VPS_IMAGE_DIR
+    summary = {'uploaded': 0, 'failed': 0, 'skipped': 0, 'synced': [], 'remote_commands': 0, 'remote_seconds': 0.0}
     
-    # List files in the remote directory
-    list_cmd = f'ls -1 {VPS_IMAGE_DIR} 2>/dev/null || echo ""'
-    full_cmd = f'{ssh_base} "{list_cmd}"'
+    def remote(func, *args, **kwargs):
+        # Every remote round trip (ssh or rsync) goes through here so it is counted
+        start = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            summary['remote_commands'] += 1
+            summary['remote_seconds'] += time.perf_counter() - start
     
+    # Compare local content hashes with the VPS manifest
+    local_entries = hash_local_images(files)
     try:
-        result = subprocess.run(
-            full_cmd,
-            shell=True,
-            capture_output=True,
-            text=True,
-            check=True
-        )
-        
-        for line in result.stdout.strip().split('\n'):
-            filename = line.strip()
-            if filename and filename.endswith('.jpg'):
-                existing.add(filename)
-    except subprocess.CalledProcessError:
-        # Directory might not exist yet, that's okay
-        pass
+        remote_files = None if rebuild_manifest else remote(fetch_remote_manifest, ssh_base, ssh_host, remote_dir)
+        if remote_files is None:
+            print(f"   No {label} manifest on VPS yet, building it from existing files...")
+            remote_files = remote(bootstrap_remote_manifest, ssh_base, local_entries, remote_dir)
+            remote(write_remote_manifest, ssh_base, ssh_host, remote_files, remote_dir)
+    except (subprocess.CalledProcessError, ValueError) as e:
+        error_msg = e.stderr if isinstance(e, subprocess.CalledProcessError) else str(e)
+        print(f"  ❌ Failed to read {label} manifest from VPS: {error_msg}", file=sys.stderr)
+        summary['failed'] = len(files)
+        return summary
+    print(f"   {len(remote_files)} {label} listed in VPS manifest")
     
-    return existing
+    # Upload new files and files whose content changed
+    files_to_upload = {
+        fname: path for fname, path in files.items()
+        if remote_files.get(fname, {}).get('sha256') != local_entries[fname]['sha256']
+    }
+    summary['skipped'] = len(files) - len(files_to_upload)
+    
+    if not files_to_upload:
+        print(f"✅ All {label} already up to date on VPS, skipping upload")
+        summary['synced'] = sorted(files)
+        return summary
+    
+    changed = sum(1 for fname in files_to_upload if fname in remote_files)
+    shards = shard_by_size(files_to_upload, streams)
+    upload_mb = sum(path.stat().st_size for path in files_to_upload.values()) / 1e6
+    print(f"   Uploading {len(files_to_upload)} {label} ({changed} changed, {upload_mb:.1f} MB) "
+          f"using {len(shards)} parallel rsync stream(s)...")
+    
+    # Each shard is passed to its own rsync as a file list relative to the local
+    # directory (fed on stdin), so nothing is copied locally before the
+    # transfer. All streams share one SSH master connection, so the handshake is
+    # paid once and the streams together fill high-latency links that a single
+    # stream cannot. The remote rsync runs under sudo, so ownership and
+    # permissions are applied to the transferred files as they are written.
+    control_dir = tempfile.mkdtemp(prefix='dutch_ssh_')
+    control_path = os.path.join(control_dir, 'master')
+    uploaded_files: Dict[str, Path] = {}
+    try:
+        remote(start_ssh_master, ssh_key, ssh_user, ssh_host, control_path)
+        start = time.perf_counter()
+        results = rsync_shards(shards, local_dir, ssh_key, ssh_user, ssh_host, control_path, remote_dir)
+        summary['remote_commands'] += len(shards)
+        summary['remote_seconds'] += time.perf_counter() - start
+        for shard, ok in zip(shards, results):
+            if ok:
+                uploaded_files.update(shard)
+    except subprocess.CalledProcessError as e:
+        print(f"  ❌ Failed to open SSH connection for {label} upload: {e.stderr}", file=sys.stderr)
+    finally:
+        if os.path.exists(control_path):
+            remote(stop_ssh_master, ssh_user, ssh_host, control_path)
+        shutil.rmtree(control_dir, ignore_errors=True)
+    uploaded = len(uploaded_files)
+    failed = len(files_to_upload) - uploaded
+    
+    # Record the uploaded content in the manifest (only after a successful transfer)
+    if uploaded > 0:
+        for fname in uploaded_files:
+            remote_files[fname] = local_entries[fname]
+        try:
+            remote(write_remote_manifest, ssh_base, ssh_host, remote_files, remote_dir)
+        except subprocess.CalledProcessError as e:
+            print(f"  ⚠️  Failed to update {label} manifest on VPS (next run will re-upload): {e.stderr}", file=sys.stderr)
+    
+    print(f"\n✅ Upload of {label} complete: {uploaded} uploaded, {failed} failed")
+    print(f"   Remote commands: {summary['remote_commands']} ({summary['remote_seconds']:.1f}s)")
+    
+    summary['uploaded'] = uploaded
+    summary['failed'] = failed
+    summary['synced'] = sorted(fname for fname in files if fname not in files_to_upload or fname in uploaded_files)
+    return summary
+
+
+def avatar_variant_names(filename: str) -> Dict[int, Dict[str, str]]:
+    """Return {size: {format: variant filename}} for a source avatar (img042.jpg -> img042_64.webp, ...)."""
+    stem = Path(filename).stem
+    return {
+        size: {fmt: f'{stem}_{size}.{fmt}' for fmt in AVATAR_VARIANT_FORMATS}
+        for size in AVATAR_VARIANT_SPEC['sizes']
+    }
+
+
+def avatar_variant_map(picture_url: str) -> Optional[Dict[str, Dict[str, str]]]:
+    """Return {"64": {"webp": url, "jpg": url}, ...} for a player picture URL, or None if it has no image."""
+    filename = extract_image_filename(picture_url)
+    if not filename:
+        return None
+    base_url = f'{PUBLIC_IMAGE_URL}/{VARIANT_SUBDIR}'
+    return {
+        str(size): {fmt: f'{base_url}/{name}' for fmt, name in names.items()}
+        for size, names in avatar_variant_names(filename).items()
+    }
+
+
+def render_avatar_variants(source: str, output_dir: str, spec: Dict[str, Any]) -> List[str]:
+    """
+    Decode one avatar and write every size as WebP and progressive JPEG.
+
+    Runs in a worker process. For JPEG sources, draft() lets the decoder
+    downscale while decoding, so the source is only decoded once and never at
+    more than the largest variant needs.
+    """
+    from PIL import Image, ImageOps
+
+    written = []
+    names = avatar_variant_names(os.path.basename(source))
+    largest = max(spec['sizes'])
+    with Image.open(source) as img:
+        img.draft('RGB', (largest, largest))
+        img = img.convert('RGB')
+        for size in sorted(spec['sizes'], reverse=True):
+            variant = ImageOps.fit(img, (size, size), Image.LANCZOS)
+            for fmt, name in names[size].items():
+                path = os.path.join(output_dir, name)
+                if fmt == 'webp':
+                    variant.save(path, 'WEBP', quality=spec['webp_quality'], method=4)
+                else:
+                    variant.save(path, 'JPEG', quality=spec['jpeg_quality'], optimize=True, progressive=True)
+                written.append(name)
+    return written
+
+
+def generate_avatar_variants(image_files: Dict[str, Path], output_dir: Path = None, workers: int = None):
+    """
+    Generate avatar variants for image_files in a process pool.
+
+    Sources whose content hash and variant settings match the local cache (and
+    whose outputs still exist) are skipped. Returns ({variant filename: path},
+    {"generated", "cached", "failed"}).
+    """
+    output_dir = output_dir or LOCAL_VARIANT_DIR
+    output_dir.mkdir(parents=True, exist_ok=True)
+    spec_hash = hashlib.sha256(json.dumps(AVATAR_VARIANT_SPEC, sort_keys=True).encode('utf-8')).hexdigest()[:16]
+    local_entries = hash_local_images(image_files)
+    cache = load_json_cache(LOCAL_VARIANT_CACHE, {})
+    
+    variant_files: Dict[str, Path] = {}
+    pending = {}
+    for fname, path in image_files.items():
+        names = [name for by_format in avatar_variant_names(fname).values() for name in by_format.values()]
+        expected = {'sha256': local_entries[fname]['sha256'], 'spec': spec_hash}
+        if cache.get(fname) == expected and all((output_dir / name).exists() for name in names):
+            variant_files.update({name: output_dir / name for name in names})
+        else:
+            pending[fname] = path
+    stats = {'generated': 0, 'cached': len(image_files) - len(pending), 'failed': 0}
+    
+    updates = {}
+    removals = []
+    if pending:
+        # spawn, not fork: this runs in the background image sync thread, and a
+        # fork there would copy locks held by the main thread into the workers
+        with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn')) as pool:
+            futures = {
+                pool.submit(render_avatar_variants, str(path), str(output_dir), AVATAR_VARIANT_SPEC): fname
+                for fname, path in pending.items()
+            }
+            for future in as_completed(futures):
+                fname = futures[future]
+                try:
+                    names = future.result()
+                except Exception as e:
+                    print(f"  ⚠️  Failed to generate variants for {fname}: {e}", file=sys.stderr)
+                    removals.append(fname)
+                    stats['failed'] += 1
+                    continue
+                variant_files.update({name: output_dir / name for name in names})
+                updates[fname] = {'sha256': local_entries[fname]['sha256'], 'spec': spec_hash}
+                stats['generated'] += 1
+        merge_json_cache(LOCAL_VARIANT_CACHE, updates, removals)
+    return variant_files, stats
+
 
+def upload_images(ssh_base: str, players_data: List[Dict[str, Any]], local_image_dir: Path, ssh_key: str, ssh_user: str, ssh_host: str,
+                  rebuild_manifest: bool = False, streams: int = DEFAULT_UPLOAD_STREAMS, variants: bool = False) -> Dict[str, Any]:
+    """Upload player profile images (and, with variants, their resized derivatives) to the VPS.
 
-def upload_images(ssh_base: str, players_data: List[Dict[str, Any]], local_image_dir: Path, ssh_key: str, ssh_user: str, ssh_host: str):
-    """Upload player profile images to VPS, skipping if they already exist."""
+    Returns the sync_files summary for the original images; when variants are
+    enabled it also holds a 'variants' summary and the remote command totals
+    cover both uploads.
+    """
+    summary = {'uploaded': 0, 'failed': 0, 'skipped': 0, 'remote_commands': 0, 'remote_seconds': 0.0}
     if not local_image_dir or not local_image_dir.exists():
         print(f"⚠️  Local image directory not found: {local_image_dir}")
         print("   Skipping image upload...")
-        return
+        return summary
     
     # Extract unique image filenames from players
     image_files = {}
@@ -246,77 +861,112 @@ def upload_images(ssh_base: str, players_data: List[Dict[str, Any]], local_image
     
     if not image_files:
         print("ℹ️  No images found in player data to upload")
-        return
+        return summary
     
     print(f"\n📸 Found {len(image_files)} unique images to upload")
+    summary = sync_files(ssh_base, image_files, local_image_dir, ssh_key, ssh_user, ssh_host,
+                         VPS_IMAGE_DIR, rebuild_manifest, streams, label='images')
+    if summary['uploaded'] > 0:
+        print(f"   Images available at: {PUBLIC_IMAGE_URL}/")
     
-    # Check existing images on VPS
-    existing_images = check_existing_images(ssh_base)
-    print(f"   {len(existing_images)} images already exist on VPS")
-    
-    # Filter out images that already exist
-    images_to_upload = {fname: path for fname, path in image_files.items() if fname not in existing_images}
+    if variants:
+        print(f"\n🖼️  Generating {len(AVATAR_VARIANT_SPEC['sizes'])} sizes x {len(AVATAR_VARIANT_FORMATS)} formats of avatar variants...")
+        start = time.perf_counter()
+        variant_files, stats = generate_avatar_variants(image_files)
+        print(f"   {stats['generated']} generated, {stats['cached']} unchanged (cached), {stats['failed']} failed "
+              f"in {time.perf_counter() - start:.1f}s")
+        variant_summary = sync_files(ssh_base, variant_files, LOCAL_VARIANT_DIR, ssh_key, ssh_user, ssh_host,
+                                     f'{VPS_IMAGE_DIR}/{VARIANT_SUBDIR}', rebuild_manifest, streams, label='avatar variants')
+        variant_summary.update(generated=stats['generated'], cached=stats['cached'], render_failed=stats['failed'])
+        summary['variants'] = variant_summary
+        summary['remote_commands'] += variant_summary['remote_commands']
+        summary['remote_seconds'] += variant_summary['remote_seconds']
     
-    if not images_to_upload:
-        print("✅ All images already exist on VPS, skipping upload")
-        return
-    
-    print(f"   Uploading {len(images_to_upload)} new images using rsync (fast bulk transfer)...")
-    
-    # Create temporary local directory with only files to upload
-    temp_upload_dir = tempfile.mkdtemp(prefix='player_images_')
-    
-    try:
-        # Copy files to upload to temp directory
-        for filename, local_path in images_to_upload.items():
-            shutil.copy2(local_path, os.path.join(temp_upload_dir, filename))
-        
-        # Use rsync for fast bulk transfer with compression and progress
-        # rsync is much faster than scp for multiple files:
-        # - Single SSH connection for all files
-        # - Compression for faster transfer
-        # - Can resume if interrupted
-        # - Only transfers what's needed
-        rsync_cmd = [
-            'rsync',
-            '-avz',  # archive mode, verbose, compress
-            '--progress',  # show progress
-            '--chmod=u=rw,go=r',  # set permissions (644 = rw-r--r--)
-            f'--rsync-path=sudo mkdir -p {VPS_IMAGE_DIR} && sudo rsync',  # ensure directory exists and use sudo
-            '-e', f'ssh -i {ssh_key}',  # SSH options
-            f'{temp_upload_dir}/',  # source directory (trailing slash = contents)
-            f'{ssh_user}@{ssh_host}:{VPS_IMAGE_DIR}/'  # destination
-        ]
-        
-        # After rsync, set ownership via SSH (rsync can't set ownership without root)
+    return summary
+
+
+def timed_upload_images(*args) -> Dict[str, Any]:
+    """Run upload_images and record its wall time (used as the background image sync task)."""
+    start = time.perf_counter()
+    summary = upload_images(*args)
+    summary['seconds'] = time.perf_counter() - start
+    return summary
+
+
+def run_mongosh_eval(ssh_base: str, script: str) -> subprocess.CompletedProcess:
+    """Run a mongosh script in the remote MongoDB container, quoting it safely for SSH."""
+    mongosh_cmd = shlex.join([
+        'docker', 'exec', MONGODB_CONTAINER, 'mongosh', '--quiet',
+        '-u', MONGODB_USER, '-p', MONGODB_PASSWORD,
+        '--authenticationDatabase', MONGODB_AUTH_DB,
+        '--eval', script
+    ])
+    return subprocess.run(f'{ssh_base} {shlex.quote(mongosh_cmd)}', shell=True, capture_output=True, text=True, check=True)
+
+
+VARIANT_UPDATE_BATCH_SIZE = 200
+
+VARIANT_UPDATE_JS = '''db = db.getSiblingDB('%(db)s');
+var updates = %(updates)s;
+var result = db.users.bulkWrite(updates.map(function(u) {
+  return { updateOne: { filter: { email: u.email }, update: { $set: { 'profile.picture_variants': u.variants } } } };
+}), { ordered: false });
+print('VARIANTS ' + JSON.stringify({ matched: result.matchedCount, modified: result.modifiedCount }));
+'''
+
+
+def update_picture_variants(ssh_base: str, players: List[Dict[str, Any]], synced: set) -> Dict[str, int]:
+    """
+    Set profile.picture_variants on players whose variant files were all
+    rendered and are on the VPS (synced: variant filenames from sync_files).
+
+    Runs after the image sync, so no player points at variants that do not
+    exist; the upsert itself replaces the profile without variants. Returns
+    {"updated", "without_variants", "failed"} player counts.
+    """
+    updates = []
+    for player in players:
+        filename = extract_image_filename(player['profile'].get('picture', ''))
+        if not filename:
+            continue
+        names = [name for by_format in avatar_variant_names(filename).values() for name in by_format.values()]
+        if all(name in synced for name in names):
+            updates.append({'email': player['email'], 'variants': avatar_variant_map(player['profile']['picture'])})
+    stats = {'updated': 0, 'without_variants': len(players) - len(updates), 'failed': 0}
+    for i in range(0, len(updates), VARIANT_UPDATE_BATCH_SIZE):
+        batch = updates[i:i + VARIANT_UPDATE_BATCH_SIZE]
         try:
-            result = subprocess.run(rsync_cmd, check=True, capture_output=True, text=True)
-            uploaded = len(images_to_upload)
-            failed = 0
-            
-            # Set ownership and permissions for directory and files
-            # Ensure directory has proper permissions (755) and files have read permissions (644)
-            chown_cmd = f'sudo chown -R www-data:www-data {VPS_IMAGE_DIR} && sudo find {VPS_IMAGE_DIR} -type d -exec chmod 755 {{}} \\; && sudo find {VPS_IMAGE_DIR} -type f -exec chmod 644 {{}} \\;'
-            full_cmd = f'{ssh_base} "{chown_cmd}"'
-            subprocess.run(full_cmd, shell=True, check=True, capture_output=True, text=True)
-            
-        except subprocess.CalledProcessError as e:
-            error_msg = e.stderr if isinstance(e.stderr, str) else (e.stderr.decode() if e.stderr else 'Unknown error')
-            print(f"  ❌ Failed to upload images: {error_msg}", file=sys.stderr)
-            uploaded = 0
-            failed = len(images_to_upload)
-    
-    finally:
-        # Clean up temporary directory
-        shutil.rmtree(temp_upload_dir, ignore_errors=True)
-    
-    print(f"\n✅ Image upload complete: {uploaded} uploaded, {failed} failed")
-    if uploaded > 0:
-        print(f"   Images available at: https://dutch.reignofplay.com/sim_players/images/")
+            result = run_mongosh_eval(ssh_base, VARIANT_UPDATE_JS % {'db': MONGODB_DATABASE, 'updates': json.dumps(batch)})
+            stats['updated'] += parse_marker(result.stdout, 'VARIANTS')['matched']
+        except (subprocess.CalledProcessError, ValueError) as e:
+            error_msg = e.stderr if isinstance(e, subprocess.CalledProcessError) else str(e)
+            print(f"⚠️  Error setting picture variants: {str(error_msg)[:200]}", file=sys.stderr)
+            stats['failed'] += len(batch)
+    return stats
 
 
-def upsert_players(ssh_base: str, players: List[Dict[str, Any]], batch_size: int = 50):
-    """Upsert players into MongoDB in batches (insert new or update existing)."""
+def run_with_retries(cmd: str, retries: int, metrics: SeedingMetrics = None, retry_delay: float = 1.0) -> subprocess.CompletedProcess:
+    """Run a shell command, retrying on failure. Raises the last CalledProcessError."""
+    attempt = 0
+    while True:
+        try:
+            return subprocess.run(cmd, shell=True, check=True, capture_output=True, text=True)
+        except subprocess.CalledProcessError:
+            if attempt >= retries:
+                raise
+            attempt += 1
+            if metrics:
+                metrics.retries += 1
+            time.sleep(retry_delay * attempt)
+
+
+def upsert_players(ssh_base: str, players: List[Dict[str, Any]], batch_size: int = 50, retries: int = 2, metrics: SeedingMetrics = None):
+    """Upsert players into MongoDB in batches (insert new or update existing).
+
+    Each remote step is retried up to `retries` times; upserts are keyed on email,
+    so re-running a batch is idempotent. Batch latency, retries and document counts
+    are recorded on `metrics` when given.
+    """
     total_upserted = 0
     total_inserted = 0
     total_updated = 0
@@ -325,6 +975,8 @@ def upsert_players(ssh_base: str, players: List[Dict[str, Any]], batch_size: int
     for i in range(0, len(players), batch_size):
         batch = players[i:i + batch_size]
         batch_num = i // batch_size + 1
+        batch_start = time.perf_counter()
+        batch_failed = False
         
         # Create JavaScript file with upsert operations
         js_file = '/tmp/upsert_players_batch.js'
@@ -349,48 +1001,29 @@ def upsert_players(ssh_base: str, players: List[Dict[str, Any]], batch_size: int
         
         # Copy JS file to remote server
         copy_cmd = f'scp -i {os.path.expanduser("~/.ssh/rop01_key")} {js_file} rop01_user@65.181.125.135:/tmp/upsert_players_batch.js'
-        try:
-            subprocess.run(copy_cmd, shell=True, check=True, capture_output=True, text=True)
-        except subprocess.CalledProcessError as e:
-            error_msg = e.stderr if isinstance(e.stderr, str) else (e.stderr.decode() if e.stderr else 'Unknown error')
-            print(f"⚠️  Error copying batch {batch_num} to server: {error_msg}", file=sys.stderr)
-            failed += len(batch)
-            # Clean up local file
-            try:
-                os.remove(js_file)
-            except:
-                pass
-            continue
-        
         # Copy file into MongoDB container
         copy_to_container_cmd = f'{ssh_base} "docker cp /tmp/upsert_players_batch.js {MONGODB_CONTAINER}:/tmp/upsert_players_batch.js"'
-        try:
-            subprocess.run(copy_to_container_cmd, shell=True, check=True, capture_output=True, text=True)
-        except subprocess.CalledProcessError as e:
-            error_msg = e.stderr if isinstance(e.stderr, str) else (e.stderr.decode() if e.stderr else 'Unknown error')
-            print(f"⚠️  Error copying batch {batch_num} to container: {error_msg}", file=sys.stderr)
-            failed += len(batch)
-            # Clean up local file
-            try:
-                os.remove(js_file)
-            except:
-                pass
-            continue
-        
         # Execute the JavaScript file
         mongosh_cmd = f'docker exec {MONGODB_CONTAINER} mongosh -u {MONGODB_USER} -p "{MONGODB_PASSWORD}" --authenticationDatabase {MONGODB_AUTH_DB} /tmp/upsert_players_batch.js'
-        
         full_cmd = f'{ssh_base} "{mongosh_cmd}"'
         
-        try:
-            result = subprocess.run(
-                full_cmd,
-                shell=True,
-                capture_output=True,
-                text=True,
-                check=True
-            )
-            
+        steps = [
+            (copy_cmd, 'copying batch {} to server'),
+            (copy_to_container_cmd, 'copying batch {} to container'),
+            (full_cmd, 'upserting batch {}'),
+        ]
+        result = None
+        for cmd, description in steps:
+            try:
+                result = run_with_retries(cmd, retries, metrics)
+            except subprocess.CalledProcessError as e:
+                error_msg = e.stderr if isinstance(e.stderr, str) else (e.stderr.decode() if e.stderr else 'Unknown error')
+                print(f"⚠️  Error {description.format(batch_num)}: {error_msg[:200]}", file=sys.stderr)
+                failed += len(batch)
+                batch_failed = True
+                break
+        
+        if not batch_failed:
             # Parse inserted and updated counts
             for line in result.stdout.split('\n'):
                 if 'Inserted:' in line and 'Updated:' in line and not line.startswith('Mongo'):
@@ -404,10 +1037,9 @@ def upsert_players(ssh_base: str, players: List[Dict[str, Any]], batch_size: int
                         print(f"  ✅ Batch {batch_num}: Inserted {inserted_count}, Updated {updated_count} players")
                     except (ValueError, IndexError):
                         pass
-        except subprocess.CalledProcessError as e:
-            error_msg = e.stderr if isinstance(e.stderr, str) else (e.stderr[:200] if e.stderr else 'Unknown error')
-            print(f"⚠️  Error upserting batch {batch_num}: {error_msg}", file=sys.stderr)
-            failed += len(batch)
+        
+        if metrics:
+            metrics.observe_batch(time.perf_counter() - batch_start)
         
         # Clean up local file
         try:
@@ -415,6 +1047,11 @@ def upsert_players(ssh_base: str, players: List[Dict[str, Any]], batch_size: int
         except:
             pass
     
+    if metrics:
+        metrics.inserted += total_inserted
+        metrics.updated += total_updated
+        metrics.failed += failed
+    
     return total_upserted, total_inserted, total_updated, failed
 
 
@@ -422,9 +1059,19 @@ def main():
     parser = argparse.ArgumentParser(description='Add computer players to MongoDB')
     parser.add_argument('--vm-name', default='rop01', help='VM name for SSH connection')
     parser.add_argument('--json-file', default='templates/comp_players.json', help='Path to players JSON file')
+    parser.add_argument('--create-indexes', action='store_true', help='Create missing seeding indexes without prompting')
+    parser.add_argument('--require-indexes', action='store_true', help='Fail instead of warning when the email index is missing')
+    parser.add_argument('--skip-index-check', action='store_true', help='Skip the users index preflight')
     parser.add_argument('--ssh-key', default='~/.ssh/rop01_key', help='SSH key path')
     parser.add_argument('--ssh-user', default='rop01_user', help='SSH user')
     parser.add_argument('--ssh-host', default='65.181.125.135', help='SSH host')
+    parser.add_argument('--retries', type=int, default=2, help='Retries per remote step of each upsert batch')
+    parser.add_argument('--metrics-file', default=DEFAULT_METRICS_FILE, help='Prometheus text-exposition output file')
+    parser.add_argument('--rebuild-manifest', action='store_true', help='Rebuild the VPS image manifest from the files actually on the VPS')
+    parser.add_argument('--upload-streams', type=int, default=DEFAULT_UPLOAD_STREAMS,
+                        help='Parallel rsync streams for image upload (sharded by file size)')
+    parser.add_argument('--skip-variants', action='store_true', help='Do not generate/upload resized avatar variants')
+    parser.add_argument('--pushgateway', help='Pushgateway-compatible URL to push metrics to (e.g. http://localhost:9091)')
     
     args = parser.parse_args()
     
@@ -451,29 +1098,85 @@ def main():
     ssh_key_expanded = os.path.expanduser(args.ssh_key)
     ssh_base = f'ssh -i {ssh_key_expanded} {args.ssh_user}@{args.ssh_host}'
     
-    # Upload images first (before inserting players)
-    print("\n📸 Checking and uploading player profile images...")
-    upload_images(ssh_base, players_data, LOCAL_IMAGE_DIR, ssh_key_expanded, args.ssh_user, args.ssh_host)
+    # Resized avatar variants need Pillow; seeding still works without them
+    with_variants = not args.skip_variants
+    if with_variants and importlib.util.find_spec('PIL') is None:
+        print("⚠️  Pillow is not installed, skipping avatar variants (pip install Pillow)")
+        with_variants = False
     
-    # Skip checking existing players (MongoDB will handle duplicates)
-    print("🔍 Preparing players for insertion...")
+    # Make sure upserts (by email) and comp player counts are index-backed.
+    # Runs before the image sync starts, so its prompt is not mixed with the upload progress line.
+    if not args.skip_index_check:
+        print("\n🔎 Checking users indexes...")
+        if not preflight_indexes(functools.partial(run_mongosh_eval, ssh_base), MONGODB_DATABASE,
+                                 create_indexes=args.create_indexes, require_indexes=args.require_indexes):
+            sys.exit(1)
     
-    # Create all player documents
-    players_to_create = []
-    current_time = datetime.utcnow()
+    # Start the image sync in the background: it is network/rsync-bound and
+    # independent of the database upserts, so the two run concurrently.
+    print("\n📸 Checking and uploading player profile images (in background)...")
+    run_start = time.perf_counter()
+    image_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='image_sync')
+    image_future = image_executor.submit(
+        timed_upload_images, ssh_base, players_data, LOCAL_IMAGE_DIR, ssh_key_expanded, args.ssh_user, args.ssh_host,
+        args.rebuild_manifest, args.upload_streams, with_variants
+    )
     
-    for player_json in players_data:
-        player_doc = create_player_document(player_json, current_time)
-        players_to_create.append(player_doc)
+    try:
+        # Skip checking existing players (MongoDB will handle duplicates)
+        print("🔍 Preparing players for insertion...")
+        
+        # Create all player documents
+        players_to_create = []
+        current_time = datetime.utcnow()
+        
+        # Picture variants are set once the image sync has rendered and uploaded them
+        for player_json in players_data:
+            player_doc = create_player_document(player_json, current_time)
+            players_to_create.append(player_doc)
+        
+        if not players_to_create:
+            print(f"✅ All {len(players_data)} players already exist in database")
+            return
+        
+        print(f"\n➕ Upserting {len(players_to_create)} players (insert new or update existing)...")
+        
+        # Upsert players (insert new or update existing)
+        metrics = SeedingMetrics()
+        total_upserted, total_inserted, total_updated, failed = upsert_players(ssh_base, players_to_create, retries=args.retries, metrics=metrics)
+        metrics.finish()
+    finally:
+        # Wait for the image sync whatever happened to the upserts
+        image_executor.shutdown(wait=True)
     
-    if not players_to_create:
-        print(f"✅ All {len(players_data)} players already exist in database")
-        return
+    try:
+        image_summary = image_future.result()
+    except Exception as e:
+        print(f"❌ Image upload failed: {e}", file=sys.stderr)
+        image_summary = None
     
-    print(f"\n➕ Upserting {len(players_to_create)} players (insert new or update existing)...")
+    # Point players at their variants only for files that were rendered and are on the VPS
+    variant_update = None
+    if image_summary is not None and image_summary.get('variants') is not None:
+        variant_update = update_picture_variants(ssh_base, players_to_create, set(image_summary['variants']['synced']))
+    wall_seconds = time.perf_counter() - run_start
     
-    # Upsert players (insert new or update existing)
-    total_upserted, total_inserted, total_updated, failed = upsert_players(ssh_base, players_to_create)
+    print("\n⏱️  Pipeline timing:")
+    if image_summary is not None:
+        print(f"  📸 Images: {image_summary['uploaded']} uploaded, {image_summary['failed']} failed, "
+              f"{image_summary['skipped']} unchanged ({image_summary['seconds']:.1f}s)")
+        variant_summary = image_summary.get('variants')
+        if variant_summary is not None:
+            print(f"  🖼️  Variants: {variant_summary['generated']} avatars rendered, {variant_summary['cached']} cached, "
+                  f"{variant_summary['render_failed']} failed to render; {variant_summary['uploaded']} files uploaded, "
+                  f"{variant_summary['failed']} failed")
+        if variant_update is not None:
+            print(f"  🔗 Picture variants set on {variant_update['updated']} players "
+                  f"({variant_update['without_variants']} without, {variant_update['failed']} failed)")
+        print(f"  🔌 Remote image commands: {image_summary['remote_commands']} "
+              f"({image_summary['remote_seconds']:.1f}s)")
+    print(f"  🗄️  Players: {total_upserted} upserted, {failed} failed ({metrics.duration_seconds:.1f}s)")
+    print(f"  ⌛ Total wall time: {wall_seconds:.1f}s")
     
     # Summary by rank
     rank_summary = {}
@@ -493,20 +1196,25 @@ def main():
     for rank, count in sorted(rank_summary.items()):
         print(f"  - {rank}: {count} players")
     
-    # Verify final count
-    verify_script = f'''db = db.getSiblingDB('{MONGODB_DATABASE}'); var count = db.users.countDocuments({{"is_comp_player": true}}); print("Total comp players in database: " + count);'''
+    # Export seeding metrics for Prometheus
+    print(f"\n⏱️  {metrics.documents_per_second:.1f} documents upserted/s over {metrics.duration_seconds:.1f}s ({metrics.failed} failed, {metrics.retries} retries)")
+    try:
+        metrics.write_textfile(args.metrics_file)
+        print(f"📈 Metrics written to {args.metrics_file}")
+    except OSError as e:
+        print(f"⚠️  Error writing metrics file: {e}", file=sys.stderr)
+    if args.pushgateway:
+        try:
+            metrics.push(args.pushgateway, instance=args.vm_name)
+            print(f"📈 Metrics pushed to {args.pushgateway}")
+        except (urllib.error.URLError, OSError) as e:
+            print(f"⚠️  Error pushing metrics: {e}", file=sys.stderr)
     
-    mongosh_cmd = f'docker exec {MONGODB_CONTAINER} mongosh -u {MONGODB_USER} -p "{MONGODB_PASSWORD}" --authenticationDatabase {MONGODB_AUTH_DB} --eval "{verify_script}"'
-    full_cmd = f'{ssh_base} "{mongosh_cmd}"'
+    # Verify final count (timed server-side, excluding connection overhead)
+    verify_script = f'''db = db.getSiblingDB('{MONGODB_DATABASE}'); var t0 = Date.now(); var count = db.users.countDocuments({{"is_comp_player": true}}); print("Total comp players in database: " + count + " (counted in " + (Date.now() - t0) + " ms)");'''
     
     try:
-        result = subprocess.run(
-            full_cmd,
-            shell=True,
-            capture_output=True,
-            text=True,
-            check=True
-        )
+        result = run_mongosh_eval(ssh_base, verify_script)
         for line in result.stdout.split('\n'):
             if 'Total comp players' in line:
                 print(f"\n📊 {line}")
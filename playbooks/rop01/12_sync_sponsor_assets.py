@@ -0,0 +1,349 @@
+#!/usr/bin/env python3
+"""
+Sync Sponsor Assets Script
+This script syncs the local sponsors/images directory (card back and other sponsor art)
+to the VPS at /var/www/dutch.reignofplay.com/sponsors/images.
+
+Every asset is published under a content-hashed name (card_back.png ->
+card_back.<hash>.png) that nginx serves as immutable for a year, plus a small
+manifest.json (short TTL) mapping asset names to their current hashed URLs:
+
+    {"version": 1, "updated_at": "...",
+     "assets": {"card_back.png": {"file": "card_back.0123456789ab.png", "url": "...", "sha256": "...", "size": 1234}},
+     "retired": {"card_back.ba9876543210.png": "2026-01-01T00:00:00Z"}}
+
+The plain name (card_back.png) is still uploaded for clients that do not read
+the manifest yet. Hashed files replaced by newer content are listed under
+"retired" and deleted once they have been retired longer than the retention
+window, so clients holding an older manifest can still load them meanwhile.
+
+Only files whose content differs from the VPS copy are uploaded:
+- Remote checksums and the current manifest are read in a single SSH round trip
+- All commands share one multiplexed SSH connection
+- Changed files are written to temporary names and renamed into place together
+  at the end of the transfer (rsync --delay-updates), and the manifest is
+  swapped in only after the files it points to are in place
+
+Runs non-interactively by default; pass --confirm to review the plan once before uploading.
+
+Usage:
+    python3 12_sync_sponsor_assets.py [--source DIR] [--confirm] [--dry-run] [--retention-days 30]
+"""
+
+import os
+import re
+import json
+import argparse
+import hashlib
+import shlex
+import shutil
+import subprocess
+import sys
+import tempfile
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict, Any, Tuple
+
+# Colors for output
+class Colors:
+    RED = '\033[0;31m'
+    GREEN = '\033[0;32m'
+    YELLOW = '\033[1;33m'
+    BLUE = '\033[0;34m'
+    NC = '\033[0m'  # No Color
+
+# Get script directory and project root
+SCRIPT_DIR = Path(__file__).parent.resolve()
+PROJECT_ROOT = SCRIPT_DIR.parent.parent
+
+# Configuration
+VPS_SSH_TARGET = os.environ.get('VPS_SSH_TARGET', 'rop01_user@65.181.125.135')
+VPS_SSH_KEY = os.environ.get('VPS_SSH_KEY', os.path.expanduser('~/.ssh/rop01_key'))
+REMOTE_IMAGE_DIR = '/var/www/dutch.reignofplay.com/sponsors/images'
+PUBLIC_BASE_URL = 'https://dutch.reignofplay.com/sponsors/images'
+DEFAULT_LOCAL_IMAGE_DIR = PROJECT_ROOT / 'sponsors' / 'images'
+VALID_EXTENSIONS = ['.png', '.jpg', '.jpeg', '.gif', '.webp']
+MANIFEST_NAME = 'manifest.json'
+# Must match the hashed-asset location in templates/nginx-site.conf.j2
+HASH_LENGTH = 12
+HASHED_NAME_RE = re.compile(r'^.+\.[0-9a-f]{%d}\.[A-Za-z]+$' % HASH_LENGTH)
+DEFAULT_RETENTION_DAYS = 30
+REMOTE_STATE_SEPARATOR = '--- manifest ---'
+
+def check_ssh_key():
+    """Check if SSH key exists."""
+    key_path = Path(VPS_SSH_KEY)
+    if not key_path.exists():
+        print(f"{Colors.RED}Error: SSH key not found at {VPS_SSH_KEY}{Colors.NC}")
+        print(f"{Colors.YELLOW}Please run 01_setup_ssh_key.sh first to generate the SSH key.{Colors.NC}")
+        return False
+    return True
+
+def collect_local_assets(source_dir: Path) -> Dict[str, Path]:
+    """Return {filename: path} for the files directly inside source_dir (hidden files are skipped)."""
+    assets = {}
+    for path in sorted(source_dir.iterdir()):
+        if not path.is_file() or path.name.startswith('.'):
+            continue
+        if path.suffix.lower() not in VALID_EXTENSIONS:
+            print(f"{Colors.YELLOW}Warning: {path.name} may not be a valid image format "
+                  f"(valid extensions: {', '.join(VALID_EXTENSIONS)}){Colors.NC}")
+        assets[path.name] = path
+    return assets
+
+def file_sha256(path: Path) -> str:
+    """Return the hex SHA-256 of a file."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def hashed_name(filename: str, sha256: str) -> str:
+    """Return the content-hashed name for an asset: card_back.png -> card_back.<hash>.png."""
+    path = Path(filename)
+    return f'{path.stem}.{sha256[:HASH_LENGTH]}{path.suffix}'
+
+def ssh_cmd(control_path: str, remote_command: str = None):
+    """Build an ssh command that reuses the session's master connection."""
+    cmd = ['ssh', '-i', VPS_SSH_KEY, '-o', f'ControlPath={control_path}', VPS_SSH_TARGET]
+    if remote_command:
+        cmd.append(remote_command)
+    return cmd
+
+def open_session(control_path: str):
+    """Open the master SSH connection every later command is multiplexed over."""
+    subprocess.run([
+        'ssh', '-i', VPS_SSH_KEY,
+        '-o', 'ControlMaster=yes',
+        '-o', f'ControlPath={control_path}',
+        '-o', 'ControlPersist=60',
+        '-fN', VPS_SSH_TARGET
+    ], check=True, capture_output=True, text=True)
+
+def close_session(control_path: str):
+    """Close the master SSH connection."""
+    subprocess.run(['ssh', '-o', f'ControlPath={control_path}', '-O', 'exit', VPS_SSH_TARGET],
+                   capture_output=True, text=True)
+
+def fetch_remote_state(control_path: str) -> Tuple[Dict[str, str], Dict[str, Any]]:
+    """Return ({filename: sha256}, manifest) for the VPS directory, in one round trip."""
+    remote_script = (
+        f'cd {REMOTE_IMAGE_DIR} 2>/dev/null && '
+        f'{{ find . -maxdepth 1 -type f ! -name ".*" ! -name {MANIFEST_NAME} -exec sha256sum {{}} + ; '
+        f'echo "{REMOTE_STATE_SEPARATOR}"; cat {MANIFEST_NAME} 2>/dev/null; }} || true'
+    )
+    result = subprocess.run(ssh_cmd(control_path, remote_script), check=True, capture_output=True, text=True)
+    listing, _, manifest_body = result.stdout.partition(f'{REMOTE_STATE_SEPARATOR}\n')
+    checksums = {}
+    for line in listing.splitlines():
+        parts = line.split(None, 1)
+        if len(parts) == 2:
+            checksums[os.path.basename(parts[1].strip())] = parts[0]
+    manifest = json.loads(manifest_body) if manifest_body.strip() else {}
+    return checksums, manifest
+
+def plan_manifest(local_checksums: Dict[str, str], assets: Dict[str, Path], remote_checksums: Dict[str, str],
+                  old_manifest: Dict[str, Any], retention_days: int, now: datetime) -> Tuple[Dict[str, Any], list]:
+    """
+    Build the new manifest and return it with the hashed files whose retention has expired.
+
+    Hashed files on the VPS that the new manifest no longer points to are
+    retired with the current time (or keep their earlier retirement time).
+    """
+    stamp = now.strftime('%Y-%m-%dT%H:%M:%SZ')
+    new_assets = {}
+    for name, sha256 in local_checksums.items():
+        file_name = hashed_name(name, sha256)
+        new_assets[name] = {
+            'file': file_name,
+            'url': f'{PUBLIC_BASE_URL}/{file_name}',
+            'sha256': sha256,
+            'size': assets[name].stat().st_size,
+        }
+    current_files = {entry['file'] for entry in new_assets.values()}
+
+    retired = dict(old_manifest.get('retired', {}))
+    for name in remote_checksums:
+        if HASHED_NAME_RE.match(name) and name not in current_files:
+            retired.setdefault(name, stamp)
+    for name in list(retired):
+        # Back in use, or already gone from the VPS
+        if name in current_files or name not in remote_checksums:
+            retired.pop(name)
+
+    cutoff = now - timedelta(days=retention_days)
+    expired = sorted(name for name, retired_at in retired.items()
+                     if datetime.strptime(retired_at, '%Y-%m-%dT%H:%M:%SZ') <= cutoff)
+    for name in expired:
+        retired.pop(name)
+
+    manifest = {'version': 1, 'updated_at': stamp, 'assets': new_assets, 'retired': retired}
+    return manifest, expired
+
+def publish_manifest(control_path: str, manifest: Dict[str, Any], expired):
+    """Swap the manifest into place atomically, then delete expired hashed files (one round trip)."""
+    manifest_path = f'{REMOTE_IMAGE_DIR}/{MANIFEST_NAME}'
+    remote_script = (
+        f'sudo install -d -o www-data -g www-data -m 755 {REMOTE_IMAGE_DIR} && '
+        f'sudo tee {manifest_path}.tmp > /dev/null && '
+        f'sudo chown www-data:www-data {manifest_path}.tmp && '
+        f'sudo chmod 644 {manifest_path}.tmp && '
+        f'sudo mv -f {manifest_path}.tmp {manifest_path}'
+    )
+    if expired:
+        remote_script += ' && sudo rm -f -- ' + ' '.join(shlex.quote(f'{REMOTE_IMAGE_DIR}/{name}') for name in expired)
+    body = json.dumps(manifest, indent=2, sort_keys=True) + '\n'
+    subprocess.run(ssh_cmd(control_path, remote_script), input=body, check=True, capture_output=True, text=True)
+
+def upload_files(control_path: str, source_dir: Path, filenames):
+    """Upload filenames (relative to source_dir) and swap them into place together."""
+    rsync_cmd = [
+        'rsync',
+        '-a',  # archive mode (images are already compressed, so no -z)
+        '--files-from=-',  # transfer only the listed files (read from stdin)
+        '--ignore-times',  # listed files are known to differ; don't trust size/mtime
+        '--delay-updates',  # rename all updated files into place at the end
+        '--chown=www-data:www-data',  # owned by nginx user
+        '--chmod=D755,F644',  # directories rwxr-xr-x, files rw-r--r--
+        f'--rsync-path=sudo install -d -o www-data -g www-data -m 755 {REMOTE_IMAGE_DIR} && sudo rsync',
+        '-e', f'ssh -i {VPS_SSH_KEY} -o ControlPath={control_path}',  # reuse the master connection
+        f'{source_dir}/',
+        f'{VPS_SSH_TARGET}:{REMOTE_IMAGE_DIR}/'
+    ]
+    file_list = ''.join(f'{name}\n' for name in sorted(filenames))
+    subprocess.run(rsync_cmd, input=file_list, check=True, capture_output=True, text=True)
+
+def sync_assets(source_dir: Path, confirm: bool = False, dry_run: bool = False, retention_days: int = DEFAULT_RETENTION_DAYS):
+    """Sync the sponsor assets in source_dir to the VPS."""
+    assets = collect_local_assets(source_dir)
+    if not assets:
+        print(f"{Colors.YELLOW}No sponsor assets found in {source_dir}{Colors.NC}")
+        return True
+
+    print(f"\n{Colors.BLUE}Configuration:{Colors.NC}")
+    print(f"  VPS Target: {VPS_SSH_TARGET}")
+    print(f"  SSH Key: {VPS_SSH_KEY}")
+    print(f"  Local Directory: {source_dir} ({len(assets)} files)")
+    print(f"  Remote Directory: {REMOTE_IMAGE_DIR}")
+    print(f"  Retention for replaced versions: {retention_days} days")
+    print()
+
+    local_checksums = {name: file_sha256(path) for name, path in assets.items()}
+
+    control_dir = tempfile.mkdtemp(prefix='dutch_ssh_')
+    control_path = os.path.join(control_dir, 'master')
+    try:
+        try:
+            open_session(control_path)
+            remote_checksums, old_manifest = fetch_remote_state(control_path)
+        except subprocess.CalledProcessError as e:
+            print(f"{Colors.RED}✗ Failed to read remote checksums: {e.stderr.strip()}{Colors.NC}")
+            return False
+        except ValueError as e:
+            print(f"{Colors.RED}✗ Remote {MANIFEST_NAME} is not valid JSON: {e}{Colors.NC}")
+            return False
+        except FileNotFoundError:
+            print(f"{Colors.RED}✗ ssh command not found. Please install OpenSSH client.{Colors.NC}")
+            return False
+
+        manifest, expired = plan_manifest(local_checksums, assets, remote_checksums, old_manifest,
+                                          retention_days, datetime.utcnow())
+
+        # Upload the hashed copy of new content, and the plain name wherever it differs
+        uploads = {}
+        for name, path in assets.items():
+            sha256 = local_checksums[name]
+            file_name = manifest['assets'][name]['file']
+            if remote_checksums.get(file_name) != sha256:
+                uploads[file_name] = path
+            if remote_checksums.get(name) != sha256:
+                uploads[name] = path
+        manifest_changed = (old_manifest.get('assets') != manifest['assets']
+                            or old_manifest.get('retired', {}) != manifest['retired'])
+
+        for name in sorted(uploads):
+            state = 'changed' if name in remote_checksums else 'new'
+            print(f"  {Colors.YELLOW}↑{Colors.NC} {name} ({state})")
+        for name in expired:
+            print(f"  {Colors.YELLOW}✗{Colors.NC} {name} (retired more than {retention_days} days ago)")
+        if not uploads and not expired and not manifest_changed:
+            print(f"{Colors.GREEN}✓ All {len(assets)} sponsor assets already up to date{Colors.NC}")
+            return True
+        print(f"\n{len(uploads)} file(s) to upload, {len(expired)} to delete, "
+              f"{len(manifest['retired'])} retired version(s) kept")
+
+        if dry_run:
+            print(f"{Colors.YELLOW}Dry run: nothing changed.{Colors.NC}")
+            return True
+        if confirm:
+            response = input("Proceed with upload? (y/n): ").strip().lower()
+            if response != 'y':
+                print(f"{Colors.YELLOW}Upload cancelled.{Colors.NC}")
+                return False
+
+        if uploads:
+            print(f"\n{Colors.BLUE}Uploading {len(uploads)} file(s)...{Colors.NC}")
+            # Stage the files under their published names (hard links, no copying)
+            staging_dir = Path(control_dir) / 'staging'
+            staging_dir.mkdir()
+            for file_name, path in uploads.items():
+                try:
+                    os.link(path, staging_dir / file_name)
+                except OSError:
+                    shutil.copy2(path, staging_dir / file_name)
+            try:
+                upload_files(control_path, staging_dir, list(uploads))
+            except subprocess.CalledProcessError as e:
+                print(f"{Colors.RED}✗ Upload failed: {e.stderr.strip()}{Colors.NC}")
+                return False
+            except FileNotFoundError:
+                print(f"{Colors.RED}✗ rsync command not found. Please install rsync.{Colors.NC}")
+                return False
+
+        # Point clients at the new files only once they are all in place
+        print(f"\n{Colors.BLUE}Publishing {MANIFEST_NAME}...{Colors.NC}")
+        try:
+            publish_manifest(control_path, manifest, expired)
+        except subprocess.CalledProcessError as e:
+            print(f"{Colors.RED}✗ Failed to publish manifest: {e.stderr.strip()}{Colors.NC}")
+            return False
+    finally:
+        if os.path.exists(control_path):
+            close_session(control_path)
+        shutil.rmtree(control_dir, ignore_errors=True)
+
+    print(f"\n{Colors.GREEN}=== Sync Complete ==={Colors.NC}")
+    print(f"Manifest: {Colors.BLUE}{PUBLIC_BASE_URL}/{MANIFEST_NAME}{Colors.NC}")
+    for name, entry in sorted(manifest['assets'].items()):
+        print(f"  {name} -> {Colors.BLUE}{entry['url']}{Colors.NC}")
+    print()
+
+    return True
+
+def main():
+    """Main function."""
+    parser = argparse.ArgumentParser(description='Sync sponsor assets (card back, etc.) to the VPS')
+    parser.add_argument('--source', default=str(DEFAULT_LOCAL_IMAGE_DIR), help='Local sponsor images directory')
+    parser.add_argument('--confirm', action='store_true', help='Ask once for confirmation before uploading')
+    parser.add_argument('--dry-run', action='store_true', help='Only show what would be uploaded')
+    parser.add_argument('--retention-days', type=int, default=DEFAULT_RETENTION_DAYS,
+                        help='Days to keep replaced hashed versions before deleting them')
+    args = parser.parse_args()
+
+    print(f"{Colors.BLUE}=== Sponsor Asset Sync Script ==={Colors.NC}\n")
+
+    # Check if SSH key exists
+    if not check_ssh_key():
+        sys.exit(1)
+
+    source_dir = Path(args.source).resolve()
+    if not source_dir.is_dir():
+        print(f"{Colors.RED}Error: Sponsor images directory not found at {source_dir}{Colors.NC}")
+        sys.exit(1)
+
+    if not sync_assets(source_dir, confirm=args.confirm, dry_run=args.dry_run, retention_days=args.retention_days):
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,231 @@
+#!/usr/bin/env python3
+"""
+Analyze what the build scripts send to the Docker daemon.
+
+Walks python_base_04 (06_build_and_push_docker.py) and/or dart_bkend_base_01
+(07_build_and_push_dart_docker.py) the way the daemon does, honouring
+.dockerignore, and reports:
+
+- total files and bytes in the context;
+- the largest files and directories;
+- the most frequently changed files (git history), since every change to a
+  file copied early in the Dockerfile invalidates the layers after it;
+- proposed .dockerignore rules, ranked by bytes saved: known caches and build
+  output (__pycache__, .dart_tool, logs, ...) and anything git itself ignores.
+
+Usage:
+    python3 analyze_build_context.py [--context flask|dart|all|PATH] [--top 15] [--since-days 90] [--budget-mb 50]
+
+With --budget-mb (or CONTEXT_BUDGET_MB) the script exits 1 when a context is
+over budget; the build scripts enforce the same CONTEXT_BUDGET_MB before
+building.
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+from collections import Counter, defaultdict
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+from build_context import is_ignored, iter_context_files, load_dockerignore, parse_dockerignore
+
+
+class Colors:
+    RED = '\033[0;31m'
+    GREEN = '\033[0;32m'
+    YELLOW = '\033[1;33m'
+    BLUE = '\033[0;34m'
+    NC = '\033[0m'  # No Color
+
+
+SCRIPT_DIR = Path(__file__).parent.resolve()
+PROJECT_ROOT = SCRIPT_DIR.parent.parent
+
+CONTEXTS = {
+    'flask': PROJECT_ROOT / 'python_base_04',
+    'dart': PROJECT_ROOT / 'dart_bkend_base_01',
+}
+
+# Directory / file name patterns that never belong in an image build context
+JUNK_DIRS = ['__pycache__', '.pytest_cache', '.mypy_cache', '.dart_tool', '.git', '.idea', '.vscode',
+             'node_modules', '.venv', 'venv', 'logs', 'coverage', 'htmlcov', 'build', 'backup', 'backups']
+JUNK_FILES = ['*.pyc', '*.log', '.DS_Store', '*.swp', '*.tmp']
+# Proposals smaller than this are not worth a rule
+MIN_PROPOSAL_BYTES = 10_000
+
+
+def human(size: float) -> str:
+    for unit in ('B', 'KB', 'MB', 'GB'):
+        if size < 1000 or unit == 'GB':
+            return f"{size:.0f} {unit}" if unit == 'B' else f"{size:.1f} {unit}"
+        size /= 1000
+
+
+def scan_context(context: Path) -> Tuple[Dict[str, int], List[Tuple[str, int]]]:
+    """Return ({relative path: size} of files sent to the daemon, [(relative path, size)] of ignored files)."""
+    rules = load_dockerignore(context)
+    included = {}
+    for path, rel_path in iter_context_files(context, rules):
+        # Directory entries carry no content
+        if path.is_symlink() or not path.is_dir():
+            included[rel_path] = path.lstat().st_size
+    ignored = []
+    for root, dirs, files in os.walk(context):
+        dirs.sort()
+        # Symlinked directories are context entries of their own (not followed)
+        for name in files + [d for d in dirs if os.path.islink(os.path.join(root, d))]:
+            path = Path(root) / name
+            rel_path = path.relative_to(context).as_posix()
+            if rel_path not in included:
+                ignored.append((rel_path, path.lstat().st_size))
+    return included, ignored
+
+
+def directory_sizes(files: Dict[str, int]) -> Dict[str, Tuple[int, int]]:
+    """Aggregate file sizes into every ancestor directory: {dir/: (bytes, files)}."""
+    totals = defaultdict(lambda: [0, 0])
+    for rel_path, size in files.items():
+        parts = rel_path.split('/')[:-1]
+        for depth in range(1, len(parts) + 1):
+            entry = totals['/'.join(parts[:depth]) + '/']
+            entry[0] += size
+            entry[1] += 1
+    return {name: (size, count) for name, (size, count) in totals.items()}
+
+
+def git_change_counts(context: Path, since_days: int) -> Counter:
+    """Number of commits touching each context file in the last since_days days (empty outside git)."""
+    result = subprocess.run(
+        ['git', '-C', str(context), 'log', f'--since={since_days} days ago', '--name-only',
+         '--format=', '--relative', '--', '.'],
+        capture_output=True, text=True,
+    )
+    if result.returncode != 0:
+        return Counter()
+    return Counter(line for line in result.stdout.splitlines() if line)
+
+
+def git_ignored_files(context: Path) -> set:
+    """Context files that git ignores (caches, build output, local data)."""
+    result = subprocess.run(
+        ['git', '-C', str(context), 'ls-files', '--others', '--ignored', '--exclude-standard', '--', '.'],
+        capture_output=True, text=True,
+    )
+    if result.returncode != 0:
+        return set()
+    return set(result.stdout.splitlines())
+
+
+def propose_rules(files: Dict[str, int], git_ignored: set) -> List[Tuple[str, int, int, str]]:
+    """
+    Propose .dockerignore rules for files that are in the context. Returns
+    [(rule, bytes, files, reason)] sorted by bytes. Rules never exclude the
+    Dockerfile, and a rule is only proposed for what it would really remove.
+    """
+    candidates = {}
+    for name in JUNK_DIRS:
+        candidates[f'**/{name}'] = 'cache / build output'
+    for pattern in JUNK_FILES:
+        candidates[f'**/{pattern}'] = 'cache / log file'
+    # Directories whose content git ignores entirely (e.g. local data, generated assets)
+    ignored_dirs = Counter()
+    for rel_path in git_ignored:
+        if rel_path in files and '/' in rel_path:
+            ignored_dirs[rel_path.split('/')[0]] += 1
+    for top_dir, count in ignored_dirs.items():
+        in_context = sum(1 for rel_path in files if rel_path.startswith(top_dir + '/'))
+        if count == in_context:
+            candidates[top_dir] = 'ignored by git'
+    for rel_path in git_ignored:
+        if rel_path in files and rel_path.split('/')[0] not in candidates:
+            candidates.setdefault(rel_path, 'ignored by git')
+
+    proposals = []
+    remaining = dict(files)
+    for rule, reason in candidates.items():
+        compiled = parse_dockerignore([rule])
+        matched = [rel_path for rel_path in remaining if is_ignored(rel_path, compiled)]
+        if not matched or any(Path(rel_path).name == 'Dockerfile' for rel_path in matched):
+            continue
+        size = sum(remaining.pop(rel_path) for rel_path in matched)
+        if size >= MIN_PROPOSAL_BYTES:
+            proposals.append((rule, size, len(matched), reason))
+    return sorted(proposals, key=lambda proposal: -proposal[1])
+
+
+def report(name: str, context: Path, top: int, since_days: int, budget_mb: float) -> bool:
+    """Print the analysis of one context; returns False if it is over budget."""
+    print(f"\n{Colors.BLUE}=== {name}: {context} ==={Colors.NC}")
+    if not context.is_dir():
+        print(f"{Colors.YELLOW}⚠️  Context directory not found, skipping{Colors.NC}")
+        return True
+    files, ignored = scan_context(context)
+    total = sum(files.values())
+    ignored_total = sum(size for _, size in ignored)
+    print(f"  Sent to the daemon: {len(files)} files, {human(total)}")
+    print(f"  Excluded by .dockerignore: {len(ignored)} files, {human(ignored_total)}")
+
+    changes = git_change_counts(context, since_days)
+
+    print(f"\n  {Colors.BLUE}Largest files{Colors.NC} (changes in the last {since_days} days)")
+    for rel_path, size in sorted(files.items(), key=lambda item: -item[1])[:top]:
+        print(f"    {human(size):>10}  {changes.get(rel_path, 0):>4}×  {rel_path}")
+
+    print(f"\n  {Colors.BLUE}Largest directories{Colors.NC}")
+    dirs = directory_sizes(files)
+    for dir_name, (size, count) in sorted(dirs.items(), key=lambda item: -item[1][0])[:top]:
+        dir_changes = sum(n for rel_path, n in changes.items() if rel_path.startswith(dir_name))
+        print(f"    {human(size):>10}  {count:>6} files  {dir_changes:>4}×  {dir_name}")
+
+    churn = [(rel_path, count) for rel_path, count in changes.most_common() if rel_path in files]
+    if churn:
+        print(f"\n  {Colors.BLUE}Most frequently changed{Colors.NC} (each change invalidates the layers after the COPY that includes it)")
+        for rel_path, count in churn[:top]:
+            print(f"    {count:>4}×  {human(files[rel_path]):>10}  {rel_path}")
+
+    proposals = propose_rules(files, git_ignored_files(context))
+    if proposals:
+        saved = sum(size for _, size, _, _ in proposals)
+        print(f"\n  {Colors.YELLOW}Proposed .dockerignore rules{Colors.NC} (save {human(saved)}, "
+              f"{saved / total * 100 if total else 0:.0f}% of the context):")
+        for rule, size, count, reason in proposals:
+            print(f"    {rule:40s} # {human(size)}, {count} files, {reason}")
+    else:
+        print(f"\n  {Colors.GREEN}✓ No .dockerignore suggestions{Colors.NC}")
+
+    if budget_mb and total > budget_mb * 1e6:
+        print(f"\n  {Colors.RED}✗ Context is {human(total)}, over the {budget_mb:g} MB budget{Colors.NC}")
+        return False
+    if budget_mb:
+        print(f"\n  {Colors.GREEN}✓ Within the {budget_mb:g} MB budget{Colors.NC}")
+    return True
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Analyze Docker build contexts and propose .dockerignore rules')
+    parser.add_argument('--context', default='all', help="'flask', 'dart', 'all' or a directory path")
+    parser.add_argument('--top', type=int, default=15, help='Entries per ranking')
+    parser.add_argument('--since-days', type=int, default=90, help='Git history window for change frequency')
+    parser.add_argument('--budget-mb', type=float, default=float(os.environ.get('CONTEXT_BUDGET_MB', 0) or 0),
+                        help='Fail when a context exceeds this size (default: CONTEXT_BUDGET_MB)')
+    args = parser.parse_args()
+
+    if args.context == 'all':
+        targets = list(CONTEXTS.items())
+    elif args.context in CONTEXTS:
+        targets = [(args.context, CONTEXTS[args.context])]
+    else:
+        path = Path(args.context).resolve()
+        targets = [(path.name, path)]
+
+    within_budget = True
+    for name, context in targets:
+        within_budget = report(name, context, args.top, args.since_days, args.budget_mb) and within_budget
+    if not within_budget:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,295 @@
+#!/usr/bin/env python3
+"""
+Pack comp player avatars into sprite atlases for bulk client loading.
+
+Lobby and leaderboard screens show dozens of comp player avatars; fetched one by
+one that is one request per avatar. This script packs every avatar referenced in
+templates/comp_players.json into square atlases of fixed-size cells (one set of
+atlases per cell size) and writes a JSON index mapping each username to its
+atlas rectangle, so a screen needs one or two requests instead of dozens.
+
+Avatars are assigned to atlases in filename order, so an atlas only changes
+when one of its member images (or the atlas settings) changes. Only those
+atlases are re-rendered, and the upload goes through the same checksum-manifest
+rsync path as 11_add_players.py, so unchanged atlases are never re-sent.
+
+Atlas filenames carry the atlas fingerprint (avatars_64_00.<hash>.webp), like
+the sponsor assets of 12_sync_sponsor_assets.py: a changed atlas gets a new
+name, so an index can never be combined with a cached sheet of other content.
+nginx serves hashed atlases as immutable and the index with a short TTL.
+Atlases are uploaded before the index, and replaced atlases stay on the VPS,
+so an index still cached by a client keeps resolving.
+
+Output on the VPS (sim_players/images/atlases/):
+    avatars_64_00.0123456789ab.webp, ...   atlases
+    avatar_atlases.json                    index
+
+Index format:
+    {
+        "version": 1,
+        "sizes": {
+            "64": {
+                "atlases": {"avatars_64_00.0123456789ab.webp": {"url": "...", "width": 1024, "height": 1024}},
+                "players": {"sam.pickle12": {"atlas": "avatars_64_00.0123456789ab.webp", "x": 0, "y": 64, "w": 64, "h": 64}}
+            }
+        }
+    }
+
+Usage:
+    python3 build_avatar_atlases.py [--cell-sizes 64,128] [--grid 16] [--no-upload]
+
+Requirements:
+    pip install Pillow
+"""
+
+import json
+import os
+import sys
+import time
+import argparse
+import hashlib
+import importlib.util
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+from typing import Dict, Any, List, Tuple
+
+SCRIPT_DIR = Path(__file__).parent.resolve()
+PROJECT_ROOT = SCRIPT_DIR.parent.parent
+DEFAULT_IMAGE_DIR = PROJECT_ROOT / 'assets' / 'players_profile' / 'assigned_images'
+
+ATLAS_SUBDIR = "atlases"
+INDEX_NAME = "avatar_atlases.json"
+DEFAULT_CELL_SIZES = "64,128"
+DEFAULT_GRID = 16  # cells per side: 16x16 = 256 avatars per atlas
+ATLAS_QUALITY = {'webp': 85, 'jpg': 85}
+# Bump when the rendering itself changes so every atlas is rebuilt once
+ATLAS_RENDER_VERSION = 1
+# Fingerprint characters in atlas filenames; must match the hashed-atlas location in templates/nginx-site.conf.j2
+HASH_LENGTH = 12
+
+
+def _load_sibling(filename: str, module_name: str):
+    """Load a sibling playbook script (numbered filenames are not importable by name)."""
+    spec = importlib.util.spec_from_file_location(module_name, SCRIPT_DIR / filename)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def collect_avatars(players_data: List[Dict[str, Any]], image_dir: Path, seeder) -> Tuple[Dict[str, Path], Dict[str, str]]:
+    """Return ({image filename: local path}, {username: image filename}) for players with a local avatar."""
+    image_files = {}
+    player_images = {}
+    for player in players_data:
+        filename = seeder.extract_image_filename(player.get('picture', ''))
+        if not filename:
+            continue
+        path = image_dir / filename
+        if not path.exists():
+            continue
+        image_files[filename] = path
+        player_images[player['username']] = filename
+    return image_files, player_images
+
+
+def plan_atlases(filenames: List[str], cell_size: int, grid: int, fmt: str) -> Dict[str, List[str]]:
+    """Assign filenames (sorted) to atlases of grid x grid cells: {atlas name: [member filenames]}."""
+    per_atlas = grid * grid
+    ordered = sorted(filenames)
+    return {
+        f'avatars_{cell_size}_{start // per_atlas:02d}.{fmt}': ordered[start:start + per_atlas]
+        for start in range(0, len(ordered), per_atlas)
+    }
+
+
+def atlas_fingerprint(members: List[str], hashes: Dict[str, Dict[str, Any]], cell_size: int, grid: int, fmt: str) -> str:
+    """Hash of everything an atlas's pixels depend on: member order and content, and the atlas settings."""
+    digest = hashlib.sha256()
+    digest.update(json.dumps([ATLAS_RENDER_VERSION, cell_size, grid, fmt, ATLAS_QUALITY[fmt]]).encode('utf-8'))
+    for filename in members:
+        digest.update(f'{filename}:{hashes[filename]["sha256"]}\n'.encode('utf-8'))
+    return digest.hexdigest()
+
+
+def atlas_file_name(name: str, fingerprint: str) -> str:
+    """Content-hashed filename of a planned atlas: avatars_64_00.webp -> avatars_64_00.<hash>.webp."""
+    stem, suffix = name.rsplit('.', 1)
+    return f'{stem}.{fingerprint[:HASH_LENGTH]}.{suffix}'
+
+
+def render_atlas(sources: List[str], output_path: str, cell_size: int, grid: int, fmt: str) -> Tuple[int, int]:
+    """Render one atlas (runs in a worker process). Returns its (width, height)."""
+    from PIL import Image, ImageOps
+
+    rows = (len(sources) + grid - 1) // grid
+    width, height = grid * cell_size, rows * cell_size
+    atlas = Image.new('RGB', (width, height), (0, 0, 0))
+    for index, source in enumerate(sources):
+        with Image.open(source) as img:
+            img.draft('RGB', (cell_size, cell_size))
+            cell = ImageOps.fit(img.convert('RGB'), (cell_size, cell_size), Image.LANCZOS)
+        atlas.paste(cell, ((index % grid) * cell_size, (index // grid) * cell_size))
+    tmp_path = output_path + '.tmp'
+    if fmt == 'webp':
+        atlas.save(tmp_path, 'WEBP', quality=ATLAS_QUALITY['webp'], method=6)
+    else:
+        atlas.save(tmp_path, 'JPEG', quality=ATLAS_QUALITY['jpg'], optimize=True, progressive=True)
+    os.replace(tmp_path, output_path)
+    return width, height
+
+
+def build_atlases(image_files: Dict[str, Path], player_images: Dict[str, str], cell_sizes: List[int], grid: int,
+                  fmt: str, output_dir: Path, state_path: Path, seeder, public_url: str) -> Tuple[Dict[str, Any], Dict[str, int]]:
+    """
+    Render changed atlases into output_dir and write the index next to them.
+    If any atlas fails to render the index is not written, so it never points
+    at atlases that do not exist.
+
+    Returns (index, {"rebuilt", "unchanged", "failed"}).
+    """
+    output_dir.mkdir(parents=True, exist_ok=True)
+    hashes = seeder.hash_local_images(image_files)
+    state = seeder.load_json_cache(state_path, {})
+    index = {'version': 1, 'sizes': {}}
+    jobs = {}
+    updates = {}
+    removals = set()
+    stats = {'rebuilt': 0, 'unchanged': 0, 'failed': 0}
+
+    for cell_size in cell_sizes:
+        plan = plan_atlases(list(image_files), cell_size, grid, fmt)
+        atlases = {}
+        positions = {}
+        for planned_name, members in plan.items():
+            fingerprint = atlas_fingerprint(members, hashes, cell_size, grid, fmt)
+            name = atlas_file_name(planned_name, fingerprint)
+            rows = (len(members) + grid - 1) // grid
+            atlases[name] = {'url': f'{public_url}/{name}', 'width': grid * cell_size, 'height': rows * cell_size}
+            for position, filename in enumerate(members):
+                positions[filename] = (name, (position % grid) * cell_size, (position // grid) * cell_size)
+            if state.get(name) == fingerprint and (output_dir / name).exists():
+                stats['unchanged'] += 1
+            else:
+                jobs[name] = ([str(image_files[f]) for f in members], cell_size, fingerprint)
+        players = {}
+        for username, filename in sorted(player_images.items()):
+            name, x, y = positions[filename]
+            players[username] = {'atlas': name, 'x': x, 'y': y, 'w': cell_size, 'h': cell_size}
+        index['sizes'][str(cell_size)] = {'atlases': atlases, 'players': players}
+
+    if jobs:
+        with ProcessPoolExecutor() as pool:
+            futures = {
+                pool.submit(render_atlas, sources, str(output_dir / name), cell_size, grid, fmt): name
+                for name, (sources, cell_size, _) in jobs.items()
+            }
+            for future in as_completed(futures):
+                name = futures[future]
+                try:
+                    future.result()
+                except Exception as e:
+                    print(f"  ❌ Failed to render {name}: {e}", file=sys.stderr)
+                    removals.add(name)
+                    stats['failed'] += 1
+                    continue
+                updates[name] = jobs[name][2]
+                stats['rebuilt'] += 1
+                print(f"  🧩 Rendered {name}")
+
+    # Drop atlases that are no longer part of any plan (fewer avatars, other sizes)
+    current = {name for size in index['sizes'].values() for name in size['atlases']}
+    for stale in set(state) - current:
+        removals.add(stale)
+        (output_dir / stale).unlink(missing_ok=True)
+    seeder.merge_json_cache(state_path, updates, removals)
+
+    if stats['failed']:
+        return index, stats
+    # Sorted and timestamp-free so an unchanged index hashes the same and is not re-uploaded
+    (output_dir / INDEX_NAME).write_text(json.dumps(index, indent=2, sort_keys=True))
+    return index, stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Pack comp player avatars into sprite atlases with a JSON index')
+    parser.add_argument('--json-file', default='templates/comp_players.json', help='Path to players JSON file')
+    parser.add_argument('--image-dir', default=str(DEFAULT_IMAGE_DIR), help='Local directory holding the avatars')
+    parser.add_argument('--cell-sizes', default=DEFAULT_CELL_SIZES, help='Comma-separated cell sizes in px (one atlas set each)')
+    parser.add_argument('--grid', type=int, default=DEFAULT_GRID, help='Cells per atlas side')
+    parser.add_argument('--format', choices=['webp', 'jpg'], default='webp', help='Atlas image format')
+    parser.add_argument('--no-upload', action='store_true', help='Only build the atlases locally')
+    parser.add_argument('--ssh-key', default='~/.ssh/rop01_key', help='SSH key path')
+    parser.add_argument('--ssh-user', default='rop01_user', help='SSH user')
+    parser.add_argument('--ssh-host', default='65.181.125.135', help='SSH host')
+    parser.add_argument('--upload-streams', type=int, default=2, help='Parallel rsync streams for the upload')
+    parser.add_argument('--rebuild-manifest', action='store_true', help='Rebuild the VPS atlas manifest from the files actually on the VPS')
+
+    args = parser.parse_args()
+
+    if importlib.util.find_spec('PIL') is None:
+        print("❌ Error: Pillow is not installed.")
+        print("   Install it with: pip install Pillow")
+        sys.exit(1)
+
+    try:
+        cell_sizes = sorted({int(size) for size in args.cell_sizes.split(',') if size.strip()})
+    except ValueError:
+        print(f"❌ Invalid --cell-sizes: {args.cell_sizes}", file=sys.stderr)
+        sys.exit(1)
+    if not cell_sizes or min(cell_sizes) < 1 or args.grid < 1:
+        print("❌ Cell sizes and --grid must be positive", file=sys.stderr)
+        sys.exit(1)
+
+    seeder = _load_sibling('11_add_players.py', 'add_players')
+    json_path = SCRIPT_DIR / args.json_file
+    with open(json_path, 'r') as f:
+        players_data = json.load(f)
+
+    image_files, player_images = collect_avatars(players_data, Path(args.image_dir), seeder)
+    if not image_files:
+        print(f"❌ No local avatars found in {args.image_dir} for players in {args.json_file}", file=sys.stderr)
+        sys.exit(1)
+    print(f"📋 {len(player_images)} players with {len(image_files)} unique avatars")
+
+    output_dir = seeder.LOCAL_CACHE_DIR / 'sim_players_atlases'
+    state_path = seeder.LOCAL_CACHE_DIR / 'sim_players_atlas_state.json'
+    public_url = f'{seeder.PUBLIC_IMAGE_URL}/{ATLAS_SUBDIR}'
+
+    print(f"\n🧩 Building {args.grid}x{args.grid} atlases for cell sizes {', '.join(map(str, cell_sizes))} px...")
+    start = time.perf_counter()
+    index, stats = build_atlases(image_files, player_images, cell_sizes, args.grid, args.format,
+                                 output_dir, state_path, seeder, public_url)
+    atlas_count = sum(len(size['atlases']) for size in index['sizes'].values())
+    if stats['failed']:
+        print(f"❌ {stats['failed']} of {atlas_count} atlases failed to render; index not written, nothing uploaded",
+              file=sys.stderr)
+        sys.exit(1)
+    print(f"✅ {atlas_count} atlases: {stats['rebuilt']} rebuilt, {stats['unchanged']} unchanged "
+          f"({time.perf_counter() - start:.1f}s)")
+    print(f"   Index: {output_dir / INDEX_NAME}")
+
+    if args.no_upload:
+        return
+
+    atlas_files = {}
+    for size in index['sizes'].values():
+        atlas_files.update({name: output_dir / name for name in size['atlases']})
+
+    print("\n📤 Uploading atlases...")
+    ssh_key = os.path.expanduser(args.ssh_key)
+    ssh_base = f'ssh -i {ssh_key} {args.ssh_user}@{args.ssh_host}'
+    remote_dir = f'{seeder.VPS_IMAGE_DIR}/{ATLAS_SUBDIR}'
+    summary = seeder.sync_files(ssh_base, atlas_files, output_dir, ssh_key, args.ssh_user, args.ssh_host,
+                                remote_dir, args.rebuild_manifest, args.upload_streams, label='avatar atlases')
+    if summary['failed']:
+        sys.exit(1)
+    # The index goes up only once every atlas it points at is in place
+    summary = seeder.sync_files(ssh_base, {INDEX_NAME: output_dir / INDEX_NAME}, output_dir, ssh_key,
+                                args.ssh_user, args.ssh_host, remote_dir, label='avatar atlas index')
+    if summary['failed']:
+        sys.exit(1)
+    print(f"   Index available at: {public_url}/{INDEX_NAME}")
+
+
+if __name__ == '__main__':
+    main()
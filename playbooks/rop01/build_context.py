@@ -0,0 +1,375 @@
+"""
+Build context helpers shared by the Docker build scripts.
+
+- .dockerignore parsing and context file listing (Docker's matching rules).
+- Context hashing: a SHA-256 over the *effective* build context (paths, modes
+  and contents after any build-time transforms, plus the Dockerfile). Images
+  are labelled with it, so a build whose context hash already exists as an
+  image locally or in the registry can be skipped entirely.
+- BuildKit layer cache arguments, so a fresh machine or CI runner reuses the
+  layers of the last pushed build instead of starting from scratch.
+
+Cache modes (BUILD_CACHE environment variable):
+
+    inline    (default) cache metadata is embedded in the pushed image and
+              imported from <repo>:<tag> and <repo>:latest; works with the
+              default docker driver
+    registry  full cache (mode=max, incl. intermediate stages) exported to
+              <repo>:buildcache; needs a docker-container buildx builder
+              (docker buildx create --use)
+    none      plain build, no cache import/export
+
+Set FORCE_BUILD=1 to build even when the context hash matches an existing image.
+Set CONTEXT_BUDGET_MB to refuse builds whose context exceeds that size (see
+analyze_build_context.py for where the bytes come from).
+When BUILDX_BUILDER names a buildx builder (e.g. a CPU-limited docker-container
+builder created by release_images.py), builds run on it and are loaded into
+the local image store.
+"""
+
+import hashlib
+import io
+import json
+import os
+import re
+import subprocess
+import sys
+import tarfile
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+CONTEXT_HASH_LABEL = 'com.reignofplay.context-hash'
+STAT_CACHE_ROOT = Path.home() / '.cache' / 'dutch_playbooks' / 'context_hash'
+BUILD_CACHE_MODES = ('inline', 'registry', 'none')
+REGISTRY_CACHE_TAG = 'buildcache'
+# Registry lookups must not hang a build when Docker Hub is slow
+REGISTRY_TIMEOUT_SECONDS = 30
+# Dockerfile steps in BuildKit's plain progress output ("#7 [build 3/6] RUN ...", "#7 CACHED")
+PROGRESS_STEP_RE = re.compile(r'^#(\d+) \[(?:[\w.-]+ )?\d+/\d+\]')
+PROGRESS_CACHED_RE = re.compile(r'^#(\d+) CACHED')
+
+
+def load_dockerignore(context: Path) -> List[Tuple[re.Pattern, bool]]:
+    """Parse <context>/.dockerignore into (regex, is_exception) rules, in file order.
+
+    Follows Docker's matching: `*` and `?` do not cross `/`, `**` matches any
+    number of directories, `!` re-includes, the last matching rule wins, and a
+    rule matching a directory also matches everything below it.
+    """
+    ignore_file = context / '.dockerignore'
+    if not ignore_file.exists():
+        return []
+    return parse_dockerignore(ignore_file.read_text(encoding='utf-8').splitlines())
+
+
+def parse_dockerignore(lines: Iterable[str]) -> List[Tuple[re.Pattern, bool]]:
+    """Compile .dockerignore lines into rules (see load_dockerignore)."""
+    rules = []
+    for line in lines:
+        pattern = line.strip()
+        if not pattern or pattern.startswith('#'):
+            continue
+        exception = pattern.startswith('!')
+        pattern = os.path.normpath(pattern.lstrip('!').strip()).lstrip('/')
+        regex = ''
+        i = 0
+        while i < len(pattern):
+            if pattern.startswith('**/', i):
+                regex += '(?:.*/)?'
+                i += 3
+            elif pattern.startswith('**', i):
+                regex += '.*'
+                i += 2
+            elif pattern[i] == '*':
+                regex += '[^/]*'
+                i += 1
+            elif pattern[i] == '?':
+                regex += '[^/]'
+                i += 1
+            else:
+                regex += re.escape(pattern[i])
+                i += 1
+        rules.append((re.compile(regex + '(?:/.*)?'), exception))
+    return rules
+
+
+def is_ignored(rel_path: str, rules: List[Tuple[re.Pattern, bool]]) -> bool:
+    """Check a context-relative path (with / separators) against .dockerignore rules."""
+    ignored = False
+    for regex, exception in rules:
+        if regex.fullmatch(rel_path):
+            ignored = not exception
+    return ignored
+
+
+def iter_context_files(context: Path, rules: List[Tuple[re.Pattern, bool]]):
+    """
+    Yield (path, relative path) for every entry of the build context not
+    excluded by .dockerignore, as the daemon receives it: files, directories
+    (empty ones too, they can be COPY sources) and symlinks, which are sent
+    as links and not followed. A directory comes before its contents.
+    """
+    has_exceptions = any(exception for _, exception in rules)
+    for root, dirs, files in os.walk(context):
+        root_path = Path(root)
+        rel_root = root_path.relative_to(context).as_posix()
+        rel_root = '' if rel_root == '.' else rel_root + '/'
+        for name in sorted(dirs + files):
+            rel_path = rel_root + name
+            if not is_ignored(rel_path, rules):
+                yield root_path / name, rel_path
+        # Descend into real directories only; prune ignored ones unless a `!` rule could re-include something below them
+        dirs[:] = sorted(d for d in dirs if not (root_path / d).is_symlink()
+                         and (has_exceptions or not is_ignored(rel_root + d, rules)))
+
+
+class FileDigests:
+    """SHA-256 of files on disk, remembered by (size, mtime) so unchanged files are not re-read."""
+
+    def __init__(self, name: str, root: Path = None):
+        self.path = (root or STAT_CACHE_ROOT) / f'{name}.json'
+        try:
+            self.index = json.loads(self.path.read_text())
+        except (OSError, ValueError):
+            self.index = {}
+        self.seen = set()
+
+    def digest(self, path: Path) -> str:
+        st = path.stat()
+        key = str(path.resolve())
+        self.seen.add(key)
+        known = self.index.get(key)
+        if known and known[0] == st.st_size and known[1] == st.st_mtime_ns:
+            return known[2]
+        h = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1 << 20), b''):
+                h.update(chunk)
+        self.index[key] = [st.st_size, st.st_mtime_ns, h.hexdigest()]
+        return self.index[key][2]
+
+    def save(self):
+        """Write the index atomically, keeping only files seen in this run."""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_suffix('.tmp')
+        tmp_path.write_text(json.dumps({key: self.index[key] for key in self.seen}, separators=(',', ':')))
+        os.replace(tmp_path, self.path)
+
+
+def hash_context(entries: Iterable[Tuple[str, Path, Optional[bytes]]], dockerfile: bytes, name: str) -> str:
+    """
+    Hash the effective build context.
+
+    entries are (relative path, path on disk, content) where content is the
+    bytes that go into the context in place of the file on disk (None: the
+    file is used as is; path None: a generated file). Directories, modes and
+    symlink targets are included, mtimes are not. The result is stable across
+    machines for the same effective context.
+    """
+    digests = FileDigests(name)
+    h = hashlib.sha256()
+    h.update(b'dockerfile\0' + hashlib.sha256(dockerfile).hexdigest().encode() + b'\n')
+    for rel_path, path, content in sorted(entries, key=lambda entry: entry[0]):
+        if path is None:
+            h.update(f'{rel_path}\0644\0{hashlib.sha256(content).hexdigest()}\n'.encode('utf-8'))
+            continue
+        st = path.lstat()
+        if content is not None:
+            digest = hashlib.sha256(content).hexdigest()
+        elif path.is_symlink():
+            digest = 'link:' + os.readlink(path)
+        elif path.is_dir():
+            digest = 'dir'
+        else:
+            digest = digests.digest(path)
+        h.update(f'{rel_path}\0{st.st_mode & 0o7777:o}\0{digest}\n'.encode('utf-8'))
+    digests.save()
+    return h.hexdigest()
+
+
+def context_size(context: Sequence[Tuple[Optional[Path], str, Optional[bytes]]]) -> int:
+    """Bytes of file content in a context as passed to write_context_tar."""
+    total = 0
+    for path, _, data in context:
+        if data is not None:
+            total += len(data)
+        elif not path.is_symlink() and path.is_file():
+            total += path.stat().st_size
+    return total
+
+
+def context_budget_error(size: int) -> Optional[str]:
+    """Return an error message if size exceeds CONTEXT_BUDGET_MB (if set), else None."""
+    budget = os.environ.get('CONTEXT_BUDGET_MB')
+    if not budget or size <= float(budget) * 1e6:
+        return None
+    return (f"build context is {size / 1e6:.1f} MB, over the {float(budget):g} MB budget "
+            f"(run analyze_build_context.py for .dockerignore suggestions)")
+
+
+def write_context_tar(out, context: Sequence[Tuple[Optional[Path], str, Optional[bytes]]]) -> Dict[str, int]:
+    """
+    Stream a build context as a tar archive to out. context holds
+    (path on disk, relative path, content) as for hash_context: content
+    replaces the file's bytes, and entries without a path are generated files.
+    """
+    stats = {'bytes': 0, 'context_files': 0}
+    with tarfile.open(fileobj=out, mode='w|') as tar:
+        for path, rel_path, data in context:
+            if path is None:
+                info = tarfile.TarInfo(rel_path)
+                info.mode = 0o644
+            else:
+                info = tar.gettarinfo(str(path), arcname=rel_path)
+            info.uid = info.gid = 0
+            info.uname = info.gname = ''
+            if not info.isfile():
+                tar.addfile(info)
+                continue
+            if data is None:
+                with open(path, 'rb') as f:
+                    tar.addfile(info, f)
+            else:
+                info.size = len(data)
+                tar.addfile(info, io.BytesIO(data))
+            stats['context_files'] += 1
+            stats['bytes'] += info.size
+    return stats
+
+
+def run_build(cmd: List[str], env: dict,
+              context: Sequence[Tuple[Optional[Path], str, Optional[bytes]]] = None) -> Optional[Dict[str, float]]:
+    """
+    Run a build command from build_command(), streaming context (see
+    write_context_tar) on stdin when given. BuildKit's progress is echoed and
+    parsed to count the Dockerfile steps served from the layer cache.
+
+    Returns {'seconds', 'steps', 'cached', 'bytes', 'context_files'}, or None if the build failed.
+    """
+    start = time.perf_counter()
+    stats = {'bytes': 0, 'context_files': 0}
+    steps, cached = set(), set()
+    process = subprocess.Popen(cmd, env=env, stdin=subprocess.PIPE if context is not None else subprocess.DEVNULL,
+                               stderr=subprocess.PIPE)
+
+    def pump():
+        for raw in iter(process.stderr.readline, b''):
+            line = raw.decode('utf-8', errors='replace')
+            sys.stdout.write(line)
+            match = PROGRESS_STEP_RE.match(line)
+            if match:
+                steps.add(match.group(1))
+            match = PROGRESS_CACHED_RE.match(line)
+            if match:
+                cached.add(match.group(1))
+        sys.stdout.flush()
+
+    reader = threading.Thread(target=pump, daemon=True)
+    reader.start()
+    written = True
+    if context is not None:
+        try:
+            stats.update(write_context_tar(process.stdin, context))
+            process.stdin.close()
+        except BrokenPipeError:
+            # docker exited before reading the whole context; its own error is already shown
+            written = False
+    returncode = process.wait()
+    reader.join()
+    if returncode != 0 or not written:
+        return None
+    stats['seconds'] = time.perf_counter() - start
+    stats['steps'] = len(steps)
+    stats['cached'] = len(cached & steps)
+    return stats
+
+
+def _labels_from_config(config) -> dict:
+    if not isinstance(config, dict):
+        return {}
+    if 'config' in config:
+        return (config.get('config') or {}).get('Labels') or {}
+    # Multi-platform index: {platform: image config}; labels are the same for all platforms we build
+    for value in config.values():
+        labels = _labels_from_config(value)
+        if labels:
+            return labels
+    return {}
+
+
+def local_image_hash(image: str) -> Optional[str]:
+    """Context hash label of a local image, or None if the image (or label) does not exist."""
+    result = subprocess.run(
+        ['docker', 'image', 'inspect', '--format', '{{json .Config.Labels}}', image],
+        capture_output=True, text=True,
+    )
+    if result.returncode != 0:
+        return None
+    try:
+        return (json.loads(result.stdout) or {}).get(CONTEXT_HASH_LABEL)
+    except ValueError:
+        return None
+
+
+def registry_image_hash(image: str) -> Optional[str]:
+    """Context hash label of an image in the registry (config blob only, nothing is pulled)."""
+    try:
+        result = subprocess.run(
+            ['docker', 'buildx', 'imagetools', 'inspect', '--format', '{{json .Image}}', image],
+            capture_output=True, text=True, timeout=REGISTRY_TIMEOUT_SECONDS,
+        )
+    except subprocess.TimeoutExpired:
+        return None
+    if result.returncode != 0:
+        return None
+    try:
+        return _labels_from_config(json.loads(result.stdout)).get(CONTEXT_HASH_LABEL)
+    except ValueError:
+        return None
+
+
+def find_image_with_hash(image: str, context_hash: str) -> Optional[str]:
+    """Return 'registry' or 'local' if image already carries context_hash, else None."""
+    if os.environ.get('FORCE_BUILD') == '1':
+        return None
+    if registry_image_hash(image) == context_hash:
+        return 'registry'
+    if local_image_hash(image) == context_hash:
+        return 'local'
+    return None
+
+
+def build_cache_mode() -> str:
+    mode = os.environ.get('BUILD_CACHE', 'inline')
+    if mode not in BUILD_CACHE_MODES:
+        raise ValueError(f"BUILD_CACHE must be one of {', '.join(BUILD_CACHE_MODES)}, got {mode!r}")
+    return mode
+
+
+def build_command(image: str, latest_image: str, dockerfile: str, context: str,
+                  context_hash: str, extra_args: Sequence[str] = ()) -> Tuple[List[str], dict]:
+    """
+    Return (command, environment) for a BuildKit build of image, labelled with
+    context_hash and importing/exporting layer cache according to BUILD_CACHE.
+    Progress is plain text so run_build() can count cached steps.
+    """
+    mode = build_cache_mode()
+    env = dict(os.environ, DOCKER_BUILDKIT='1')
+    repo = image.rsplit(':', 1)[0]
+    if mode == 'registry':
+        cache_ref = f'{repo}:{REGISTRY_CACHE_TAG}'
+        cmd = ['docker', 'buildx', 'build', '--load',
+               '--cache-from', f'type=registry,ref={cache_ref}',
+               '--cache-to', f'type=registry,ref={cache_ref},mode=max']
+    else:
+        # A non-default builder keeps its result in its own cache unless told to --load it
+        cmd = ['docker', 'buildx', 'build', '--load'] if os.environ.get('BUILDX_BUILDER') else ['docker', 'build']
+        if mode == 'inline':
+            cmd += ['--build-arg', 'BUILDKIT_INLINE_CACHE=1']
+            for ref in dict.fromkeys([image, latest_image]):
+                cmd += ['--cache-from', ref]
+    cmd += ['--progress', 'plain', *extra_args, '--label', f'{CONTEXT_HASH_LABEL}={context_hash}',
+            '-f', dockerfile, '-t', image, context]
+    return cmd, env
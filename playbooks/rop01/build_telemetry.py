@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+"""
+Per-phase build telemetry for the Docker build scripts, with a trend report.
+
+06_build_and_push_docker.py and 07_build_and_push_dart_docker.py time each
+phase of a run (secrets swap / config override, log stripping, context hash,
+cache lookup, docker build, size check, push, tag) and append one JSON record
+per run to ~/.cache/dutch_playbooks/build_history.jsonl, with the image digest
+and size.
+
+Report (run this file directly):
+
+    python3 build_telemetry.py [--name flask|dart] [--runs 10] [--window 10]
+                               [--threshold-pct 25] [--min-seconds 2] [--fail-on-regression]
+
+shows the last runs per image and flags phases of the latest run that took
+more than threshold-pct longer than the median of the previous `window`
+successful runs (ignoring differences under min-seconds, which are noise).
+"""
+
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, List, Optional
+
+HISTORY_PATH = Path.home() / '.cache' / 'dutch_playbooks' / 'build_history.jsonl'
+
+# Report column order; phases not listed here are appended in order of appearance
+PHASE_ORDER = ['secrets_swap', 'config_override', 'log_stripping', 'context_hash', 'cache_lookup',
+               'docker_build', 'size_check', 'startup_gate', 'push', 'tag']
+
+
+class Colors:
+    RED = '\033[0;31m'
+    GREEN = '\033[0;32m'
+    YELLOW = '\033[1;33m'
+    BLUE = '\033[0;34m'
+    NC = '\033[0m'  # No Color
+
+
+def _git_commit(cwd: Path) -> Optional[str]:
+    result = subprocess.run(['git', '-C', str(cwd), 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True)
+    if result.returncode != 0:
+        return None
+    return result.stdout.strip() or None
+
+
+class BuildTelemetry:
+    """Phase timings and facts about one build run, appended to the history by finish()."""
+
+    def __init__(self, name: str, image: str, source_dir: Path = None):
+        self.image = image
+        self.record = {
+            'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'name': name,
+            'image': image,
+            'commit': _git_commit(source_dir) if source_dir and source_dir.exists() else None,
+            'phases': {},
+        }
+
+    @contextmanager
+    def phase(self, name: str):
+        """Time a block as phase name (time accumulates if the phase runs more than once)."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_phase(name, time.perf_counter() - start)
+
+    def add_phase(self, name: str, seconds: float):
+        phases = self.record['phases']
+        phases[name] = round(phases.get(name, 0.0) + seconds, 3)
+
+    def note(self, **fields):
+        self.record.update(fields)
+
+    def finish(self, status: str) -> Dict:
+        """
+        Complete the record with the image digest and size (successful runs,
+        image local) and append it. A digest already noted (the pushed image)
+        is kept: the local tag may hold a different image, whose size is then
+        not recorded either.
+        """
+        self.record['status'] = status
+        self.record['seconds'] = round(sum(self.record['phases'].values()), 3)
+        fields = []
+        if status == 'ok':
+            result = subprocess.run(['docker', 'image', 'inspect', '--format', '{{.Id}} {{.Size}}', self.image],
+                                    capture_output=True, text=True)
+            fields = result.stdout.split() if result.returncode == 0 else []
+        noted = self.record.get('digest')
+        if len(fields) == 2 and fields[1].isdigit() and noted in (None, fields[0]):
+            self.record['digest'] = fields[0]
+            self.record['size_bytes'] = int(fields[1])
+        HISTORY_PATH.parent.mkdir(parents=True, exist_ok=True)
+        with open(HISTORY_PATH, 'a') as f:
+            f.write(json.dumps(self.record) + '\n')
+        return self.record
+
+
+def load_history(name: str = None) -> List[Dict]:
+    if not HISTORY_PATH.exists():
+        return []
+    records = []
+    for line in HISTORY_PATH.read_text().splitlines():
+        try:
+            record = json.loads(line)
+        except ValueError:
+            continue
+        if name is None or record.get('name') == name:
+            records.append(record)
+    return records
+
+
+def find_regressions(records: List[Dict], window: int, threshold_pct: float, min_seconds: float) -> List[Dict]:
+    """Compare the latest successful run's phases with the median of the previous `window` successful runs."""
+    ok = [record for record in records if record.get('status') == 'ok']
+    if len(ok) < 2:
+        return []
+    latest, previous = ok[-1], ok[-1 - window:-1]
+    regressions = []
+    for phase, seconds in latest['phases'].items():
+        samples = [record['phases'][phase] for record in previous if phase in record['phases']]
+        if not samples:
+            continue
+        median = statistics.median(samples)
+        if seconds - median >= min_seconds and seconds > median * (1 + threshold_pct / 100):
+            regressions.append({'phase': phase, 'seconds': seconds, 'median': median, 'samples': len(samples)})
+    return regressions
+
+
+def print_report(name: str, records: List[Dict], runs: int, window: int, threshold_pct: float,
+                 min_seconds: float) -> bool:
+    """Print recent runs and regressions for one image; returns True if the latest run regressed."""
+    print(f"\n{Colors.BLUE}=== {name} ({len(records)} runs recorded) ==={Colors.NC}")
+    phases = [phase for phase in PHASE_ORDER if any(phase in record['phases'] for record in records)]
+    for record in records:
+        phases += [phase for phase in record['phases'] if phase not in phases]
+
+    header = f"  {'time':19s}  {'status':8s}  {'total':>7s}  " + '  '.join(f"{phase[:12]:>12s}" for phase in phases)
+    print(header + f"  {'size':>9s}  digest")
+    for record in records[-runs:]:
+        cells = '  '.join(f"{record['phases'].get(phase, 0.0):>11.1f}s" if phase in record['phases'] else f"{'-':>12s}"
+                          for phase in phases)
+        size = f"{record['size_bytes'] / 1e6:.1f} MB" if record.get('size_bytes') else '-'
+        digest = (record.get('digest') or '-').replace('sha256:', '')[:12]
+        print(f"  {record['time']:19s}  {record.get('status', '?'):8s}  {record.get('seconds', 0):>6.1f}s  "
+              f"{cells}  {size:>9s}  {digest}")
+
+    regressions = find_regressions(records, window, threshold_pct, min_seconds)
+    for regression in regressions:
+        print(f"  {Colors.RED}✗ {regression['phase']}: {regression['seconds']:.1f}s vs median "
+              f"{regression['median']:.1f}s of {regression['samples']} previous runs "
+              f"(+{(regression['seconds'] / regression['median'] - 1) * 100 if regression['median'] else 0:.0f}%){Colors.NC}")
+    if not regressions:
+        print(f"  {Colors.GREEN}✓ No phase regressed beyond {threshold_pct:g}% of the rolling median{Colors.NC}")
+    return bool(regressions)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Show build phase trends and regressions from the build history')
+    parser.add_argument('--name', choices=['flask', 'dart'], help='Only this image (default: all)')
+    parser.add_argument('--runs', type=int, default=10, help='Recent runs to list')
+    parser.add_argument('--window', type=int, default=10, help='Previous successful runs in the rolling median')
+    parser.add_argument('--threshold-pct', type=float, default=25.0, help='Flag phases slower than the median by this much')
+    parser.add_argument('--min-seconds', type=float, default=2.0, help='Ignore slowdowns smaller than this')
+    parser.add_argument('--fail-on-regression', action='store_true', help='Exit 1 if the latest run regressed')
+    args = parser.parse_args()
+
+    by_name = defaultdict(list)
+    for record in load_history(args.name):
+        by_name[record.get('name', '?')].append(record)
+    if not by_name:
+        print(f"{Colors.YELLOW}No build history in {HISTORY_PATH} yet.{Colors.NC}")
+        return
+
+    regressed = False
+    for name, records in sorted(by_name.items()):
+        regressed = print_report(name, records, args.runs, args.window, args.threshold_pct, args.min_seconds) or regressed
+    if regressed and args.fail_on_regression:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,156 @@
+"""
+Parallel, hash-cached source transformation for the Docker build scripts.
+
+Used by 06_build_and_push_docker.py (stripping custom_log() calls from Python
+sources) and 07_build_and_push_dart_docker.py (forcing LOGGING_SWITCH off in
+Dart sources). A transform is a picklable module-level function
+
+    transform(source: str, filename: str) -> (new_source: str, changes: int)
+
+Results are cached under ~/.cache/dutch_playbooks/build_transforms/<name>-v<version>/,
+keyed by the SHA-256 of the file content, so an unchanged file is never
+transformed twice. File stats (size, mtime) are remembered as well, so a file
+that has not been touched since the last build is not even re-read when its
+cached result is "no change". Bump the version whenever a transform's output
+changes; old cache directories are then simply ignored.
+
+Cache misses are fanned out across a process pool (BUILD_WORKERS caps its
+size, e.g. when release_images.py runs two builds side by side).
+"""
+
+import hashlib
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+CACHE_ROOT = Path.home() / '.cache' / 'dutch_playbooks' / 'build_transforms'
+
+# Below this many cache misses the pool start-up costs more than it saves
+MIN_PARALLEL_FILES = 16
+
+
+def _apply(job):
+    """Run a transform on one file's bytes (in a worker process)."""
+    transform, data, filename = job
+    try:
+        new_source, changes = transform(data.decode('utf-8'), filename)
+    except (SyntaxError, UnicodeDecodeError, ValueError) as e:
+        return None, 0, f'{type(e).__name__}: {e}'
+    if not changes:
+        return None, 0, None
+    return new_source.encode('utf-8'), changes, None
+
+
+class TransformCache:
+    """On-disk cache of transform results for one transform name and version."""
+
+    def __init__(self, name: str, version: int, root: Path = None):
+        self.dir = (root or CACHE_ROOT) / f'{name}-v{version}'
+        self.objects_dir = self.dir / 'objects'
+        self.index_path = self.dir / 'index.json'
+        try:
+            index = json.loads(self.index_path.read_text())
+        except (OSError, ValueError):
+            index = {}
+        # results: content sha256 -> changes (0 = transform leaves the file as is)
+        self.results: Dict[str, int] = index.get('results', {})
+        # stats: absolute path -> [size, mtime_ns, sha256]
+        self.stats: Dict[str, list] = index.get('stats', {})
+
+    def output(self, sha256: str) -> bytes:
+        return (self.objects_dir / sha256).read_bytes()
+
+    def store(self, sha256: str, output: Optional[bytes], changes: int):
+        if output is not None:
+            self.objects_dir.mkdir(parents=True, exist_ok=True)
+            tmp_path = self.objects_dir / f'{sha256}.tmp'
+            tmp_path.write_bytes(output)
+            os.replace(tmp_path, self.objects_dir / sha256)
+        self.results[sha256] = changes
+
+    def save(self):
+        """Write the index atomically (tmp file + rename)."""
+        self.dir.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.index_path.with_suffix('.tmp')
+        tmp_path.write_text(json.dumps({'results': self.results, 'stats': self.stats}, separators=(',', ':')))
+        os.replace(tmp_path, self.index_path)
+
+
+def transform_files(paths: List[Path], transform: Callable[[str, str], Tuple[str, int]], name: str, version: int,
+                    workers: int = None, base: Path = None) -> Tuple[Dict[Path, Tuple[bytes, int]], Dict[str, float]]:
+    """
+    Apply transform to every path, reusing cached results.
+
+    Returns ({path: (new content, changes)} for the files the transform
+    changes, stats) where stats holds "files", "transformed" (computed this
+    run), "cached" (served from cache), "changed" (files with changes),
+    "errors" and "seconds". Files that fail to transform are left out of the
+    result, i.e. used unchanged, and reported on stdout.
+    """
+    start = time.perf_counter()
+    workers = workers or int(os.environ.get('BUILD_WORKERS', 0)) or None
+    cache = TransformCache(name, version)
+    changed: Dict[Path, Tuple[bytes, int]] = {}
+    misses = []  # (path, sha256, data)
+    stats = {'files': len(paths), 'transformed': 0, 'cached': 0, 'changed': 0, 'errors': 0}
+
+    for path in paths:
+        st = path.stat()
+        key = str(path.resolve())
+        known = cache.stats.get(key)
+        if known and known[0] == st.st_size and known[1] == st.st_mtime_ns and known[2] in cache.results:
+            sha256 = known[2]
+            if cache.results[sha256] == 0:
+                # Untouched since last time and the transform leaves it alone: don't even read it
+                stats['cached'] += 1
+                continue
+            data = None
+        else:
+            data = path.read_bytes()
+            sha256 = hashlib.sha256(data).hexdigest()
+            cache.stats[key] = [st.st_size, st.st_mtime_ns, sha256]
+        if sha256 in cache.results:
+            stats['cached'] += 1
+            if cache.results[sha256]:
+                changed[path] = (cache.output(sha256), cache.results[sha256])
+            continue
+        misses.append((path, sha256, data if data is not None else path.read_bytes()))
+
+    def label(path: Path) -> str:
+        return str(path.relative_to(base)) if base else str(path)
+
+    if misses:
+        jobs = [(transform, data, label(path)) for path, _, data in misses]
+        parallel = len(misses) >= MIN_PARALLEL_FILES and workers != 1
+        pool = ProcessPoolExecutor(max_workers=workers) if parallel else None
+        if pool:
+            chunksize = max(1, len(jobs) // ((workers or os.cpu_count() or 1) * 4))
+            outcomes = pool.map(_apply, jobs, chunksize=chunksize)
+        else:
+            outcomes = map(_apply, jobs)
+        try:
+            for (path, sha256, _), (output, changes, error) in zip(misses, outcomes):
+                if error:
+                    print(f"  ✗ Error processing {label(path)}: {error}")
+                    stats['errors'] += 1
+                    continue
+                cache.store(sha256, output, changes)
+                stats['transformed'] += 1
+                if output is not None:
+                    changed[path] = (output, changes)
+        finally:
+            if pool:
+                pool.shutdown()
+
+    # Forget files that no longer exist, so the index does not grow forever
+    if len(cache.stats) > 2 * max(len(paths), 1):
+        live = {str(path.resolve()) for path in paths}
+        cache.stats = {key: value for key, value in cache.stats.items() if key in live}
+    cache.save()
+
+    stats['changed'] = len(changed)
+    stats['seconds'] = time.perf_counter() - start
+    return changed, stats
@@ -0,0 +1,184 @@
+"""
+Layer size report and image size budget shared by the Docker build scripts.
+
+After a build, the local image's layers are read with `docker history` and
+each layer's size is attributed to the Dockerfile instruction that created it
+(base image layers are grouped into one FROM line). The report is compared
+with the previous record for the same repository, kept in
+~/.cache/dutch_playbooks/image_layers.jsonl, so a dependency or COPY that
+suddenly adds tens of MB shows up by name.
+
+Budgets (unset = no limit), checked before pushing:
+
+    IMAGE_BUDGET_MB=600          total image size
+    IMAGE_GROWTH_BUDGET_MB=50    growth since the previous unblocked build
+
+Sizes are uncompressed, as stored on the VPS after `docker compose pull`.
+"""
+
+import json
+import os
+import re
+import subprocess
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+from build_context import local_image_hash
+
+LAYER_HISTORY_PATH = Path.home() / '.cache' / 'dutch_playbooks' / 'image_layers.jsonl'
+# Layer changes smaller than this are not listed in the diff
+DIFF_MIN_BYTES = 1_000_000
+BASE_IMAGE = 'FROM (base image)'
+
+
+def _budget_bytes(variable: str) -> Optional[float]:
+    value = float(os.environ.get(variable, 0) or 0)
+    return value * 1e6 if value else None
+
+
+def instruction(created_by: str) -> str:
+    """Turn a history CreatedBy into the Dockerfile instruction it came from."""
+    text = created_by.strip()
+    # Classic builder: "/bin/sh -c #(nop)  COPY dir:... in /app" or "/bin/sh -c pip install ..."
+    text = re.sub(r'^/bin/sh -c #\(nop\)\s+', '', text)
+    text = re.sub(r'^/bin/sh -c ', 'RUN ', text)
+    # BuildKit: "RUN |2 ARG=a ARG=b /bin/sh -c ..." and a trailing "# buildkit"
+    text = re.sub(r'^RUN \|\d+ (?:\S+=\S* )*', 'RUN ', text)
+    text = text.replace('RUN /bin/sh -c ', 'RUN ')
+    text = re.sub(r'\s*# buildkit$', '', text)
+    return ' '.join(text.split())
+
+
+def image_layers(image: str) -> Optional[List[Dict]]:
+    """[{'instruction', 'size'}] of a local image, oldest layer first, or None if it is not local."""
+    result = subprocess.run(['docker', 'history', '--no-trunc', '--human=false', '--format', '{{json .}}', image],
+                            capture_output=True, text=True)
+    if result.returncode != 0:
+        return None
+    entries = []
+    for line in result.stdout.splitlines():
+        try:
+            entries.append(json.loads(line))
+        except ValueError:
+            continue
+    entries.reverse()
+    # BuildKit marks the layers it created from our Dockerfile; the rest come from the base image
+    buildkit = any('buildkit' in entry.get('Comment', '') for entry in entries)
+    layers = []
+    for entry in entries:
+        size = int(entry.get('Size') or 0)
+        if buildkit and 'buildkit' not in entry.get('Comment', ''):
+            if layers and layers[-1]['instruction'] == BASE_IMAGE:
+                layers[-1]['size'] += size
+            else:
+                layers.append({'instruction': BASE_IMAGE, 'size': size})
+            continue
+        layers.append({'instruction': instruction(entry.get('CreatedBy', '')), 'size': size})
+    return layers
+
+
+def _previous(repo: str) -> Optional[Dict]:
+    """Last record for repo whose push was not blocked."""
+    if not LAYER_HISTORY_PATH.exists():
+        return None
+    previous = None
+    for line in LAYER_HISTORY_PATH.read_text().splitlines():
+        try:
+            record = json.loads(line)
+        except ValueError:
+            continue
+        if record.get('repo') == repo and not record.get('blocked'):
+            previous = record
+    return previous
+
+
+def _record(record: Dict):
+    LAYER_HISTORY_PATH.parent.mkdir(parents=True, exist_ok=True)
+    with open(LAYER_HISTORY_PATH, 'a') as f:
+        f.write(json.dumps(record) + '\n')
+
+
+def diff_layers(previous: List[Dict], current: List[Dict]) -> List[Dict]:
+    """
+    Size change per instruction: [{'instruction', 'before', 'after'}], matching
+    repeated instructions by occurrence. Missing sides are None.
+    """
+    def keyed(layers):
+        seen = {}
+        result = {}
+        for layer in layers:
+            n = seen[layer['instruction']] = seen.get(layer['instruction'], 0) + 1
+            result[(layer['instruction'], n)] = layer['size']
+        return result
+
+    before, after = keyed(previous), keyed(current)
+    changes = []
+    for key in list(after) + [key for key in before if key not in after]:
+        changes.append({'instruction': key[0], 'before': before.get(key), 'after': after.get(key)})
+    return changes
+
+
+def _mb(size: float) -> str:
+    return f"{size / 1e6:.1f} MB"
+
+
+def check_image_size(image: str, log: Callable[[str], None] = print, top: int = 8,
+                     context_hash: str = None) -> Optional[Dict]:
+    """
+    Report the layer sizes of a local image, diff them against the previous
+    build of the same repository and check the budgets. Returns the record
+    (also appended to the layer history), or None if the image is over budget
+    and must not be pushed. Images that are not local, or (with context_hash)
+    not built from that context, are neither inspected nor recorded.
+    """
+    if context_hash and local_image_hash(image) != context_hash:
+        log(f"Local {image} was not built from this context, skipping the layer size report")
+        return {'image': image, 'size_bytes': None}
+    layers = image_layers(image)
+    if layers is None:
+        log(f"{image} is not local, skipping the layer size report")
+        return {'image': image, 'size_bytes': None}
+
+    repo = image.rsplit(':', 1)[0]
+    total = sum(layer['size'] for layer in layers)
+    record = {
+        'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'repo': repo,
+        'image': image,
+        'size_bytes': total,
+        'layers': layers,
+        'blocked': False,
+    }
+
+    log(f"Image size: {_mb(total)} in {len(layers)} layers; largest:")
+    for layer in sorted(layers, key=lambda layer: -layer['size'])[:top]:
+        if layer['size']:
+            log(f"  {_mb(layer['size']):>10}  {layer['instruction'][:100]}")
+
+    previous = _previous(repo)
+    growth = None
+    if previous:
+        growth = total - previous['size_bytes']
+        record['previous_size_bytes'] = previous['size_bytes']
+        log(f"Since the previous build ({previous['time']}): {'+' if growth >= 0 else '-'}{_mb(abs(growth))}")
+        for change in diff_layers(previous['layers'], layers):
+            delta = (change['after'] or 0) - (change['before'] or 0)
+            if abs(delta) < DIFF_MIN_BYTES:
+                continue
+            state = 'new' if change['before'] is None else 'removed' if change['after'] is None else 'changed'
+            log(f"  {'+' if delta >= 0 else '-'}{_mb(abs(delta)):>10}  {state:7s}  {change['instruction'][:100]}")
+
+    problems = []
+    budget = _budget_bytes('IMAGE_BUDGET_MB')
+    if budget and total > budget:
+        problems.append(f"image is {_mb(total)}, over the IMAGE_BUDGET_MB budget of {_mb(budget)}")
+    growth_budget = _budget_bytes('IMAGE_GROWTH_BUDGET_MB')
+    if growth_budget and growth is not None and growth > growth_budget:
+        problems.append(f"image grew by {_mb(growth)}, over the IMAGE_GROWTH_BUDGET_MB budget of {_mb(growth_budget)}")
+
+    record['blocked'] = bool(problems)
+    _record(record)
+    for problem in problems:
+        log(f"✗ {problem}")
+    return None if problems else record
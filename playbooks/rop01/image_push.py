@@ -0,0 +1,204 @@
+"""
+Digest-aware image push shared by the Docker build scripts.
+
+Before pushing, the local image's config digest (its image ID) is compared
+with the config digest of the manifest the registry holds for the tag:
+
+- same digest: nothing is pushed;
+- different or missing: `docker push`, only if the local image carries the
+  context hash label of this build (a stale local image with the same tag
+  must not overwrite the registry);
+- registry context-hash hit (the build was skipped because the registry image
+  was built from this context): nothing is pushed, whatever the local tag holds;
+- alias tags (e.g. latest) are re-pointed in the registry with
+  `docker buildx imagetools create`, which only writes a manifest and uploads
+  no layers (falls back to docker tag + push when buildx is unavailable).
+
+Every run is appended to ~/.cache/dutch_playbooks/push_history.jsonl with the
+bytes skipped and the seconds saved, estimated from the throughput of earlier
+real pushes of the same repository.
+
+To try it against a local registry stand-in instead of Docker Hub:
+
+    docker run -d -p 5000:5000 --name registry registry:2
+    DOCKER_REGISTRY=localhost:5000 python3 06_build_and_push_docker.py
+"""
+
+import json
+import subprocess
+import time
+from pathlib import Path
+from typing import Callable, Dict, Iterable, Optional
+
+from build_context import local_image_hash
+
+PUSH_HISTORY_PATH = Path.home() / '.cache' / 'dutch_playbooks' / 'push_history.jsonl'
+# Registry lookups must not hang a release when the registry is slow
+REGISTRY_TIMEOUT_SECONDS = 30
+
+
+def _insecure(image: str) -> bool:
+    """Local registry stand-ins speak plain HTTP."""
+    host = image.split('/', 1)[0]
+    return host.startswith(('localhost', '127.0.0.1'))
+
+
+def local_config_digest(image: str) -> Optional[str]:
+    """Config digest (image ID) of a local image, or None if it does not exist locally."""
+    result = subprocess.run(['docker', 'image', 'inspect', '--format', '{{.Id}}', image],
+                            capture_output=True, text=True)
+    if result.returncode != 0:
+        return None
+    return result.stdout.strip() or None
+
+
+def remote_manifest(image: str) -> Optional[Dict]:
+    """
+    Return {'config': config digest, 'bytes': compressed layer bytes} for the
+    manifest the registry holds for image, or None if the tag does not exist.
+    For a multi-platform index the first real platform is used (BuildKit
+    attestation manifests are reported as unknown/unknown).
+    """
+    cmd = ['docker', 'manifest', 'inspect', '-v']
+    if _insecure(image):
+        cmd.append('--insecure')
+    try:
+        result = subprocess.run(cmd + [image], capture_output=True, text=True, timeout=REGISTRY_TIMEOUT_SECONDS)
+    except subprocess.TimeoutExpired:
+        return None
+    if result.returncode != 0:
+        return None
+    try:
+        entries = json.loads(result.stdout)
+    except ValueError:
+        return None
+    if isinstance(entries, dict):
+        entries = [entries]
+    for entry in entries:
+        platform = (entry.get('Descriptor') or {}).get('platform') or {}
+        if platform.get('architecture') == 'unknown':
+            continue
+        manifest = entry.get('SchemaV2Manifest') or entry.get('OCIManifest') or {}
+        config = (manifest.get('config') or {}).get('digest')
+        if config:
+            return {'config': config, 'bytes': sum(layer.get('size', 0) for layer in manifest.get('layers', []))}
+    return None
+
+
+def _throughput(repo: str) -> Optional[float]:
+    """Average bytes/second of earlier real pushes of repo, from the push history."""
+    if not PUSH_HISTORY_PATH.exists():
+        return None
+    pushed_bytes = pushed_seconds = 0.0
+    for line in PUSH_HISTORY_PATH.read_text().splitlines():
+        try:
+            record = json.loads(line)
+        except ValueError:
+            continue
+        if record.get('repo') == repo and record.get('pushed_seconds'):
+            pushed_bytes += record.get('pushed_bytes', 0)
+            pushed_seconds += record['pushed_seconds']
+    return pushed_bytes / pushed_seconds if pushed_seconds else None
+
+
+def _record(record: Dict):
+    PUSH_HISTORY_PATH.parent.mkdir(parents=True, exist_ok=True)
+    with open(PUSH_HISTORY_PATH, 'a') as f:
+        f.write(json.dumps(record) + '\n')
+
+
+def _retag(source: str, alias: str, digest: str) -> bool:
+    """Point alias at source's manifest (config digest) inside the registry, without uploading layers."""
+    cmd = ['docker', 'buildx', 'imagetools', 'create', '--tag', alias, source]
+    try:
+        if subprocess.run(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL).returncode == 0:
+            return True
+    except FileNotFoundError:
+        return False
+    # No buildx: tag locally and push; layers already in the registry are not re-uploaded.
+    # Only when the local image is the one in the registry.
+    if local_config_digest(source) != digest:
+        return False
+    if subprocess.run(['docker', 'tag', source, alias]).returncode != 0:
+        return False
+    return subprocess.run(['docker', 'push', alias]).returncode == 0
+
+
+def push_image(image: str, aliases: Iterable[str] = (), log: Callable[[str], None] = print,
+               context_hash: str = None, registry_hit: bool = False) -> Optional[Dict]:
+    """
+    Push image (repo:tag) unless the registry already holds it, then make every
+    alias tag point at it. With registry_hit the registry image is the build
+    result and is never replaced; otherwise, with context_hash, the local image
+    must carry that hash to be pushed. Returns the run record (also appended to
+    the push history), or None if the push failed.
+    """
+    repo = image.rsplit(':', 1)[0]
+    start = time.perf_counter()
+    record = {
+        'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'repo': repo,
+        'image': image,
+        'pushed': False,
+        'pushed_bytes': 0,
+        'pushed_seconds': 0.0,
+        'skipped_bytes': 0,
+        'retagged': [],
+        'aliases_current': [],
+        'retag_seconds': 0.0,
+    }
+
+    remote = remote_manifest(image)
+    local = None if registry_hit else local_config_digest(image)
+    if registry_hit and remote is None:
+        log(f"✗ {image} was found in the registry by context hash but its manifest cannot be read")
+        return None
+    if not registry_hit and local is None:
+        log(f"✗ {image} does not exist locally")
+        return None
+    if not registry_hit and context_hash and local_image_hash(image) != context_hash:
+        log(f"✗ Local {image} was not built from this context, refusing to push it")
+        return None
+
+    if remote and (registry_hit or remote['config'] == local):
+        log(f"✓ {image} already in the registry ({remote['config'][:19]}), skipping push")
+        record['skipped_bytes'] += remote['bytes']
+        digest = remote['config']
+    else:
+        push_start = time.perf_counter()
+        if subprocess.run(['docker', 'push', image]).returncode != 0:
+            log("✗ Push failed. Make sure you're logged in: docker login")
+            return None
+        record['pushed'] = True
+        record['pushed_seconds'] = round(time.perf_counter() - push_start, 2)
+        remote = remote_manifest(image)
+        record['pushed_bytes'] = remote['bytes'] if remote else 0
+        digest = local
+        log(f"✓ Pushed {image} in {record['pushed_seconds']:.1f}s")
+
+    retag_start = time.perf_counter()
+    for alias in aliases:
+        if alias == image:
+            continue
+        alias_remote = remote_manifest(alias)
+        if alias_remote and alias_remote['config'] == digest:
+            log(f"✓ {alias} already points at this image")
+            record['aliases_current'].append(alias)
+        elif _retag(image, alias, digest):
+            log(f"✓ Re-pointed {alias} without uploading layers")
+            record['retagged'].append(alias)
+        else:
+            log(f"⚠️  Could not update {alias}")
+
+    record['retag_seconds'] = round(time.perf_counter() - retag_start, 2)
+    record['digest'] = digest
+    record['seconds'] = round(time.perf_counter() - start, 2)
+    throughput = _throughput(repo)
+    record['saved_seconds'] = round(record['skipped_bytes'] / throughput, 1) if throughput else None
+    _record(record)
+
+    saved = f"saved {record['skipped_bytes'] / 1e6:.1f} MB"
+    if record['saved_seconds'] is not None:
+        saved += f", ~{record['saved_seconds']:.0f}s"
+    log(f"Push finished in {record['seconds']:.1f}s ({saved})")
+    return record
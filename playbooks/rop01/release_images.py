@@ -0,0 +1,212 @@
+#!/usr/bin/env python3
+"""
+Release both backend images at once: the Flask app (06_build_and_push_docker.py)
+and the Dart game server (07_build_and_push_dart_docker.py).
+
+Both scripts run side by side as child processes after a single confirmation,
+so a release takes roughly as long as the slower of the two instead of their
+sum. Each branch prepares its sources, builds and pushes on its own; their
+output is multiplexed line by line with a [flask] / [dart] prefix.
+
+CPU limits: each branch builds on its own buildx builder (docker-container
+driver) pinned to a CPU set, so the two builds do not starve each other, and
+the local source-transform pools are capped to the same number of CPUs.
+Builders are created on first use and named after their CPU set. Their layer
+cache is separate from the default builder's, the BUILD_CACHE inline/registry
+cache import (see build_context.py) warms them up.
+
+Failure handling: when one branch fails the other is interrupted (SIGINT,
+which also cancels its docker build), unless --keep-going is given. Neither
+branch modifies its source tree (both stream a transformed build context), so
+there is nothing to restore however a branch ends.
+
+Usage:
+    python3 playbooks/rop01/release_images.py [--flask-cpus 0-3] [--dart-cpus 4-7] [--no-cpu-limit] [--keep-going]
+"""
+
+import argparse
+import os
+import re
+import signal
+import subprocess
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List
+
+
+class Colors:
+    RED = '\033[0;31m'
+    GREEN = '\033[0;32m'
+    YELLOW = '\033[1;33m'
+    BLUE = '\033[0;34m'
+    MAGENTA = '\033[0;35m'
+    CYAN = '\033[0;36m'
+    NC = '\033[0m'  # No Color
+
+
+SCRIPT_DIR = Path(__file__).parent.resolve()
+
+# name -> (script, prefix color)
+BRANCHES = {
+    'flask': ('06_build_and_push_docker.py', Colors.CYAN),
+    'dart': ('07_build_and_push_dart_docker.py', Colors.MAGENTA),
+}
+BUILDER_PREFIX = 'dutch_release'
+
+_print_lock = threading.Lock()
+
+
+def log(prefix: str, color: str, line: str):
+    with _print_lock:
+        print(f"{color}[{prefix}]{Colors.NC} {line}", flush=True)
+
+
+def cpuset_size(cpuset: str) -> int:
+    """Number of CPUs in a cpuset string such as '0-3,6'."""
+    count = 0
+    for part in cpuset.split(','):
+        if '-' in part:
+            low, high = part.split('-')
+            count += int(high) - int(low) + 1
+        else:
+            count += 1
+    return count
+
+
+def default_cpusets() -> Dict[str, str]:
+    """Split the machine's CPUs in two halves, one per branch."""
+    cpus = os.cpu_count() or 1
+    if cpus < 2:
+        return {'flask': '0', 'dart': '0'}
+    half = cpus // 2
+    return {'flask': f'0-{half - 1}' if half > 1 else '0', 'dart': f'{half}-{cpus - 1}' if cpus - half > 1 else str(half)}
+
+
+def ensure_builder(cpuset: str) -> str:
+    """Return the name of a docker-container buildx builder pinned to cpuset, creating it if needed."""
+    name = f"{BUILDER_PREFIX}_{re.sub(r'[^0-9]+', '_', cpuset)}"
+    if subprocess.run(['docker', 'buildx', 'inspect', name],
+                      stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL).returncode == 0:
+        return name
+    subprocess.run(['docker', 'buildx', 'create', '--name', name, '--driver', 'docker-container',
+                    '--driver-opt', f'cpuset-cpus={cpuset}'],
+                   check=True, stdout=subprocess.DEVNULL)
+    return name
+
+
+class Branch:
+    """One build script running as a child process with prefixed output."""
+
+    def __init__(self, name: str, script: str, color: str, env: dict):
+        self.name = name
+        self.color = color
+        self.start = time.perf_counter()
+        self.seconds = None
+        self.returncode = None
+        # Own session, so a Ctrl-C in the terminal reaches the orchestrator only
+        # and interrupting a branch also reaches its docker build
+        self.process = subprocess.Popen(
+            [sys.executable, str(SCRIPT_DIR / script)],
+            stdin=subprocess.DEVNULL, stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+            env=env, start_new_session=True,
+        )
+        self.reader = threading.Thread(target=self._pump, daemon=True)
+        self.reader.start()
+
+    def _pump(self):
+        for raw in iter(self.process.stdout.readline, b''):
+            log(self.name, self.color, raw.decode('utf-8', errors='replace').rstrip())
+        self.returncode = self.process.wait()
+        self.seconds = time.perf_counter() - self.start
+
+    def interrupt(self):
+        if self.process.poll() is None:
+            log(self.name, self.color, f"{Colors.YELLOW}Interrupting...{Colors.NC}")
+            try:
+                os.killpg(self.process.pid, signal.SIGINT)
+            except ProcessLookupError:
+                pass
+
+    def done(self) -> bool:
+        return not self.reader.is_alive()
+
+
+def run_release(cpusets: Dict[str, str], keep_going: bool) -> bool:
+    # Set up both builders before starting anything
+    envs = {}
+    for name, (_, color) in BRANCHES.items():
+        env = dict(os.environ, PYTHONUNBUFFERED='1')
+        if cpusets:
+            env['BUILDX_BUILDER'] = ensure_builder(cpusets[name])
+            env['BUILD_WORKERS'] = str(cpuset_size(cpusets[name]))
+            log(name, color, f"builder {env['BUILDX_BUILDER']} (cpus {cpusets[name]})")
+        envs[name] = env
+
+    branches: List[Branch] = [Branch(name, script, color, envs[name]) for name, (script, color) in BRANCHES.items()]
+
+    start = time.perf_counter()
+    failed = False
+    try:
+        while not all(branch.done() for branch in branches):
+            for branch in branches:
+                if branch.done() and branch.returncode != 0 and not failed:
+                    failed = True
+                    log(branch.name, branch.color, f"{Colors.RED}✗ failed (exit {branch.returncode}){Colors.NC}")
+                    if not keep_going:
+                        for other in branches:
+                            other.interrupt()
+            time.sleep(0.2)
+    except KeyboardInterrupt:
+        print(f"\n{Colors.YELLOW}Interrupted, stopping both branches...{Colors.NC}")
+        for branch in branches:
+            branch.interrupt()
+        for branch in branches:
+            branch.reader.join()
+    wall = time.perf_counter() - start
+
+    print(f"\n{Colors.BLUE}=== Release Summary ==={Colors.NC}")
+    for branch in branches:
+        status = f"{Colors.GREEN}ok{Colors.NC}" if branch.returncode == 0 else f"{Colors.RED}failed ({branch.returncode}){Colors.NC}"
+        print(f"  {branch.name:6s} {status} in {branch.seconds or 0:.1f}s")
+    sequential = sum(branch.seconds or 0 for branch in branches)
+    print(f"  Total {wall:.1f}s (sequential would be ~{sequential:.1f}s, saved ~{max(sequential - wall, 0):.1f}s)")
+
+    return all(branch.returncode == 0 for branch in branches)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Build and push the Flask and Dart images concurrently')
+    defaults = default_cpusets()
+    parser.add_argument('--flask-cpus', default=defaults['flask'], help='CPU set for the Flask build (e.g. 0-3)')
+    parser.add_argument('--dart-cpus', default=defaults['dart'], help='CPU set for the Dart build (e.g. 4-7)')
+    parser.add_argument('--no-cpu-limit', action='store_true', help='Build on the default builder without CPU pinning')
+    parser.add_argument('--keep-going', action='store_true', help="Let the other branch finish when one fails")
+    args = parser.parse_args()
+
+    print(f"{Colors.BLUE}=== Release: Flask + Dart images ==={Colors.NC}\n")
+
+    cpusets = {} if args.no_cpu_limit else {'flask': args.flask_cpus, 'dart': args.dart_cpus}
+    if sys.stdin.isatty():
+        limits = 'no CPU limits' if not cpusets else f"flask cpus {cpusets['flask']}, dart cpus {cpusets['dart']}"
+        response = input(f"Build and push both images concurrently ({limits})? (y/n): ").strip().lower()
+        if response != 'y':
+            print(f"{Colors.YELLOW}Release cancelled.{Colors.NC}")
+            return
+
+    try:
+        success = run_release(cpusets, args.keep_going)
+    except subprocess.CalledProcessError as e:
+        print(f"{Colors.RED}Error: could not set up the buildx builders ({e}). "
+              f"Retry with --no-cpu-limit to use the default builder.{Colors.NC}")
+        success = False
+    if not success:
+        print(f"\n{Colors.RED}=== Release Failed ==={Colors.NC}")
+        sys.exit(1)
+    print(f"\n{Colors.GREEN}=== Release Complete ==={Colors.NC}")
+    print("Re-run 08_deploy_docker_compose.yml so the VPS pulls the new images.")
+
+
+if __name__ == '__main__':
+    main()
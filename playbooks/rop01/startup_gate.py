@@ -0,0 +1,298 @@
+#!/usr/bin/env python3
+"""
+Pre-push startup and latency gate for the Flask image.
+
+Runs a freshly built image locally next to throwaway stand-ins for MongoDB
+and Redis (same images, service names and credentials as docker-compose.yml,
+on a private docker network), then measures:
+
+- startup: seconds from `docker run` until /health answers 200;
+- latency: p50/p95/p99 of a short concurrent burst of /health requests.
+
+Results are appended to ~/.cache/dutch_playbooks/startup_gate.jsonl. The gate
+fails when startup or p95 latency is more than STARTUP_GATE_MAX_REGRESSION_PCT
+(default 50) percent worse than the last passing run, when the app does not
+become healthy within STARTUP_GATE_TIMEOUT seconds (default 120), or when more
+than 1% of the burst fails. Small absolute differences are ignored as noise.
+
+06_build_and_push_docker.py runs the gate before pushing when STARTUP_GATE=1.
+To gate an image that is already built:
+
+    python3 startup_gate.py [image] [--requests 200] [--concurrency 10]
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+SCRIPT_DIR = Path(__file__).parent.resolve()
+PROJECT_ROOT = SCRIPT_DIR.parent.parent
+SECRETS_DIR = PROJECT_ROOT / 'python_base_04' / 'secrets'
+
+GATE_HISTORY_PATH = Path.home() / '.cache' / 'dutch_playbooks' / 'startup_gate.jsonl'
+
+APP_PORT = 5001
+HEALTH_PATH = '/health'
+STARTUP_TIMEOUT_SECONDS = float(os.environ.get('STARTUP_GATE_TIMEOUT', 120))
+MAX_REGRESSION_PCT = float(os.environ.get('STARTUP_GATE_MAX_REGRESSION_PCT', 50))
+# Differences below these are noise, whatever the percentage
+MIN_STARTUP_REGRESSION_SECONDS = 2.0
+MIN_LATENCY_REGRESSION_MS = 20.0
+MAX_ERROR_RATE = 0.01
+
+# Stand-ins mirror dutch_mongodb-external / dutch_redis-external in docker-compose.yml;
+# the image's baked-in secrets point the app at these service names
+MONGODB_IMAGE = 'bitnami/mongodb:latest'
+MONGODB_SERVICE = 'dutch_mongodb-external'
+REDIS_IMAGE = 'bitnami/redis:latest'
+REDIS_SERVICE = 'dutch_redis-external'
+
+# Mirrors dutch_flask-external in docker-compose.yml, minus the production URLs
+APP_ENV = {
+    'DEBUG_MODE': 'false',
+    'APP_URL': f'http://localhost:{APP_PORT}',
+    'MONGODB_SERVICE_NAME': MONGODB_SERVICE,
+    'REDIS_HOST': REDIS_SERVICE,
+    'REDIS_PORT': '6379',
+    'RATE_LIMIT_ENABLED': 'false',
+    'CREDIT_SYSTEM_URL': f'http://localhost:{APP_PORT}',
+}
+
+
+class Colors:
+    RED = '\033[0;31m'
+    GREEN = '\033[0;32m'
+    YELLOW = '\033[1;33m'
+    BLUE = '\033[0;34m'
+    NC = '\033[0m'  # No Color
+
+
+def _secret(secrets_dir: Path, name: str) -> str:
+    path = secrets_dir / name
+    return path.read_text().strip() if path.exists() else ''
+
+
+def _env_args(env: Dict[str, str]) -> List[str]:
+    args = []
+    for key, value in env.items():
+        args += ['-e', f'{key}={value}']
+    return args
+
+
+class GateEnvironment:
+    """Private network with Mongo/Redis stand-ins and the app container; removed on exit."""
+
+    def __init__(self, image: str, secrets_dir: Path):
+        self.image = image
+        self.secrets_dir = secrets_dir
+        self.name = f"dutch_gate_{os.getpid()}"
+        self.containers = []
+
+    def _run(self, name: str, args: List[str]) -> str:
+        result = subprocess.run(['docker', 'run', '-d', '--name', f"{self.name}_{name}", '--network', self.name] + args,
+                                capture_output=True, text=True)
+        if result.returncode != 0:
+            raise RuntimeError(f"could not start {name}: {result.stderr.strip()}")
+        self.containers.append(f"{self.name}_{name}")
+        return f"{self.name}_{name}"
+
+    def __enter__(self):
+        subprocess.run(['docker', 'network', 'create', self.name], check=True, stdout=subprocess.DEVNULL)
+        try:
+            self._start_stand_ins()
+        except BaseException:
+            self.__exit__()
+            raise
+        return self
+
+    def _start_stand_ins(self):
+        # Passwords are passed as environment values: the bitnami images cannot read 0600 secret files
+        mongo_env = {
+            'MONGODB_ROOT_USER': 'mongodb_admin',
+            'MONGODB_ROOT_PASSWORD': _secret(self.secrets_dir, 'mongodb_root_password'),
+            'MONGODB_DATABASE': 'external_system',
+            'MONGODB_USERNAME': 'external_app_user',
+            'MONGODB_PASSWORD': _secret(self.secrets_dir, 'mongodb_user_password'),
+        }
+        redis_password = _secret(self.secrets_dir, 'redis_password')
+        redis_env = {'REDIS_PASSWORD': redis_password} if redis_password else {'ALLOW_EMPTY_PASSWORD': 'yes'}
+        self._run('mongodb', ['--network-alias', MONGODB_SERVICE] + _env_args(mongo_env) + [MONGODB_IMAGE])
+        self._run('redis', ['--network-alias', REDIS_SERVICE] + _env_args(redis_env) + [REDIS_IMAGE])
+
+    def start_app(self) -> str:
+        """Start the app container and return its base URL on the host."""
+        app = self._run('flask', ['-p', f'127.0.0.1::{APP_PORT}'] + _env_args(APP_ENV) + [self.image])
+        result = subprocess.run(['docker', 'port', app, str(APP_PORT)], capture_output=True, text=True, check=True)
+        host_port = result.stdout.splitlines()[0].strip()
+        return f"http://{host_port}"
+
+    def app_running(self) -> bool:
+        result = subprocess.run(['docker', 'inspect', '--format', '{{.State.Running}}', f"{self.name}_flask"],
+                                capture_output=True, text=True)
+        return result.stdout.strip() == 'true'
+
+    def app_logs(self, lines: int = 20) -> str:
+        result = subprocess.run(['docker', 'logs', '--tail', str(lines), f"{self.name}_flask"],
+                                capture_output=True, text=True)
+        return (result.stdout + result.stderr).strip()
+
+    def __exit__(self, *exc):
+        if self.containers:
+            subprocess.run(['docker', 'rm', '-f'] + self.containers, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        subprocess.run(['docker', 'network', 'rm', self.name], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        return False
+
+
+def _get(url: str, timeout: float = 5.0) -> bool:
+    try:
+        with urllib.request.urlopen(url, timeout=timeout) as response:
+            response.read()
+            return response.status == 200
+    except (urllib.error.URLError, OSError):
+        return False
+
+
+def wait_healthy(env: GateEnvironment, url: str, start: float) -> Optional[float]:
+    """Seconds from start until url answers 200, or None on timeout / container exit."""
+    while time.perf_counter() - start < STARTUP_TIMEOUT_SECONDS:
+        if _get(url, timeout=2.0):
+            return time.perf_counter() - start
+        if not env.app_running():
+            return None
+        time.sleep(0.25)
+    return None
+
+
+def request_burst(url: str, requests: int, concurrency: int) -> Dict:
+    """Send requests GETs with concurrency workers; return latency percentiles (ms) and errors."""
+    def timed(_):
+        request_start = time.perf_counter()
+        ok = _get(url)
+        return ok, (time.perf_counter() - request_start) * 1000
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(timed, range(requests)))
+    latencies = [ms for ok, ms in results if ok]
+    errors = sum(1 for ok, _ in results if not ok)
+    if len(latencies) < 2:
+        return {'requests': requests, 'errors': errors}
+    cuts = statistics.quantiles(latencies, n=100)
+    return {
+        'requests': requests,
+        'errors': errors,
+        'p50_ms': round(cuts[49], 1),
+        'p95_ms': round(cuts[94], 1),
+        'p99_ms': round(cuts[98], 1),
+    }
+
+
+def _previous(repo: str) -> Optional[Dict]:
+    """Last passing gate run for repo."""
+    if not GATE_HISTORY_PATH.exists():
+        return None
+    previous = None
+    for line in GATE_HISTORY_PATH.read_text().splitlines():
+        try:
+            record = json.loads(line)
+        except ValueError:
+            continue
+        if record.get('repo') == repo and record.get('passed'):
+            previous = record
+    return previous
+
+
+def _record(record: Dict):
+    GATE_HISTORY_PATH.parent.mkdir(parents=True, exist_ok=True)
+    with open(GATE_HISTORY_PATH, 'a') as f:
+        f.write(json.dumps(record) + '\n')
+
+
+def _regressed(value: float, baseline: float, min_delta: float) -> bool:
+    return value - baseline >= min_delta and value > baseline * (1 + MAX_REGRESSION_PCT / 100)
+
+
+def run_startup_gate(image: str, secrets_dir: Path = SECRETS_DIR, requests: int = 200, concurrency: int = 10,
+                     log: Callable[[str], None] = print) -> Optional[Dict]:
+    """
+    Start image with its stand-in services, measure startup and burst latency,
+    and compare with the last passing run. Returns the run record (also
+    appended to the gate history), or None if the gate failed.
+    """
+    repo = image.rsplit(':', 1)[0]
+    record = {
+        'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'repo': repo,
+        'image': image,
+        'passed': False,
+    }
+    problems = []
+    try:
+        with GateEnvironment(image, secrets_dir) as env:
+            log(f"Stand-ins started ({MONGODB_SERVICE}, {REDIS_SERVICE}), starting the app...")
+            start = time.perf_counter()
+            base_url = env.start_app()
+            startup = wait_healthy(env, base_url + HEALTH_PATH, start)
+            if startup is None:
+                problems.append(f"{HEALTH_PATH} did not answer 200 within {STARTUP_TIMEOUT_SECONDS:.0f}s")
+                log(f"Last app log lines:\n{env.app_logs()}")
+            else:
+                record['startup_seconds'] = round(startup, 2)
+                log(f"Healthy after {startup:.1f}s; sending {requests} requests ({concurrency} concurrent)...")
+                record.update(request_burst(base_url + HEALTH_PATH, requests, concurrency))
+    except (RuntimeError, subprocess.CalledProcessError) as e:
+        log(f"✗ Could not set up the gate environment: {e}")
+        return None
+
+    if 'p50_ms' in record:
+        log(f"Latency p50 {record['p50_ms']:.1f} ms, p95 {record['p95_ms']:.1f} ms, p99 {record['p99_ms']:.1f} ms, "
+            f"{record['errors']} errors")
+    if record.get('requests') and record['errors'] / record['requests'] > MAX_ERROR_RATE:
+        problems.append(f"{record['errors']}/{record['requests']} requests failed")
+
+    previous = _previous(repo)
+    if previous and 'startup_seconds' in record:
+        log(f"Previous passing run ({previous['time']}): startup {previous['startup_seconds']:.1f}s, "
+            f"p95 {previous.get('p95_ms', 0):.1f} ms")
+        if _regressed(record['startup_seconds'], previous['startup_seconds'], MIN_STARTUP_REGRESSION_SECONDS):
+            problems.append(f"startup {record['startup_seconds']:.1f}s vs {previous['startup_seconds']:.1f}s "
+                            f"(over +{MAX_REGRESSION_PCT:g}%)")
+        if 'p95_ms' in record and 'p95_ms' in previous and \
+                _regressed(record['p95_ms'], previous['p95_ms'], MIN_LATENCY_REGRESSION_MS):
+            problems.append(f"p95 latency {record['p95_ms']:.1f} ms vs {previous['p95_ms']:.1f} ms "
+                            f"(over +{MAX_REGRESSION_PCT:g}%)")
+
+    record['passed'] = not problems
+    record['problems'] = problems
+    _record(record)
+    for problem in problems:
+        log(f"✗ {problem}")
+    return None if problems else record
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Start a Flask image with stand-in services and gate on startup/latency')
+    parser.add_argument('image', nargs='?', default='silvella/dutch_flask_app:latest', help='Local image to test')
+    parser.add_argument('--requests', type=int, default=200, help='Requests in the latency burst')
+    parser.add_argument('--concurrency', type=int, default=10, help='Concurrent requests in the burst')
+    args = parser.parse_args()
+
+    print(f"{Colors.BLUE}=== Startup gate: {args.image} ==={Colors.NC}")
+    record = run_startup_gate(args.image, requests=args.requests, concurrency=args.concurrency,
+                              log=lambda message: print(f"  {message}"))
+    if record is None:
+        print(f"{Colors.RED}✗ Gate failed{Colors.NC}")
+        sys.exit(1)
+    print(f"{Colors.GREEN}✓ Gate passed{Colors.NC}")
+
+
+if __name__ == '__main__':
+    main()
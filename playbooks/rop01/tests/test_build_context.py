@@ -0,0 +1,149 @@
+"""
+.dockerignore matching, context listing and context hashing (build_context.py).
+
+    python3 -m pytest playbooks/rop01/tests/test_build_context.py
+"""
+
+import io
+import os
+import shutil
+import sys
+import tarfile
+import tempfile
+import unittest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import build_context  # noqa: E402
+from build_context import is_ignored, iter_context_files, parse_dockerignore  # noqa: E402
+
+
+class DockerignoreTest(unittest.TestCase):
+
+    def ignored(self, lines, rel_path: str) -> bool:
+        return is_ignored(rel_path, parse_dockerignore(lines))
+
+    def test_star_does_not_cross_directories(self):
+        self.assertTrue(self.ignored(['*.pyc'], 'a.pyc'))
+        self.assertFalse(self.ignored(['*.pyc'], 'pkg/a.pyc'))
+        self.assertTrue(self.ignored(['*/*.pyc'], 'pkg/a.pyc'))
+
+    def test_double_star_matches_any_depth(self):
+        rules = ['**/__pycache__']
+        self.assertTrue(self.ignored(rules, '__pycache__'))
+        self.assertTrue(self.ignored(rules, 'a/b/__pycache__/x.pyc'))
+        self.assertFalse(self.ignored(rules, 'a/__pycache__x'))
+
+    def test_question_mark_matches_one_character(self):
+        self.assertTrue(self.ignored(['log?.txt'], 'log1.txt'))
+        self.assertFalse(self.ignored(['log?.txt'], 'log10.txt'))
+        self.assertFalse(self.ignored(['a?b'], 'a/b'))
+
+    def test_directory_rule_covers_its_contents(self):
+        self.assertTrue(self.ignored(['docs'], 'docs/index.md'))
+        self.assertFalse(self.ignored(['docs'], 'docsite/index.md'))
+
+    def test_last_matching_rule_wins(self):
+        rules = ['*.md', '!README.md']
+        self.assertTrue(self.ignored(rules, 'CHANGES.md'))
+        self.assertFalse(self.ignored(rules, 'README.md'))
+        self.assertTrue(self.ignored(rules + ['README*'], 'README.md'))
+
+    def test_comments_blank_lines_and_leading_slash(self):
+        rules = parse_dockerignore(['# comment', '', '  ', '/build', './dist/'])
+        self.assertEqual(len(rules), 2)
+        self.assertTrue(is_ignored('build/out.o', rules))
+        self.assertTrue(is_ignored('dist/app.whl', rules))
+
+
+class ContextTreeTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = Path(tempfile.mkdtemp(prefix='build_context_test_'))
+        self.addCleanup(shutil.rmtree, self.tmp, ignore_errors=True)
+        self.addCleanup(setattr, build_context, 'STAT_CACHE_ROOT', build_context.STAT_CACHE_ROOT)
+        build_context.STAT_CACHE_ROOT = self.tmp / 'stat_cache'
+
+    def make_tree(self, name: str) -> Path:
+        root = self.tmp / name
+        (root / 'app').mkdir(parents=True)
+        (root / 'app' / 'main.py').write_text('print(1)\n')
+        (root / 'app' / 'run.sh').write_text('#!/bin/sh\n')
+        (root / 'app' / 'run.sh').chmod(0o755)
+        (root / 'empty').mkdir()
+        (root / 'cache').mkdir()
+        (root / 'cache' / 'blob').write_text('cached')
+        os.symlink('app', root / 'app_link')
+        (root / '.dockerignore').write_text('cache\n')
+        return root
+
+    def context_hash(self, root: Path) -> str:
+        entries = [(rel_path, path, None)
+                   for path, rel_path in iter_context_files(root, build_context.load_dockerignore(root))]
+        return build_context.hash_context(entries, b'FROM scratch\n', 'test')
+
+    def test_lists_directories_and_symlinks_without_following_them(self):
+        root = self.make_tree('tree')
+        listed = [rel_path for _, rel_path in iter_context_files(root, build_context.load_dockerignore(root))]
+        self.assertEqual(listed, ['.dockerignore', 'app', 'app_link', 'empty', 'app/main.py', 'app/run.sh'])
+
+    def test_tar_holds_the_listed_entries(self):
+        root = self.make_tree('tree')
+        context = [(path, rel_path, None)
+                   for path, rel_path in iter_context_files(root, build_context.load_dockerignore(root))]
+        buffer = io.BytesIO()
+        stats = build_context.write_context_tar(buffer, context)
+        buffer.seek(0)
+        members = {member.name: member for member in tarfile.open(fileobj=buffer)}
+        self.assertEqual(stats['context_files'], 3)
+        self.assertTrue(members['empty'].isdir())
+        self.assertTrue(members['app_link'].issym())
+        self.assertEqual(members['app_link'].linkname, 'app')
+        self.assertEqual(members['app/run.sh'].mode & 0o777, 0o755)
+
+    def test_hash_is_stable_across_copies_and_mtimes(self):
+        first = self.make_tree('first')
+        second = self.make_tree('second')
+        os.utime(second / 'app' / 'main.py', (1_500_000_000, 1_500_000_000))
+        self.assertEqual(self.context_hash(first), self.context_hash(first))
+        self.assertEqual(self.context_hash(first), self.context_hash(second))
+
+    def test_hash_ignores_excluded_files(self):
+        root = self.make_tree('tree')
+        before = self.context_hash(root)
+        (root / 'cache' / 'blob').write_text('changed')
+        self.assertEqual(self.context_hash(root), before)
+
+    def test_hash_changes_with_content_mode_directories_and_dockerfile(self):
+        root = self.make_tree('tree')
+        before = self.context_hash(root)
+
+        (root / 'app' / 'main.py').write_text('print(2)\n')
+        after_content = self.context_hash(root)
+        self.assertNotEqual(after_content, before)
+
+        (root / 'app' / 'main.py').chmod(0o600)
+        after_mode = self.context_hash(root)
+        self.assertNotEqual(after_mode, after_content)
+
+        (root / 'another_empty').mkdir()
+        after_dir = self.context_hash(root)
+        self.assertNotEqual(after_dir, after_mode)
+
+        entries = [(rel_path, path, None)
+                   for path, rel_path in iter_context_files(root, build_context.load_dockerignore(root))]
+        self.assertNotEqual(build_context.hash_context(entries, b'FROM alpine\n', 'test'), after_dir)
+
+    def test_content_override_replaces_the_file_on_disk(self):
+        root = self.make_tree('tree')
+        entries = [(rel_path, path, None)
+                   for path, rel_path in iter_context_files(root, build_context.load_dockerignore(root))]
+        overridden = [(rel_path, path, b'print(1)\n' if rel_path == 'app/main.py' else data)
+                      for rel_path, path, data in entries]
+        self.assertEqual(build_context.hash_context(overridden, b'FROM scratch\n', 'test'),
+                         build_context.hash_context(entries, b'FROM scratch\n', 'test'))
+
+
+if __name__ == '__main__':
+    unittest.main()
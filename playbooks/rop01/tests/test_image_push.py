@@ -0,0 +1,114 @@
+"""
+Digest-aware push (image_push.py) against a local registry:2 stand-in.
+
+Needs a running Docker daemon (with buildx) and pulls registry:2; skipped otherwise.
+
+    python3 -m pytest playbooks/rop01/tests/test_image_push.py
+"""
+
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import unittest
+import urllib.request
+import uuid
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import image_push  # noqa: E402
+from build_context import CONTEXT_HASH_LABEL  # noqa: E402
+
+
+def _docker_available() -> bool:
+    if not shutil.which('docker'):
+        return False
+    return subprocess.run(['docker', 'info'], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL).returncode == 0
+
+
+@unittest.skipUnless(_docker_available(), 'Docker daemon not available')
+class PushToLocalRegistryTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = Path(tempfile.mkdtemp(prefix='image_push_test_'))
+        self.addCleanup(shutil.rmtree, self.tmp, ignore_errors=True)
+        image_push.PUSH_HISTORY_PATH = self.tmp / 'push_history.jsonl'
+
+        self.registry = f"image_push_test_{uuid.uuid4().hex[:8]}"
+        subprocess.run(['docker', 'run', '-d', '--name', self.registry, '-p', '127.0.0.1::5000', 'registry:2'],
+                       check=True, stdout=subprocess.DEVNULL)
+        self.addCleanup(subprocess.run, ['docker', 'rm', '-f', self.registry],
+                        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        port = subprocess.run(['docker', 'port', self.registry, '5000'], capture_output=True, text=True,
+                              check=True).stdout.splitlines()[0].rsplit(':', 1)[1]
+        self.repo = f"localhost:{port}/dutch_push_test"
+        self._wait_for_registry(port)
+
+    def _wait_for_registry(self, port: str):
+        for _ in range(50):
+            try:
+                urllib.request.urlopen(f"http://127.0.0.1:{port}/v2/", timeout=1).read()
+                return
+            except OSError:
+                time.sleep(0.2)
+        self.fail('registry:2 did not start')
+
+    def build(self, tag: str, payload: str, context_hash: str) -> str:
+        context = self.tmp / tag
+        context.mkdir()
+        (context / 'payload').write_text(payload)
+        (context / 'Dockerfile').write_text(f"FROM scratch\nCOPY payload /payload\nLABEL {CONTEXT_HASH_LABEL}={context_hash}\n")
+        image = f"{self.repo}:{tag}"
+        subprocess.run(['docker', 'build', '-q', '-t', image, str(context)], check=True, stdout=subprocess.DEVNULL)
+        self.addCleanup(subprocess.run, ['docker', 'rmi', '-f', image], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        return image
+
+    def test_second_push_is_skipped_and_latest_repointed_without_upload(self):
+        latest = f"{self.repo}:latest"
+        image = self.build('v1', 'one', 'hash-one')
+
+        first = image_push.push_image(image, aliases=[latest], log=lambda message: None, context_hash='hash-one')
+        self.assertIsNotNone(first)
+        self.assertTrue(first['pushed'])
+        self.assertGreater(first['pushed_bytes'], 0)
+        self.assertEqual(first['retagged'], [latest])
+        # Re-pointed in the registry only: latest was never tagged or pushed locally
+        self.assertIsNone(image_push.local_config_digest(latest))
+        self.assertEqual(image_push.remote_manifest(latest)['config'], first['digest'])
+
+        second = image_push.push_image(image, aliases=[latest], log=lambda message: None, context_hash='hash-one')
+        self.assertIsNotNone(second)
+        self.assertFalse(second['pushed'])
+        self.assertEqual(second['pushed_bytes'], 0)
+        self.assertEqual(second['skipped_bytes'], first['pushed_bytes'])
+        self.assertEqual(second['aliases_current'], [latest])
+        self.assertEqual(second['retagged'], [])
+
+        # A new image moves latest, again without uploading anything for the alias
+        newer = self.build('v2', 'two', 'hash-two')
+        third = image_push.push_image(newer, aliases=[latest], log=lambda message: None, context_hash='hash-two')
+        self.assertTrue(third['pushed'])
+        self.assertEqual(third['retagged'], [latest])
+        self.assertIsNone(image_push.local_config_digest(latest))
+        self.assertEqual(image_push.remote_manifest(latest)['config'], third['digest'])
+
+    def test_registry_hit_never_pushes_the_local_tag(self):
+        image = self.build('v1', 'one', 'hash-one')
+        pushed = image_push.push_image(image, log=lambda message: None, context_hash='hash-one')
+        # Replace the local tag with an unrelated image, as a stale local build would
+        self.build('stale', 'stale', 'hash-stale')
+        subprocess.run(['docker', 'tag', f"{self.repo}:stale", image], check=True)
+
+        record = image_push.push_image(image, log=lambda message: None, context_hash='hash-one', registry_hit=True)
+        self.assertFalse(record['pushed'])
+        self.assertEqual(image_push.remote_manifest(image)['config'], pushed['digest'])
+
+        # Without a registry hit the stale image is refused by its context hash label
+        self.assertIsNone(image_push.push_image(image, log=lambda message: None, context_hash='hash-one'))
+        self.assertEqual(image_push.remote_manifest(image)['config'], pushed['digest'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,185 @@
+"""
+The --files-from image upload (11_add_players.py shard_rsync_command) must
+leave the destination exactly as the former temp-copy upload did: same files,
+content, modification times, ownership and permissions.
+
+Both uploads run with local rsync into temporary directories, owned by the
+current user instead of www-data; those tests are skipped when rsync is not
+installed. The rsync command line and the shard split need no tools.
+
+    python3 -m pytest playbooks/rop01/tests/test_rsync_upload.py
+"""
+
+import grp
+import hashlib
+import importlib.util
+import os
+import pwd
+import shlex
+import shutil
+import subprocess
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+SCRIPT_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(SCRIPT_DIR))
+
+
+def _load_sibling(filename: str, module_name: str):
+    spec = importlib.util.spec_from_file_location(module_name, SCRIPT_DIR / filename)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+seeder = _load_sibling('11_add_players.py', 'add_players')
+
+OWNER = f"{pwd.getpwuid(os.getuid()).pw_name}:{grp.getgrgid(os.getgid()).gr_name}"
+
+
+def legacy_temp_copy_upload(files: dict, destination: Path):
+    """The upload before --files-from: copy into a temp dir, rsync it, then chown/chmod the whole directory."""
+    temp_upload_dir = tempfile.mkdtemp(prefix='player_images_')
+    try:
+        for filename, local_path in files.items():
+            shutil.copy2(local_path, os.path.join(temp_upload_dir, filename))
+        destination.mkdir(parents=True, exist_ok=True)
+        subprocess.run(['rsync', '-avz', '--chmod=u=rw,go=r', f'{temp_upload_dir}/', f'{destination}/'],
+                       check=True, capture_output=True)
+        subprocess.run(f'chown -R {OWNER} {destination} && find {destination} -type d -exec chmod 755 {{}} \\; '
+                       f'&& find {destination} -type f -exec chmod 644 {{}} \\;',
+                       shell=True, check=True, capture_output=True)
+    finally:
+        shutil.rmtree(temp_upload_dir, ignore_errors=True)
+
+
+def files_from_upload(files: dict, local_dir: Path, destination: Path):
+    """The current upload, with the remote `install -d -m 755` done locally."""
+    destination.mkdir(parents=True, exist_ok=True)
+    destination.chmod(0o755)
+    cmd = seeder.shard_rsync_command(local_dir, f'{destination}/', str(destination), owner=OWNER)
+    subprocess.run(cmd, input=''.join(f'{name}\n' for name in sorted(files)).encode(), check=True, capture_output=True)
+
+
+def snapshot(root: Path) -> dict:
+    """{relative path: (kind, mode, uid, gid, sha256, mtime)} for root and everything below it."""
+    entries = {}
+    for path in [root] + sorted(root.rglob('*')):
+        st = path.lstat()
+        if path.is_dir():
+            entries[path.relative_to(root).as_posix()] = ('dir', st.st_mode & 0o7777, st.st_uid, st.st_gid, None, None)
+        else:
+            digest = hashlib.sha256(path.read_bytes()).hexdigest()
+            entries[path.relative_to(root).as_posix()] = (
+                'file', st.st_mode & 0o7777, st.st_uid, st.st_gid, digest, int(st.st_mtime))
+    return entries
+
+
+class ShardRsyncCommandTest(unittest.TestCase):
+
+    def test_argv(self):
+        cmd = seeder.shard_rsync_command(Path('/local/images'), 'dutch@vps:/srv/images/', '/srv/images',
+                                         'ssh -i key -o ControlPath=/tmp/cp')
+        self.assertEqual(cmd[0], 'rsync')
+        for flag in ('--files-from=-', '--ignore-times', '--chown=www-data:www-data', '--chmod=D755,F644'):
+            self.assertIn(flag, cmd)
+        self.assertEqual(cmd[-4:], ['-e', 'ssh -i key -o ControlPath=/tmp/cp', '/local/images/', 'dutch@vps:/srv/images/'])
+
+    def test_without_remote_shell(self):
+        cmd = seeder.shard_rsync_command(Path('/local/images'), '/srv/images/', '/srv/images')
+        self.assertNotIn('-e', cmd)
+        self.assertEqual(cmd[-2:], ['/local/images/', '/srv/images/'])
+
+    def test_rsync_path_quotes_remote_values(self):
+        # The remote shell runs --rsync-path as a command line
+        cmd = seeder.shard_rsync_command(Path('/local'), 'vps:/srv/x/', "/srv/player images; rm -rf ~", owner='www:web data')
+        rsync_path = next(arg for arg in cmd if arg.startswith('--rsync-path='))[len('--rsync-path='):]
+        self.assertEqual(shlex.split(rsync_path), [
+            'sudo', 'install', '-d', '-o', 'www', '-g', 'web data', '-m', '755', '/srv/player images; rm -rf ~',
+            '&&', 'sudo', 'rsync',
+        ])
+
+
+class ShardBySizeTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = Path(tempfile.mkdtemp(prefix='shard_test_'))
+        self.addCleanup(shutil.rmtree, self.tmp, ignore_errors=True)
+
+    def files(self, sizes: dict) -> dict:
+        files = {}
+        for name, size in sizes.items():
+            files[name] = self.tmp / name
+            files[name].write_bytes(b'x' * size)
+        return files
+
+    def test_every_file_in_exactly_one_shard_with_balanced_sizes(self):
+        files = self.files({'a': 500, 'b': 400, 'c': 300, 'd': 300, 'e': 100})
+        shards = seeder.shard_by_size(files, 2)
+        self.assertEqual(len(shards), 2)
+        self.assertEqual(sorted(name for shard in shards for name in shard), sorted(files))
+        self.assertEqual([sum(path.stat().st_size for path in shard.values()) for shard in shards], [800, 800])
+
+    def test_no_more_shards_than_files(self):
+        files = self.files({'a': 10, 'b': 20})
+        self.assertEqual(len(seeder.shard_by_size(files, 8)), 2)
+        self.assertEqual(seeder.shard_by_size({}, 4), [{}])
+        self.assertEqual(seeder.shard_by_size(files, 0), [files])
+
+
+@unittest.skipUnless(shutil.which('rsync'), 'rsync not installed')
+class FilesFromUploadTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = Path(tempfile.mkdtemp(prefix='rsync_upload_test_'))
+        self.addCleanup(shutil.rmtree, self.tmp, ignore_errors=True)
+        self.local_dir = self.tmp / 'assigned_images'
+        self.local_dir.mkdir()
+        for index, mode in enumerate([0o600, 0o644, 0o664, 0o755]):
+            path = self.local_dir / f'img{index:03d}.jpg'
+            path.write_bytes(os.urandom(2048 + index))
+            path.chmod(mode)
+            os.utime(path, (1_600_000_000 + index, 1_600_000_000 + index))
+        # Present locally but not selected for upload
+        (self.local_dir / 'img999.jpg').write_bytes(b'not uploaded')
+        self.selected = {name: self.local_dir / name for name in ['img000.jpg', 'img001.jpg', 'img002.jpg', 'img003.jpg']}
+
+    def destination_with_existing_file(self, name: str) -> Path:
+        destination = self.tmp / name
+        destination.mkdir()
+        existing = destination / 'img500.jpg'
+        existing.write_bytes(b'already on the VPS')
+        existing.chmod(0o644)
+        os.utime(existing, (1_500_000_000, 1_500_000_000))
+        return destination
+
+    def test_same_tree_as_temp_copy_upload(self):
+        legacy = self.destination_with_existing_file('legacy')
+        current = self.destination_with_existing_file('current')
+
+        legacy_temp_copy_upload(self.selected, legacy)
+        files_from_upload(self.selected, self.local_dir, current)
+
+        self.assertEqual(snapshot(current), snapshot(legacy))
+        self.assertNotIn('img999.jpg', snapshot(current))
+        for name in self.selected:
+            self.assertEqual(snapshot(current)[name][1], 0o644)
+
+    def test_replaces_changed_files_with_same_size_and_mtime(self):
+        # --ignore-times: a listed file is always rewritten, even if size and mtime match
+        # (the temp-copy upload's quick check kept such files)
+        current = self.destination_with_existing_file('current')
+        source = self.selected['img000.jpg']
+        stale = current / 'img000.jpg'
+        stale.write_bytes(b'x' * source.stat().st_size)
+        os.utime(stale, (source.stat().st_atime, source.stat().st_mtime))
+
+        files_from_upload(self.selected, self.local_dir, current)
+
+        self.assertEqual(stale.read_bytes(), source.read_bytes())
+
+
+if __name__ == '__main__':
+    unittest.main()
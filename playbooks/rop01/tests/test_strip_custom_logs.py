@@ -0,0 +1,77 @@
+"""
+custom_log() stripping of the Flask build context (06_build_and_push_docker.py strip_custom_logs).
+
+    python3 -m pytest playbooks/rop01/tests/test_strip_custom_logs.py
+"""
+
+import importlib.util
+import sys
+import unittest
+from pathlib import Path
+
+SCRIPT_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(SCRIPT_DIR))
+
+
+def _load_sibling(filename: str, module_name: str):
+    spec = importlib.util.spec_from_file_location(module_name, SCRIPT_DIR / filename)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+flask_build = _load_sibling('06_build_and_push_docker.py', 'build_and_push_docker')
+
+
+def strip(source: str):
+    return flask_build.strip_custom_logs(source, 'test.py')
+
+
+class StripCustomLogsTest(unittest.TestCase):
+
+    def test_source_without_calls_is_unchanged(self):
+        source = "def f():\n    return 1\n"
+        self.assertEqual(strip(source), (source, 0))
+
+    def test_multi_line_call_is_blanked_keeping_line_numbers(self):
+        source = "def f():\n    custom_log(\n        'a',\n        level='x')\n    return 1\n"
+        new_source, calls = strip(source)
+        self.assertEqual(calls, 1)
+        self.assertEqual(new_source, "def f():\n\n\n\n    return 1\n")
+
+    def test_emptied_block_keeps_pass(self):
+        new_source, calls = strip("if x:\n    custom_log('a')\n    custom_log('b')\ny = 2\n")
+        self.assertEqual(calls, 2)
+        self.assertEqual(new_source, "if x:\n    pass\n\ny = 2\n")
+
+    def test_except_else_and_finally_bodies(self):
+        source = ("try:\n    f()\nexcept E:\n    custom_log('e')\nelse:\n    custom_log('else')\n"
+                  "finally:\n    custom_log('fin')\nfor i in y:\n    g()\nelse:\n    custom_log('for else')\n")
+        new_source, calls = strip(source)
+        self.assertEqual(calls, 4)
+        self.assertNotIn('custom_log', new_source)
+        self.assertEqual(new_source.count('pass'), 4)
+        self.assertEqual(len(new_source.splitlines()), len(source.splitlines()))
+        compile(new_source, 'test.py', 'exec')
+
+    def test_call_sharing_a_line_becomes_pass(self):
+        new_source, calls = strip("x = 1; custom_log('a')\nif x: custom_log('b')\n")
+        self.assertEqual(calls, 2)
+        self.assertEqual(new_source, "x = 1; pass\nif x: pass\n")
+
+    def test_only_bare_custom_log_statements_are_removed(self):
+        source = "self.custom_log('a')\ny = custom_log('b')\nlog.custom_log('c')\n"
+        self.assertEqual(strip(source), (source, 0))
+
+    def test_non_ascii_source_before_the_call(self):
+        # ast column offsets are in UTF-8 bytes
+        new_source, calls = strip("x = 'é'; custom_log('ü')\n")
+        self.assertEqual((new_source, calls), ("x = 'é'; pass\n", 1))
+
+    def test_invalid_source_raises(self):
+        with self.assertRaises(SyntaxError):
+            strip("custom_log(\n")
+
+
+if __name__ == '__main__':
+    unittest.main()